@@ -0,0 +1,548 @@
+"""
+Throughput and p50/p95/p99 latency of every route of the songs, artists and
+songbook pages and of the JSON API, over a seeded corpus of synthetic songs.
+
+Run from ``backend/src``, in process over an in-memory stand-in of MongoDB::
+
+    python -m benchmarks.bench_api --songs 1000
+
+or against a local mongod, where the corpus is seeded once and kept for the
+next runs, which is the way to benchmark 100k to 1M songs::
+
+    MONGODB_URI=mongodb://localhost:27017 MONGODB_DATABASE=songbook_bench \\
+        python -m benchmarks.bench_api --songs 1000000
+
+With ``--url`` the requests go over HTTP to a running server instead, from
+``--connections`` concurrent connections; the server must use the same
+MONGODB_URI and MONGODB_DATABASE::
+
+    MONGODB_URI=... MONGODB_DATABASE=songbook_bench \\
+        uvicorn main:app --workers 4 &
+    MONGODB_URI=... MONGODB_DATABASE=songbook_bench \\
+        python -m benchmarks.bench_api --url http://localhost:8000
+
+``--check`` compares the results with the limits in ``thresholds.json`` next
+to this file and exits with status 1 if any route regressed, and
+``--update-thresholds`` writes new limits from this run with a safety margin.
+Limits are kept for each database, driver and size of the run, as the limits
+of one say nothing of another, and ``--check`` refuses a run none were
+recorded for. Those of the in-memory stand-in only catch gross regressions
+of the routes' own work, its queries scan every document.
+The corpus and the requests are generated from ``--seed``, so two runs with
+the same arguments send the same requests.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+import zipfile
+from collections.abc import Callable, Iterator
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+
+import httpx
+import importer
+from database import registry
+from models.composition import chromatic_scale
+from models.songbook import SongbookEntry
+from settings import settings
+
+THRESHOLDS_PATH = os.path.join(os.path.dirname(__file__), "thresholds.json")
+# Latency limits are this many times the measured p99, throughput limits this
+# many times less than measured, as runs on one machine vary that much.
+THRESHOLD_MARGIN = 3
+
+QUALITIES = ["", "m", "7", "m7", "maj7", "sus4", "sus2", "dim"]
+WORDS = (
+    "love heart night road home fire rain dream light time way down river "
+    "summer winter morning old blue black little wild sweet lonely golden"
+).split()
+NAMES = (
+    "Anna Bob Cecilia Daniel Ema Filip Greta Hugo Ivana Jan Karel Lucie Marek "
+    "Nina Oskar Petra Quentin Radek Sofie Tomas Ursula Viktor Wanda Xaver Yvona "
+    "Zdenek"
+).split()
+BANDS = "Brothers Band Trio Orchestra Project Collective Quartet Kids".split()
+# Songs written by the benchmark itself, removed again when it is done.
+LOAD_ARTIST = "Load Test"
+
+
+def artist_name(rng: random.Random) -> str:
+    first = rng.choice(NAMES)
+    if rng.random() < 0.5:
+        return f"{first} {rng.choice(NAMES)}ová"
+    return f"{first} {rng.choice(BANDS)}"
+
+
+def song_text(rng: random.Random, artist: str, title: str) -> str:
+    key = rng.randrange(12)
+    chords = [
+        chromatic_scale[(key + step) % 12] + rng.choice(QUALITIES)
+        for step in (0, 5, 7, 9, 2, 4)
+    ]
+    text = [f"{{title: {title}}}", f"{{artist: {artist}}}", ""]
+    for section in rng.choice([["verse", "chorus", "verse", "chorus"], ["verse"] * 3]):
+        text.append(f"{{start_of_{section}}}")
+        for _ in range(rng.randint(2, 6)):
+            words = [
+                f"[{rng.choice(chords)}]{rng.choice(WORDS)} {rng.choice(WORDS)} "
+                for _ in range(rng.randint(2, 4))
+            ]
+            text.append("".join(words).rstrip())
+        text.append(f"{{end_of_{section}}}")
+        text.append("")
+    return "\n".join(text)
+
+
+def corpus(songs: int, seed: int) -> Iterator[tuple[str, str]]:
+    """`songs` ChordPro files, about 20 songs by each artist."""
+    rng = random.Random(seed)
+    artists = [artist_name(rng) for _ in range(max(songs // 20, 1))]
+    for i in range(songs):
+        title = f"{' '.join(rng.sample(WORDS, 3)).capitalize()} {i}"
+        yield f"{i}.cho", song_text(rng, rng.choice(artists), title)
+
+
+async def seed(collection, songs: int, seed: int) -> float:
+    """Import the corpus unless the collection holds it already, in seconds."""
+    if await collection.estimated_document_count() >= songs:
+        return 0.0
+    start = time.perf_counter()
+    await importer.run_import(importer.import_chordpro(collection, corpus(songs, seed)))
+    return time.perf_counter() - start
+
+
+@dataclass
+class Data:
+    """What requests are generated from: ids and names in the database."""
+
+    song_ids: list[str]
+    artists: list[str]
+    songbook_id: str
+    rng: random.Random
+    created_songs: list[str]
+    created_songbooks: list[str]
+
+
+# A request, as the method, URL and keyword arguments of httpx.request.
+Request = tuple[str, str, dict]
+
+
+@dataclass
+class Scenario:
+    name: str
+    request: Callable[[Data, int], Request]
+    # Share of --requests sent, for the routes too slow to call that often.
+    share: float = 1.0
+    # Reads the ids of what the scenario created once it is done.
+    collect: str | None = None
+
+
+def new_song(data: Data, i: int) -> str:
+    return song_text(data.rng, LOAD_ARTIST, f"Load song {i}")
+
+
+def archive(data: Data, i: int) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as file:
+        for n in range(10):
+            title = f"Imported song {i}-{n}"
+            file.writestr(f"{i}-{n}.cho", song_text(data.rng, LOAD_ARTIST, title))
+    return buffer.getvalue()
+
+
+def song_id(data: Data, i: int) -> str:
+    return data.rng.choice(data.song_ids)
+
+
+def setlist(data: Data, songs: int) -> list[str]:
+    return data.rng.sample(data.song_ids, min(songs, len(data.song_ids)))
+
+
+# Requests on what was not created, as with --routes, get this id of nothing.
+MISSING_ID = "0" * 24
+
+
+def created(ids: list[str], i: int) -> str:
+    return ids[i % len(ids)] if ids else MISSING_ID
+
+
+def pop(ids: list[str]) -> str:
+    return ids.pop() if ids else MISSING_ID
+
+
+SCENARIOS = [
+    Scenario("index", lambda data, i: ("GET", "/", {})),
+    Scenario("songs_page", lambda data, i: ("GET", "/songs?limit=100", {})),
+    Scenario("song_html", lambda data, i: ("GET", f"/songs/{song_id(data, i)}", {})),
+    Scenario(
+        "song_transposed",
+        lambda data, i: (
+            "GET",
+            f"/songs/{song_id(data, i)}?transpose={i % 11 + 1}&capo={i % 3}",
+            {},
+        ),
+    ),
+    Scenario(
+        "song_json",
+        lambda data, i: ("GET", f"/songs/{song_id(data, i)}?format=json", {}),
+    ),
+    Scenario(
+        "song_chordpro",
+        lambda data, i: ("GET", f"/songs/{song_id(data, i)}?format=chordpro", {}),
+    ),
+    Scenario("add_form", lambda data, i: ("GET", "/songs/add", {})),
+    Scenario(
+        "edit_form",
+        lambda data, i: ("GET", f"/songs/edit/{song_id(data, i)}", {}),
+    ),
+    Scenario(
+        "artists",
+        lambda data, i: ("GET", f"/artists?letter={NAMES[i % len(NAMES)][0]}", {}),
+    ),
+    Scenario(
+        "artist",
+        lambda data, i: ("GET", f"/artist/{data.rng.choice(data.artists)}", {}),
+    ),
+    Scenario("songbook_all", lambda data, i: ("GET", "/songbook/", {}), share=0.02),
+    Scenario("songbooks", lambda data, i: ("GET", "/songbooks", {})),
+    Scenario(
+        "songbook",
+        lambda data, i: ("GET", f"/songbooks/{data.songbook_id}", {}),
+    ),
+    Scenario(
+        "export_html",
+        lambda data, i: ("GET", f"/songbooks/{data.songbook_id}/export", {}),
+        share=0.25,
+    ),
+    Scenario(
+        "export_pdf",
+        lambda data, i: ("GET", f"/songbooks/{data.songbook_id}/export?format=pdf", {}),
+        share=0.05,
+    ),
+    Scenario(
+        "api_songs_batch",
+        lambda data, i: (
+            "GET",
+            f"/api/v1/songs?ids={','.join(setlist(data, 200))}",
+            {"headers": {"Accept-Encoding": "gzip"}},
+        ),
+        share=0.25,
+    ),
+    Scenario(
+        "api_songbook",
+        lambda data, i: (
+            "GET",
+            f"/api/v1/songbooks/{data.songbook_id}",
+            {"headers": {"Accept-Encoding": "gzip"}},
+        ),
+    ),
+    Scenario(
+        "create_song",
+        lambda data, i: (
+            "POST",
+            "/songs",
+            {"data": {"input-method": "text-field", "chordpro": new_song(data, i)}},
+        ),
+        collect="songs",
+    ),
+    Scenario(
+        "update_song",
+        lambda data, i: (
+            "POST",
+            f"/songs/update/{created(data.created_songs, i)}",
+            {"data": {"chordpro": new_song(data, created(data.created_songs, i))}},
+        ),
+    ),
+    Scenario(
+        "import_songs",
+        lambda data, i: (
+            "POST",
+            "/songs/import",
+            {"files": {"archive": ("songs.zip", archive(data, i))}},
+        ),
+        share=0.05,
+        collect="songs",
+    ),
+    Scenario(
+        "create_songbook",
+        lambda data, i: ("POST", "/songbooks", {"data": {"name": f"Load book {i}"}}),
+        share=0.5,
+        collect="songbooks",
+    ),
+    Scenario(
+        "update_songbook",
+        lambda data, i: (
+            "POST",
+            f"/songbooks/{created(data.created_songbooks, i)}",
+            {"data": {"song_id": data.rng.sample(data.song_ids, 10)}},
+        ),
+    ),
+    Scenario(
+        "add_songbook_song",
+        lambda data, i: (
+            "POST",
+            f"/songbooks/{created(data.created_songbooks, i)}/songs",
+            {"data": {"song_id": song_id(data, i), "transpose": i % 12}},
+        ),
+    ),
+    Scenario(
+        "delete_songbook",
+        lambda data, i: (
+            "POST",
+            f"/songbooks/delete/{pop(data.created_songbooks)}",
+            {},
+        ),
+        share=0.5,
+    ),
+    Scenario(
+        "delete_song",
+        lambda data, i: ("POST", f"/songs/delete/{pop(data.created_songs)}", {}),
+    ),
+]
+
+
+def percentile(latencies: list[float], share: float) -> float:
+    """The latency not exceeded by `share` of the sorted `latencies`."""
+    if not latencies:
+        return math.nan
+    return latencies[min(math.ceil(share * len(latencies)), len(latencies)) - 1]
+
+
+async def drive(
+    http: httpx.AsyncClient,
+    scenario: Scenario,
+    data: Data,
+    requests: int,
+    connections: int,
+) -> dict:
+    # Requests are generated up front, so that their cost is not measured and
+    # the same seed always sends the same ones.
+    pending = [scenario.request(data, i) for i in range(requests)]
+    pending.reverse()
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+
+    async def connection():
+        while pending:
+            method, url, kwargs = pending.pop()
+            start = time.perf_counter()
+            async with http.stream(method, url, **kwargs) as response:
+                await response.aread()
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(connection() for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    errors = sum(
+        count for status, count in statuses.items() if status not in (200, 302, 501)
+    )
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "unavailable": statuses.get(501, 0) == len(latencies),
+        "throughput": len(latencies) / elapsed if elapsed else math.nan,
+        "p50_ms": percentile(latencies, 0.50) * 1e3,
+        "p95_ms": percentile(latencies, 0.95) * 1e3,
+        "p99_ms": percentile(latencies, 0.99) * 1e3,
+    }
+
+
+async def load_data(database, rng: random.Random) -> Data:
+    songs = database.songs
+    song_ids = [
+        str(document["_id"])
+        async for document in songs.find(
+            {"artist": {"$ne": LOAD_ARTIST}}, {"_id": 1}
+        ).limit(100_000)
+    ]
+    artists = await songs.distinct("artist", {"artist": {"$ne": LOAD_ARTIST}})
+    songbook = await database.songbooks.find_one_and_update(
+        {"name": "Benchmark"},
+        {
+            "$setOnInsert": {
+                "name": "Benchmark",
+                "entries": [
+                    SongbookEntry(song_id=song).to_document()
+                    for song in rng.sample(song_ids, min(len(song_ids), 50))
+                ],
+            }
+        },
+        upsert=True,
+        return_document=True,
+    )
+    return Data(song_ids, artists, str(songbook["_id"]), rng, [], [])
+
+
+async def collect(database, data: Data, kind: str):
+    if kind == "songs":
+        cursor = database.songs.find({"artist": LOAD_ARTIST}, {"_id": 1})
+        data.created_songs = [str(document["_id"]) async for document in cursor]
+    else:
+        cursor = database.songbooks.find({"name": {"$regex": "^Load book"}}, {"_id": 1})
+        data.created_songbooks = [str(document["_id"]) async for document in cursor]
+
+
+def check(results: dict, thresholds: dict) -> list[str]:
+    """The routes slower than their thresholds, as messages."""
+    regressions = []
+    for name, limits in thresholds.get("routes", {}).items():
+        result = results.get(name)
+        if result is None or result["unavailable"]:
+            continue
+        if result["errors"]:
+            regressions.append(f"{name}: {result['errors']} failed requests")
+        if result["p99_ms"] > limits["p99_ms"]:
+            regressions.append(
+                f"{name}: p99 {result['p99_ms']:.1f} ms > {limits['p99_ms']} ms"
+            )
+        if result["throughput"] < limits["min_throughput"]:
+            regressions.append(
+                f"{name}: {result['throughput']:.1f} req/s"
+                f" < {limits['min_throughput']} req/s"
+            )
+    return regressions
+
+
+def run_config(args) -> dict:
+    """What the limits of a run hold for, as compared to those of another."""
+    return {
+        "database": "mongodb" if settings.MONGODB_URI else "mongomock",
+        "driver": "http" if args.url else "asgi",
+        "songs": args.songs,
+        "requests": args.requests,
+        "connections": args.connections,
+    }
+
+
+def thresholds_for(recorded: list[dict], config: dict) -> dict | None:
+    """The limits recorded for runs like `config`, None if there are none."""
+    for thresholds in recorded:
+        if {name: thresholds.get(name) for name in config} == config:
+            return thresholds
+    return None
+
+
+def thresholds_from(results: dict, args) -> dict:
+    return {
+        **run_config(args),
+        "routes": {
+            name: {
+                "p99_ms": round(result["p99_ms"] * THRESHOLD_MARGIN, 1),
+                "min_throughput": round(result["throughput"] / THRESHOLD_MARGIN, 1),
+            }
+            for name, result in results.items()
+            if not result["unavailable"]
+        },
+    }
+
+
+async def main(args):
+    if settings.MONGODB_URI is None:
+        if args.url:
+            sys.exit("--url needs the MONGODB_URI of the server to seed.")
+        from mongomock_motor import AsyncMongoMockClient
+
+        registry.register(AsyncMongoMockClient())
+    database = registry.get().get_database(settings.MONGODB_DATABASE)
+    rng = random.Random(args.seed)
+
+    seconds = await seed(database.songs, args.songs, args.seed)
+    print(
+        f"Seeded {args.songs} songs in {seconds:.1f}s" if seconds else "Reused corpus"
+    )
+
+    async with AsyncExitStack() as stack:
+        if args.url:
+            http = httpx.AsyncClient(
+                base_url=args.url,
+                limits=httpx.Limits(max_connections=args.connections),
+                timeout=60,
+            )
+        else:
+            from main import app, lifespan
+
+            # The lifespan builds the indexes of the seeded songs, then closes
+            # the database clients on exit.
+            await stack.enter_async_context(lifespan(app))
+            transport = httpx.ASGITransport(app=app)
+            http = httpx.AsyncClient(transport=transport, base_url="http://bench")
+        await stack.enter_async_context(http)
+        data = await load_data(database, rng)
+
+        results = {}
+        for scenario in SCENARIOS:
+            if args.routes and scenario.name not in args.routes:
+                continue
+            requests = max(int(args.requests * scenario.share), 1)
+            result = await drive(http, scenario, data, requests, args.connections)
+            if scenario.collect:
+                await collect(database, data, scenario.collect)
+            results[scenario.name] = result
+            if result["unavailable"]:
+                print(f"{scenario.name:18} unavailable")
+                continue
+            print(
+                f"{scenario.name:18} {result['requests']:6} req"
+                f" {result['errors']:4} err {result['throughput']:9.1f} req/s   p50 {result['p50_ms']:8.2f}"
+                f"   p95 {result['p95_ms']:8.2f}   p99 {result['p99_ms']:8.2f} ms"
+            )
+
+        # Remove what the benchmark wrote, so that a kept corpus stays the same.
+        await database.songs.delete_many({"artist": LOAD_ARTIST})
+        await database.songbooks.delete_many({"name": {"$regex": "^Load book"}})
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+    config = run_config(args)
+    recorded = []
+    if os.path.exists(THRESHOLDS_PATH):
+        with open(THRESHOLDS_PATH) as file:
+            recorded = json.load(file)["runs"]
+    if args.update_thresholds:
+        recorded = [
+            thresholds
+            for thresholds in recorded
+            if thresholds_for([thresholds], config) is None
+        ]
+        recorded.append(thresholds_from(results, args))
+        with open(THRESHOLDS_PATH, "w") as file:
+            json.dump({"runs": recorded}, file, indent=2)
+            file.write("\n")
+    if args.check:
+        thresholds = thresholds_for(recorded, config)
+        if thresholds is None:
+            sys.exit(
+                f"No thresholds were recorded for {config}, "
+                "record them with --update-thresholds."
+            )
+        regressions = check(results, thresholds)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--songs", type=int, default=1_000)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--url", help="Base URL of a running server")
+    parser.add_argument("--routes", nargs="*", help="Only these scenarios")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--update-thresholds", action="store_true")
+    asyncio.run(main(parser.parse_args()))
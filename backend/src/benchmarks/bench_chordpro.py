@@ -0,0 +1,67 @@
+"""
+Throughput of the ChordPro parser, in MB of ChordPro text per second, when
+reading a string, a file and an async stream of byte chunks.
+
+Run from ``backend/src``::
+
+    python -m benchmarks.bench_chordpro --songs 500
+"""
+
+import argparse
+import asyncio
+import io
+import random
+import time
+
+from benchmarks.bench_storage import make_song
+from models.chordpro import parse_chordpro, parse_chordpro_stream
+
+
+def parse_string(texts: list[str]):
+    for text in texts:
+        parse_chordpro(text)
+
+
+def parse_file(texts: list[str]):
+    for text in texts:
+        parse_chordpro(io.StringIO(text))
+
+
+def parse_stream(texts: list[str], chunk_size: int):
+    async def chunks(data: bytes):
+        for i in range(0, len(data), chunk_size):
+            yield data[i : i + chunk_size]
+
+    async def parse_all():
+        for text in texts:
+            await parse_chordpro_stream(chunks(text.encode()))
+
+    asyncio.run(parse_all())
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    texts = [str(make_song(rng, args.sections, args.lines)) for _ in range(args.songs)]
+    megabytes = sum(len(text.encode()) for text in texts) / 1e6
+    print(f"{args.songs} songs, {megabytes:.1f} MB")
+
+    rows = [
+        ("string", lambda: parse_string(texts)),
+        ("file", lambda: parse_file(texts)),
+        ("stream", lambda: parse_stream(texts, args.chunk_size)),
+    ]
+    for name, run in rows:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:8} {elapsed:7.2f} s   {megabytes / elapsed:6.2f} MB/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--songs", type=int, default=500)
+    parser.add_argument("--sections", type=int, default=6)
+    parser.add_argument("--lines", type=int, default=8)
+    parser.add_argument("--chunk-size", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,75 @@
+"""
+Throughput of the chord hot paths: parsing chord labels, transposing chords
+and songs, and formatting chords back to text.
+
+Run from ``backend/src``::
+
+    python -m benchmarks.bench_chords
+"""
+
+import argparse
+import time
+
+from models.composition import Chord
+from models.song import Song
+
+LABELS = [
+    root + quality
+    for root in ("C", "C#", "Db", "D", "Eb", "E", "F", "F#", "G", "Ab", "A", "Bb", "H")
+    for quality in ("", "m", "7", "m7", "Maj7", "sus4", "dim", "/G")
+]
+
+
+def make_chordpro(sections: int, lines: int) -> str:
+    text = ["{title: Benchmark}", "{artist: Synthetic}"]
+    for i in range(sections):
+        text.append("{start_of_verse}")
+        for j in range(lines):
+            chords = [LABELS[(i * 31 + j * 7 + k) % len(LABELS)] for k in range(6)]
+            text.append("".join(f"[{chord}]word " for chord in chords))
+        text.append("{end_of_verse}")
+    return "\n".join(text)
+
+
+def throughput(function, items, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            function(item)
+    return repeat * len(items) / (time.perf_counter() - start)
+
+
+def main(args):
+    chords = [Chord.parse(label) for label in LABELS]
+    chordpro = make_chordpro(args.sections, args.lines)
+    song = Song.from_chordpro(chordpro)
+
+    results = [
+        ("Chord.parse", throughput(Chord.parse, LABELS, args.repeat), "chords"),
+        (
+            "Chord.transpose",
+            throughput(lambda chord: chord.transpose(5), chords, args.repeat),
+            "chords",
+        ),
+        ("Chord.__str__", throughput(str, chords, args.repeat), "chords"),
+        (
+            "Song.from_chordpro",
+            throughput(Song.from_chordpro, [chordpro], args.repeat // 10),
+            "songs",
+        ),
+        (
+            "Song.transpose",
+            throughput(lambda song: song.transpose(5), [song], args.repeat // 10),
+            "songs",
+        ),
+    ]
+    for name, per_second, unit in results:
+        print(f"{name:20} {per_second:12,.0f} {unit}/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sections", type=int, default=6)
+    parser.add_argument("--lines", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=1000)
+    main(parser.parse_args())
@@ -0,0 +1,70 @@
+"""
+Requests/sec of the song list with a shared MongoDB client versus one client
+per request.
+
+Run from ``backend/src`` against a local mongod::
+
+    MONGODB_URI=mongodb://localhost:27017 python -m benchmarks.bench_db_client
+
+Pass ``--mongomock`` to use an in-memory stand-in instead. Mongomock has no
+connection pool or handshake, so it only checks that the harness works; the
+numbers are meaningful against a real server.
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from database import get_db_client, registry
+from main import app
+from motor.motor_asyncio import AsyncIOMotorClient
+from settings import settings
+
+
+def make_client(mongomock: bool):
+    if mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+
+        return AsyncMongoMockClient()
+    return AsyncIOMotorClient(settings.MONGODB_URI, uuidRepresentation="standard")
+
+
+async def run(requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        queue = asyncio.Queue()
+        for _ in range(requests):
+            queue.put_nowait(None)
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                response = await http.get("/songs")
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+async def main(args):
+    registry.register(make_client(args.mongomock))
+    shared = await run(args.requests, args.concurrency)
+
+    app.dependency_overrides[get_db_client] = lambda: make_client(args.mongomock)
+    per_request = await run(args.requests, args.concurrency)
+    app.dependency_overrides.clear()
+    registry.close()
+
+    print(f"client per request: {per_request:10.1f} req/s")
+    print(f"shared client:      {shared:10.1f} req/s")
+    print(f"speedup:            {shared / per_request:10.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mongomock", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,76 @@
+"""
+Time to export a songbook as print-ready HTML (and PDF, if WeasyPrint is
+installed) with an empty print cache, with a warm one, and after one song
+changed.
+
+Run from ``backend/src``::
+
+    python -m benchmarks.bench_export --songs 500 --workers 4
+
+Songs are kept in mongomock, so the numbers measure rendering rather than
+the database.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import export
+from benchmarks.bench_storage import make_song
+from models.songbook import Songbook, SongbookEntry
+from models.storage import to_document
+from mongomock_motor import AsyncMongoMockClient
+from workers import WorkerPool
+
+
+async def timed(label: str, function, *args):
+    start = time.perf_counter()
+    try:
+        result = await function(*args)
+    except export.ExportUnavailable as e:
+        print(f"{label:22} skipped: {e}")
+        return
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:22} {elapsed:9.1f} ms   {len(result) / 1e6:.1f} MB")
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    collection = AsyncMongoMockClient().get_database("bench").songs
+    documents = [
+        to_document(make_song(rng, args.sections, args.lines))
+        for _ in range(args.songs)
+    ]
+    result = await collection.insert_many(documents)
+    songbook = Songbook(
+        name="Benchmark",
+        entries=[
+            SongbookEntry(song_id=str(song_id), transpose=rng.choice([0, 0, 0, 2]))
+            for song_id in result.inserted_ids
+        ],
+    )
+    pool = WorkerPool(args.workers)
+    # Start the worker processes before timing.
+    await asyncio.gather(
+        *(pool.run(time.sleep, 0.5) for _ in range(max(args.workers, 1)))
+    )
+
+    await timed("html cold", export.render_book, collection, songbook, pool)
+    await timed("html warm", export.render_book, collection, songbook, pool)
+    changed = result.inserted_ids[0]
+    await collection.update_one({"_id": changed}, {"$inc": {"revision": 1}})
+    await timed("html one song changed", export.render_book, collection, songbook, pool)
+    await timed("pdf cold", export.render_book_pdf, collection, songbook, pool)
+    await timed("pdf warm", export.render_book_pdf, collection, songbook, pool)
+    pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--songs", type=int, default=500)
+    parser.add_argument("--sections", type=int, default=6)
+    parser.add_argument("--lines", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
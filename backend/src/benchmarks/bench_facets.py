@@ -0,0 +1,106 @@
+"""
+p50/p99 latency of /filter_songs queries, one page of songs plus the facet
+counts, over a synthetic library.
+
+Run from ``backend/src`` against a local mongod::
+
+    MONGODB_URI=mongodb://localhost:27017 \\
+        python -m benchmarks.bench_facets --songs 100000
+
+Songs are written to a scratch ``songbook_bench`` database, which is dropped
+afterwards. Pass ``--mongomock`` to check the harness in memory; mongomock
+uses no indexes, so only numbers against a real server are meaningful.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from facets import facet_counts, facet_query
+from indexes import ensure_indexes
+from models.song import Difficulty, SongSummary
+from motor.motor_asyncio import AsyncIOMotorClient
+from pagination import paginate
+from settings import settings
+
+GENRES = ["rock", "pop", "jazz", "classical", "folk", "blues", "country", "metal"]
+
+
+def make_client(mongomock: bool):
+    if mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+
+        return AsyncMongoMockClient()
+    return AsyncIOMotorClient(settings.MONGODB_URI)
+
+
+def make_documents(rng: random.Random, songs: int, artists: int) -> list[dict]:
+    return [
+        {
+            "title": f"Song {i}",
+            "artist": f"Artist {rng.randrange(artists)}",
+            "difficulty": rng.choice(list(Difficulty)).value,
+            "genre": rng.choice(GENRES),
+        }
+        for i in range(songs)
+    ]
+
+
+def make_filters(rng: random.Random, artists: int) -> dict:
+    filters = {
+        "difficulty": rng.choice([None, *[d.value for d in Difficulty]]),
+        "genre": rng.choice([None, *GENRES]),
+    }
+    if rng.random() < 0.2:
+        filters["artist"] = f"Artist {rng.randrange(artists)}"
+    return filters
+
+
+def percentile(samples: list[float], q: float) -> float:
+    return statistics.quantiles(samples, n=100, method="inclusive")[int(q) - 1]
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    client = make_client(args.mongomock)
+    database = client.get_database("songbook_bench")
+    collection = database.songs
+    await collection.drop()
+    documents = make_documents(rng, args.songs, args.artists)
+    for start in range(0, len(documents), 10000):
+        await collection.insert_many(documents[start : start + 10000])
+    await ensure_indexes(database)
+
+    timings = []
+    for _ in range(args.queries):
+        query = facet_query(**make_filters(rng, args.artists))
+        start = time.perf_counter()
+        await asyncio.gather(
+            paginate(
+                collection,
+                query,
+                ["artist", "title"],
+                limit=50,
+                projection=SongSummary.projection,
+            ),
+            facet_counts(collection, query),
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+
+    await client.drop_database("songbook_bench")
+    print(
+        f"{args.songs} songs, {args.queries} queries: "
+        f"p50 {percentile(timings, 50):.1f} ms, p99 {percentile(timings, 99):.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--songs", type=int, default=100000)
+    parser.add_argument("--artists", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mongomock", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,102 @@
+"""
+Latency of ``GET /songs/{id}`` while large songs are being added, with song
+parsing run inline on the event loop, in threads or in worker processes.
+
+Run from ``backend/src``::
+
+    python -m benchmarks.bench_latency --workers 2
+
+Songs are stored in mongomock and requests are sent in process, so the
+numbers show how long the event loop is held up rather than real network or
+database latency.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+from benchmarks.bench_storage import make_song
+from database import registry
+from main import app
+from models.storage import to_document
+from mongomock_motor import AsyncMongoMockClient
+from settings import settings
+from workers import parse_pool
+
+
+async def inline(function, *args, wait=False):
+    return function(*args)
+
+
+async def measure(args, mode: str) -> tuple[list[float], int]:
+    client = AsyncMongoMockClient()
+    registry.register(client)
+    songs = client.get_database(settings.MONGODB_DATABASE).songs
+    rng = random.Random(args.seed)
+    result = await songs.insert_one(to_document(make_song(rng, 4, 6)))
+    song_url = f"/songs/{result.inserted_id}"
+    large = str(make_song(rng, args.sections, args.lines))
+
+    parse_pool.close()
+    parse_pool.workers = args.workers if mode == "processes" else 0
+    parse_pool.max_pending = None
+    # Inline is how songs were parsed before the pool, on the event loop.
+    vars(parse_pool).pop("run", None)
+    if mode == "inline":
+        parse_pool.run = inline
+    # Start the worker processes before timing.
+    await parse_pool.run(time.sleep, 0)
+
+    latencies: list[float] = []
+    added = 0
+    done = asyncio.Event()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+
+        async def read():
+            while not done.is_set():
+                start = time.perf_counter()
+                response = await http.get(song_url)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        async def write():
+            nonlocal added
+            for i in range(args.songs):
+                text = large.replace("{title: Benchmark}", f"{{title: Song {i}}}")
+                data = {"input-method": "text-field", "chordpro": text}
+                await http.post("/songs", data=data)
+                added += 1
+            done.set()
+
+        await asyncio.gather(write(), *(read() for _ in range(args.readers)))
+    registry.close()
+    return latencies, added
+
+
+async def main(args):
+    for mode in ("inline", "threads", "processes"):
+        start = time.perf_counter()
+        latencies, added = await measure(args, mode)
+        elapsed = time.perf_counter() - start
+        p50 = statistics.median(latencies) * 1e3
+        p99 = statistics.quantiles(latencies, n=100)[98] * 1e3
+        print(
+            f"{mode:10} GET p50 {p50:7.1f} ms  p99 {p99:7.1f} ms"
+            f"   {len(latencies):5} reads   {added / elapsed:5.1f} songs/s"
+        )
+    parse_pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--songs", type=int, default=20)
+    parser.add_argument("--sections", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=12)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,83 @@
+"""
+Memory of idle live connections, and the time to deliver one event to all of
+them, with every connection following one of a few songbooks.
+
+Run from ``backend/src``::
+
+    python -m benchmarks.bench_live --connections 5000
+
+Each connection runs the event stream of ``GET /songbooks/{id}/live`` in its
+own task without a socket, so the numbers leave out the server's per socket
+buffers.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+
+import live
+from routes.songbook import songbook_events
+
+
+async def main(args):
+    hub = live.hub = live.Hub()
+    delivered = asyncio.Event()
+    received = 0
+
+    async def follow(songbook_id: str):
+        nonlocal received
+        subscriber = hub.subscribe(songbook_id)
+        async for message in songbook_events(subscriber, {"entries": []}):
+            if message.startswith(b"event: song\n"):
+                received += 1
+                if received == args.connections:
+                    delivered.set()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tasks = [
+        asyncio.create_task(follow(f"songbook-{i % args.songbooks}"))
+        for i in range(args.connections)
+    ]
+    await asyncio.sleep(0.1)
+    grown = sum(
+        stat.size_diff
+        for stat in tracemalloc.take_snapshot().compare_to(before, "filename")
+    )
+    tracemalloc.stop()
+    print(
+        f"{args.connections} idle connections: {grown / 2**20:.1f} MiB, "
+        f"{grown / args.connections / 1024:.1f} KiB each"
+    )
+
+    song = {"id": "0" * 24, "revision": 1, "versions": {"0": "x" * args.size}}
+    timings = []
+    for _ in range(args.events):
+        received = 0
+        delivered.clear()
+        start = time.perf_counter()
+        for i in range(args.songbooks):
+            hub.publish(f"songbook-{i}", "song", song)
+        await delivered.wait()
+        timings.append(time.perf_counter() - start)
+    print(
+        f"one {args.size} byte event to all: "
+        f"p50 {statistics.median(timings) * 1e3:.1f} ms, "
+        f"max {max(timings) * 1e3:.1f} ms"
+    )
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert hub.connections == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--songbooks", type=int, default=10)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--size", type=int, default=4096)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,81 @@
+"""
+Rendering time of a songbook page, with a template environment built for
+each request or shared, and with sections rendered on every request or
+stitched together from the fragments stored with each song.
+
+Run from ``backend/src``::
+
+    python -m benchmarks.bench_render --songs 500
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks.bench_storage import make_song
+from markupsafe import Markup
+from models.storage import from_document, to_document
+from rendering import make_environment, templates
+
+
+def render_per_request(documents: list[dict]) -> str:
+    env = make_environment()
+    section = env.get_template("section.html")
+    songs = []
+    for document in documents:
+        song = from_document(document)
+        fragments = [Markup(section.render(section=part)) for part in song.sections]
+        songs.append({**document, "fragments": fragments})
+    return env.get_template("songbook.html").render(songs=songs)
+
+
+def render_shared(documents: list[dict]) -> str:
+    section = templates.get_template("section.html")
+    songs = []
+    for document in documents:
+        song = from_document(document)
+        fragments = [Markup(section.render(section=part)) for part in song.sections]
+        songs.append({**document, "fragments": fragments})
+    return templates.get_template("songbook.html").render(songs=songs)
+
+
+def render_fragments(documents: list[dict]) -> str:
+    songs = [
+        {**document, "fragments": [Markup(f) for f in document["fragments"]]}
+        for document in documents
+    ]
+    return templates.get_template("songbook.html").render(songs=songs)
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    documents = [
+        to_document(make_song(rng, args.sections, args.lines))
+        for _ in range(args.songs)
+    ]
+
+    for name, render in [
+        ("per-request env", render_per_request),
+        ("shared env", render_shared),
+        ("stored fragments", render_fragments),
+    ]:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            page = render(documents)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(
+            f"{name:17} p50 {statistics.median(timings):8.1f} ms"
+            f"   max {max(timings):8.1f} ms   {len(page) / 1e6:.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--songs", type=int, default=500)
+    parser.add_argument("--sections", type=int, default=6)
+    parser.add_argument("--lines", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,76 @@
+"""
+p50/p99 latency of trigram search queries over a synthetic song library.
+
+Run from ``backend/src``::
+
+    python -m benchmarks.bench_search --songs 100000
+
+Songs are built from a random vocabulary, so the numbers measure the index
+and not the MongoDB text search, which runs on the server.
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from search import TrigramIndex
+
+SYLLABLES = [
+    c + v for c in "bcdfghjklmnprstvz" for v in ("a", "e", "i", "o", "u", "ou", "ai")
+]
+
+
+def make_vocabulary(rng: random.Random, size: int) -> list[str]:
+    return ["".join(rng.choices(SYLLABLES, k=rng.randint(1, 4))) for _ in range(size)]
+
+
+def make_typo(rng: random.Random, word: str) -> str:
+    if len(word) < 5:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1 :]
+
+
+def percentile(samples: list[float], q: float) -> float:
+    return statistics.quantiles(samples, n=100, method="inclusive")[int(q) - 1]
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+    index = TrigramIndex()
+
+    start = time.perf_counter()
+    for song_id in range(args.songs):
+        words = rng.choices(vocabulary, k=args.words)
+        index.add(str(song_id), " ".join(words))
+    print(f"indexed {args.songs} songs in {time.perf_counter() - start:.1f}s")
+
+    queries = {
+        "exact": lambda: rng.choice(vocabulary),
+        "prefix": lambda: rng.choice(vocabulary)[:4],
+        "typo": lambda: make_typo(rng, rng.choice(vocabulary)),
+        "two words": lambda: " ".join(rng.choices(vocabulary, k=2)),
+    }
+    for name, make_query in queries.items():
+        samples = []
+        for _ in range(args.queries):
+            query = make_query()
+            start = time.perf_counter()
+            index.search(query, limit=50)
+            samples.append((time.perf_counter() - start) * 1000)
+        print(
+            f"{name:10} p50 {percentile(samples, 50):7.2f} ms"
+            f"   p99 {percentile(samples, 99):7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--songs", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=150)
+    parser.add_argument("--vocabulary", type=int, default=30_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
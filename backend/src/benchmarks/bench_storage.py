@@ -0,0 +1,69 @@
+"""
+Document size and encode/decode speed of the compact song storage format
+against the original nested model dump.
+
+Run from ``backend/src``::
+
+    python -m benchmarks.bench_storage
+"""
+
+import argparse
+import random
+import time
+
+import bson
+from models.composition import chromatic_scale
+from models.song import Song
+from models.storage import encode_song, from_document
+
+QUALITIES = ["", "m", "7", "m7", "Maj7", "sus4"]
+WORDS = "love heart night road home fire rain dream light time way down".split()
+
+
+def make_song(rng: random.Random, sections: int, lines: int) -> Song:
+    chords = [rng.choice(chromatic_scale) + rng.choice(QUALITIES) for _ in range(6)]
+    text = ["{title: Benchmark}", "{artist: Synthetic}", ""]
+    for _ in range(sections):
+        text.append("{start_of_verse}")
+        for _ in range(lines):
+            words = [f"[{rng.choice(chords)}]{rng.choice(WORDS)} " for _ in range(6)]
+            text.append("".join(words))
+        text.append("{end_of_verse}")
+    return Song.from_chordpro("\n".join(text))
+
+
+def timed(function, argument, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(argument)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(args):
+    song = make_song(random.Random(args.seed), args.sections, args.lines)
+    nested = song.model_dump(by_alias=True, exclude=["id"])
+    compact = encode_song(song)
+
+    def dump_nested(song):
+        return song.model_dump(by_alias=True, exclude=["id"])
+
+    rows = [
+        ("nested", len(bson.encode(nested)), dump_nested, nested),
+        ("compact", len(bson.encode(compact)), encode_song, compact),
+    ]
+    for name, size, encode, document in rows:
+        encode_us = timed(encode, song, args.repeat)
+        decode_us = timed(from_document, document, args.repeat)
+        print(
+            f"{name:8} {size:8} bytes   encode {encode_us:9.1f} us"
+            f"   decode {decode_us:9.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sections", type=int, default=6)
+    parser.add_argument("--lines", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,59 @@
+"""
+Time to extract the tab data from saved Ultimate Guitar pages with a full
+BeautifulSoup tree against the targeted scan, and to parse the whole song.
+
+Run from ``backend/src``::
+
+    python -m benchmarks.bench_ultimate_guitar
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+
+from models.ultimate_guitar import extract_store, parse_page
+
+FIXTURES = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "fixtures", "ultimate_guitar"
+)
+
+
+def extract_soup(page: str) -> dict:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page, "lxml")
+    return json.loads(soup.find("div", {"class": "js-store"})["data-content"])
+
+
+def timed(function, pages: list[str], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            function(page)
+    return (time.perf_counter() - start) / repeat / len(pages) * 1e3
+
+
+def main(args):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(args.fixtures, "*.html"))):
+        with open(path, encoding="utf-8") as file:
+            pages.append(file.read())
+    size = sum(len(page) for page in pages) / len(pages) / 1024
+    print(f"{len(pages)} pages, {size:.0f} KB on average")
+
+    rows = [
+        ("soup extract", extract_soup),
+        ("scan extract", extract_store),
+        ("scan + parse", parse_page),
+    ]
+    for name, function in rows:
+        print(f"{name:14} {timed(function, pages, args.repeat):8.2f} ms per page")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--fixtures", default=FIXTURES)
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,95 @@
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any
+
+from settings import settings
+
+
+class RenderedPage:
+    """A rendered representation of a song with the validators for its caching."""
+
+    __slots__ = ("content", "media_type", "etag", "last_modified")
+
+    def __init__(self, content: str, media_type: str, last_modified: datetime):
+        self.content = content.encode()
+        self.media_type = media_type
+        self.etag = f'"{hashlib.sha1(self.content).hexdigest()}"'
+        self.last_modified = last_modified
+
+    def __len__(self) -> int:
+        return len(self.content)
+
+
+class SongCache:
+    """
+    Least recently used cache of values derived from songs, such as rendered
+    pages, keyed by tuples whose first item is the song id. It holds at most
+    `max_size` entries whose lengths add up to at most `max_bytes`.
+
+    Entries of a song are dropped together when the song is updated or deleted.
+    The cache lives in the memory of one server process.
+    """
+
+    def __init__(self, max_size: int | None = None, max_bytes: int | None = None):
+        self.max_size = max_size or settings.SONG_CACHE_SIZE
+        self.max_bytes = max_bytes or settings.SONG_CACHE_MAX_BYTES
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, Any] = OrderedDict()
+        self._song_keys: dict[str, set[tuple]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple) -> Any | None:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: tuple, value: Any):
+        self._remove(key)
+        self._entries[key] = value
+        self.size_bytes += _size(value)
+        self._song_keys.setdefault(key[0], set()).add(key)
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_size or self.size_bytes > self.max_bytes
+        ):
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, song_id: str):
+        for key in list(self._song_keys.get(song_id, ())):
+            self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._song_keys.clear()
+        self.size_bytes = 0
+
+    def _remove(self, key: tuple):
+        if key not in self._entries:
+            return
+        self.size_bytes -= _size(self._entries.pop(key))
+        self._discard_key(key)
+
+    def _discard_key(self, key: tuple):
+        keys = self._song_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._song_keys[key[0]]
+
+
+def _size(value: Any) -> int:
+    try:
+        return len(value)
+    except TypeError:
+        return 0
+
+
+song_cache = SongCache()
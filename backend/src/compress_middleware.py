@@ -0,0 +1,136 @@
+"""
+Compression of responses, with brotli when the client accepts it and the
+brotli package is installed, and gzip otherwise.
+
+Streamed responses are compressed as they are sent, with every part flushed,
+so that import progress and streamed pages still arrive part by part. Event
+streams are sent as they are, as are small and already compressed responses.
+"""
+
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # Optional, gzip compresses JSON and HTML a little less.
+    brotli = None
+
+MINIMUM_SIZE = 512
+GZIP_LEVEL = 6
+# Brotli's quality 11 is too slow to compress responses on the fly.
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = (
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/javascript",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "image/svg+xml",
+)
+
+
+class GzipCompressor:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + 15)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        flush = zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+        return self._compressor.compress(data) + self._compressor.flush(flush)
+
+
+class BrotliCompressor:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.process(data)
+        return output + (
+            self._compressor.finish() if final else self._compressor.flush()
+        )
+
+
+COMPRESSORS = {"gzip": GzipCompressor}
+if brotli is not None:
+    COMPRESSORS = {"br": BrotliCompressor, **COMPRESSORS}
+
+
+def accepted_encoding(accept_encoding: str) -> str | None:
+    """The preferred encoding of ours the client accepts, None for none."""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        name, _, parameters = item.partition(";")
+        quality = parameters.strip().removeprefix("q=")
+        try:
+            if parameters and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name.strip().lower())
+    return next((name for name in COMPRESSORS if name in accepted), None)
+
+
+def compressible(headers: Headers) -> bool:
+    media_type = headers.get("content-type", "").partition(";")[0].strip()
+    return "content-encoding" not in headers and media_type in COMPRESSIBLE_TYPES
+
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = accepted_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                # Held back until the first part of the body shows its size.
+                start = message
+                return
+            if message["type"] != "http.response.body" or (
+                start is None and compressor is None
+            ):
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=list(start["headers"]))
+                if not compressible(headers) or (
+                    not more_body and len(body) < MINIMUM_SIZE
+                ):
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+                compressor = COMPRESSORS[encoding]()
+                del headers["content-length"]
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                # The compressed body is not byte for byte the one tagged.
+                etag = headers.get("etag")
+                if etag is not None and not etag.startswith("W/"):
+                    headers["etag"] = f"W/{etag}"
+                await send({**start, "headers": headers.raw})
+                start = None
+
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": compressor.compress(body, final=not more_body),
+                    "more_body": more_body,
+                }
+            )
+
+        await self.app(scope, receive, send_compressed)
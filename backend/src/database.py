@@ -1,13 +1,187 @@
+import threading
+import time
+
+import metrics
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 from settings import settings
 from utils import get_logger
 
 logger = get_logger(__file__)
 
 
-def get_db_client():
-    if settings.MONGODB_URI is None:
-        logger.error("No database URI provided. Set the MONGODB_URI variable.")
-        exit(1)
-    client = AsyncIOMotorClient(settings.MONGODB_URI, uuidRepresentation="standard")
-    return client
+class PoolStats(monitoring.ConnectionPoolListener):
+    """
+    Collects connection pool checkout statistics from pymongo pool events,
+    which arrive on the threads of the driver, so they are counted under a
+    lock.
+    """
+
+    def __init__(self):
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_wait_total_ms = 0.0
+        self.checkout_wait_max_ms = 0.0
+        self._checkout_started: dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "connections_open": self.connections_created - self.connections_closed,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "checked_out": self.checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "checkout_wait_avg_ms": (
+                    self.checkout_wait_total_ms / self.checkouts
+                    if self.checkouts
+                    else 0.0
+                ),
+                "checkout_wait_max_ms": self.checkout_wait_max_ms,
+            }
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        # Events of one checkout are delivered on the thread performing it.
+        self._checkout_started[threading.get_ident()] = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._checkout_started.pop(threading.get_ident(), None)
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        started = self._checkout_started.pop(threading.get_ident(), None)
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            if started is not None:
+                wait_ms = (time.perf_counter() - started) * 1000
+                self.checkout_wait_total_ms += wait_ms
+                self.checkout_wait_max_ms = max(self.checkout_wait_max_ms, wait_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+
+class CommandTimings(monitoring.CommandListener):
+    """Records the duration of every MongoDB command in the server metrics."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        metrics.mongodb_command_seconds.observe(
+            event.duration_micros / 1e6, event.command_name
+        )
+
+    def failed(self, event):
+        metrics.mongodb_command_seconds.observe(
+            event.duration_micros / 1e6, event.command_name
+        )
+        metrics.mongodb_command_failures.inc(event.command_name)
+
+
+command_timings = CommandTimings()
+
+
+class ClientRegistry:
+    """
+    Holds the MongoDB clients shared by the whole application.
+
+    A client owns a connection pool and background monitor threads, so it is
+    created once when the application starts and closed when it shuts down.
+    """
+
+    def __init__(self):
+        self._clients: dict[str, AsyncIOMotorClient] = {}
+        self._pool_stats: dict[str, PoolStats] = {}
+
+    def connect(self, name: str = "default", uri: str | None = None):
+        uri = uri or settings.MONGODB_URI
+        if uri is None:
+            logger.error("No database URI provided. Set the MONGODB_URI variable.")
+            exit(1)
+
+        pool_stats = PoolStats()
+        client = AsyncIOMotorClient(
+            uri,
+            uuidRepresentation="standard",
+            maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+            maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+            connectTimeoutMS=settings.MONGODB_CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=settings.MONGODB_SOCKET_TIMEOUT_MS,
+            serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            readPreference=settings.MONGODB_READ_PREFERENCE,
+            event_listeners=[pool_stats, command_timings],
+        )
+        self.register(client, name, pool_stats)
+        logger.info(
+            "Connected MongoDB client '%s' (maxPoolSize=%d, readPreference=%s)",
+            name,
+            settings.MONGODB_MAX_POOL_SIZE,
+            settings.MONGODB_READ_PREFERENCE,
+        )
+        return client
+
+    def register(
+        self,
+        client: AsyncIOMotorClient,
+        name: str = "default",
+        pool_stats: PoolStats | None = None,
+    ):
+        self._clients[name] = client
+        self._pool_stats[name] = pool_stats or PoolStats()
+
+    def get(self, name: str = "default") -> AsyncIOMotorClient:
+        client = self._clients.get(name)
+        if client is None:
+            client = self.connect(name)
+        return client
+
+    def pool_stats(self) -> dict[str, dict]:
+        return {name: stats.as_dict() for name, stats in self._pool_stats.items()}
+
+    def close(self):
+        for name, client in self._clients.items():
+            client.close()
+            logger.info("Closed MongoDB client '%s'", name)
+        self._clients.clear()
+        self._pool_stats.clear()
+
+
+registry = ClientRegistry()
+
+
+def get_db_client() -> AsyncIOMotorClient:
+    return registry.get()
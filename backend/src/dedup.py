@@ -0,0 +1,180 @@
+"""
+Duplicate and near-duplicate songs, found through their fingerprints.
+
+New songs are checked when they are inserted, and a song matching older ones
+is flagged with their ids in `duplicate_of`. The report finds every group of
+duplicates in an existing library, from the fingerprint indexes instead of
+comparing songs pairwise.
+
+Run from ``backend/src``, after ``python -m migrate`` has fingerprinted older
+songs::
+
+    MONGODB_URI=mongodb://localhost:27017 python -m dedup
+    MONGODB_URI=mongodb://localhost:27017 python -m dedup --flag
+"""
+
+import argparse
+import asyncio
+from collections import defaultdict
+from collections.abc import Iterable
+
+from models.fingerprint import is_duplicate
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+from settings import settings
+from utils import get_logger
+
+logger = get_logger(__file__)
+
+PROJECTION = {"artist": 1, "title": 1, "fingerprint": 1}
+
+
+def candidates_query(fingerprints: Iterable[dict]) -> dict:
+    """Songs sharing a key or a band with any of `fingerprints`."""
+    keys, bands = set(), set()
+    for fingerprint in fingerprints:
+        keys.add(fingerprint["key"])
+        bands.update(fingerprint["bands"])
+    return {
+        "$or": [
+            {"fingerprint.key": {"$in": sorted(keys)}},
+            {"fingerprint.bands": {"$in": sorted(bands)}},
+        ]
+    }
+
+
+async def find_duplicates(
+    collection: AsyncIOMotorCollection, documents: list[dict]
+) -> dict:
+    """
+    Ids of the older songs each of the inserted `documents` duplicates, by id,
+    for the documents that duplicate any.
+    """
+    if not documents:
+        return {}
+    query = candidates_query(document["fingerprint"] for document in documents)
+    candidates = await collection.find(query, PROJECTION).to_list(None)
+    duplicates = {}
+    for document in documents:
+        matches = [
+            candidate["_id"]
+            for candidate in candidates
+            if candidate["_id"] < document["_id"]
+            and "fingerprint" in candidate
+            and is_duplicate(candidate["fingerprint"], document["fingerprint"])
+        ]
+        if matches:
+            duplicates[document["_id"]] = matches
+    return duplicates
+
+
+async def flag_duplicates(
+    collection: AsyncIOMotorCollection, documents: list[dict]
+) -> int:
+    """Flag the inserted `documents` that duplicate older songs, returning how many."""
+    duplicates = await find_duplicates(collection, documents)
+    if duplicates:
+        await collection.bulk_write(
+            [
+                UpdateOne({"_id": song_id}, {"$set": {"duplicate_of": matches}})
+                for song_id, matches in duplicates.items()
+            ],
+            ordered=False,
+        )
+        logger.info("Flagged %d duplicate songs", len(duplicates))
+    return len(duplicates)
+
+
+class DisjointSet:
+    def __init__(self):
+        self.parents: dict = {}
+
+    def find(self, item):
+        parent = self.parents.setdefault(item, item)
+        if parent != item:
+            parent = self.parents[item] = self.find(parent)
+        return parent
+
+    def union(self, first, second):
+        self.parents[self.find(first)] = self.find(second)
+
+
+async def duplicate_groups(collection: AsyncIOMotorCollection) -> list[list[dict]]:
+    """
+    Every group of duplicate songs, oldest song first.
+
+    Songs are only compared within a bucket of songs sharing a key or a band.
+    """
+    songs = {
+        document["_id"]: document
+        async for document in collection.find(
+            {"fingerprint": {"$exists": True}}, PROJECTION
+        )
+    }
+    groups = DisjointSet()
+    for field in ("key", "bands"):
+        pipeline = [
+            {"$match": {"fingerprint": {"$exists": True}}},
+            {"$project": {"fingerprint": 1}},
+            # Unwinding a key does nothing, unwinding bands buckets by each band.
+            {"$unwind": f"$fingerprint.{field}"},
+            {"$group": {"_id": f"$fingerprint.{field}", "ids": {"$push": "$_id"}}},
+            {"$match": {"ids.1": {"$exists": True}}},
+        ]
+        async for bucket in collection.aggregate(pipeline, allowDiskUse=True):
+            ids = bucket["ids"]
+            for i, first in enumerate(ids):
+                for second in ids[i + 1 :]:
+                    if is_duplicate(
+                        songs[first]["fingerprint"], songs[second]["fingerprint"]
+                    ):
+                        groups.union(first, second)
+
+    members = defaultdict(list)
+    for song_id in list(groups.parents):
+        members[groups.find(song_id)].append(songs[song_id])
+    return sorted(
+        (sorted(group, key=lambda song: song["_id"]) for group in members.values()),
+        key=lambda group: group[0]["_id"],
+    )
+
+
+async def flag_groups(
+    collection: AsyncIOMotorCollection, groups: list[list[dict]]
+) -> int:
+    """Flag every song of `groups` but the oldest one, returning how many."""
+    updates = [
+        UpdateOne(
+            {"_id": song["_id"]},
+            {"$set": {"duplicate_of": [older["_id"] for older in group[:i]]}},
+        )
+        for group in groups
+        for i, song in enumerate(group)
+        if i > 0
+    ]
+    if updates:
+        await collection.bulk_write(updates, ordered=False)
+    return len(updates)
+
+
+async def main(args):
+    from database import registry
+
+    collection = registry.connect().get_database(settings.MONGODB_DATABASE).songs
+    groups = await duplicate_groups(collection)
+    for group in groups:
+        print(" = ".join(f"{song['artist']} - {song['title']}" for song in group))
+        print("  " + " ".join(str(song["_id"]) for song in group))
+    duplicates = sum(len(group) - 1 for group in groups)
+    print(f"{len(groups)} groups of duplicates, {duplicates} songs to remove.")
+    if args.flag:
+        print(f"Flagged {await flag_groups(collection, groups)} songs.")
+    registry.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--flag", action="store_true", help="Set duplicate_of of every duplicate"
+    )
+    asyncio.run(main(parser.parse_args()))
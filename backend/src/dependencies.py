@@ -2,33 +2,39 @@ from database import get_db_client
 from fastapi import Depends
 from fastapi.templating import Jinja2Templates
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from rendering import streaming_templates, templates
+from settings import settings
 
 
 async def get_collection_songs(
     db_client: AsyncIOMotorClient = Depends(get_db_client),
 ) -> AsyncIOMotorCollection:
-    db = db_client.get_database("songbook")
+    db = db_client.get_database(settings.MONGODB_DATABASE)
     return db.get_collection("songs")
 
 
 async def get_collection_songbooks(
     db_client: AsyncIOMotorClient = Depends(get_db_client),
 ) -> AsyncIOMotorCollection:
-    db = db_client.get_database("songbook")
+    db = db_client.get_database(settings.MONGODB_DATABASE)
     return db.get_collection("songbooks")
 
 
 async def get_collection_artists(
     db_client: AsyncIOMotorClient = Depends(get_db_client),
 ):
-    db = db_client.get_database("songbook")
+    db = db_client.get_database(settings.MONGODB_DATABASE)
     return db.get_collection("artists")
 
 
 async def get_collection_users(db_client: AsyncIOMotorClient = Depends(get_db_client)):
-    db = db_client.get_database("songbook")
+    db = db_client.get_database(settings.MONGODB_DATABASE)
     return db.get_collection("users")
 
 
-def get_templates():
-    return Jinja2Templates(directory="static/templates")
+def get_templates() -> Jinja2Templates:
+    return templates
+
+
+def get_streaming_templates() -> Jinja2Templates:
+    return streaming_templates
@@ -0,0 +1,153 @@
+"""
+The artist directory: one document per artist in the `artists` collection,
+with its song count and song titles, kept in step with the songs.
+
+Every write of songs updates the directory incrementally, so browsing artists
+reads one page of the `artists` collection instead of grouping the songs.
+The whole directory can be rebuilt from the songs to repair drift.
+
+Run from ``backend/src``::
+
+    MONGODB_URI=mongodb://localhost:27017 python -m directory
+"""
+
+import argparse
+import asyncio
+import string
+from collections import defaultdict
+from collections.abc import Iterable
+
+from models.utils import normalize
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import DeleteMany, UpdateOne
+from settings import settings
+from utils import get_logger
+
+logger = get_logger(__file__)
+
+LETTERS = [*string.ascii_uppercase, "#"]
+
+
+def artists_collection(songs: AsyncIOMotorCollection) -> AsyncIOMotorCollection:
+    """The directory of the artists of `songs`, in the same database."""
+    return songs.database.get_collection("artists")
+
+
+def sort_key(name: str) -> str:
+    """Lowercase `name` without accents or a leading 'the', e.g. 'beatles'."""
+    key = " ".join(normalize(name).split())
+    return key.removeprefix("the ") or key
+
+
+def letter(name: str) -> str:
+    """The letter `name` is listed under in the A-Z index, '#' if not a letter."""
+    initial = sort_key(name)[:1].upper()
+    return initial if initial in string.ascii_uppercase else "#"
+
+
+def entry(document: dict) -> dict:
+    return {"_id": document["_id"], "title": document["title"]}
+
+
+def add_songs_updates(documents: Iterable[dict]) -> list[UpdateOne]:
+    """One upsert per artist adding the songs, which must have an `_id`."""
+    by_artist = defaultdict(list)
+    for document in documents:
+        by_artist[document["artist"]].append(entry(document))
+    return [
+        UpdateOne(
+            {"name": artist},
+            {
+                "$inc": {"song_count": len(songs)},
+                "$push": {"songs": {"$each": songs}},
+                "$setOnInsert": {
+                    "sort_key": sort_key(artist),
+                    "letter": letter(artist),
+                },
+            },
+            upsert=True,
+        )
+        for artist, songs in by_artist.items()
+    ]
+
+
+def remove_song_updates(document: dict) -> list:
+    return [
+        UpdateOne(
+            {"name": document["artist"], "songs._id": document["_id"]},
+            {"$inc": {"song_count": -1}, "$pull": {"songs": {"_id": document["_id"]}}},
+        ),
+        DeleteMany({"name": document["artist"], "song_count": {"$lte": 0}}),
+    ]
+
+
+async def add_songs(artists: AsyncIOMotorCollection, documents: Iterable[dict]):
+    updates = add_songs_updates(documents)
+    if updates:
+        await artists.bulk_write(updates, ordered=False)
+
+
+async def remove_song(artists: AsyncIOMotorCollection, document: dict):
+    """Remove a song, given its stored document, and its artist if it was the last."""
+    await artists.bulk_write(remove_song_updates(document))
+
+
+async def replace_song(artists: AsyncIOMotorCollection, old: dict, new: dict):
+    """Move a song from its `old` artist and title to the `new` ones."""
+    if (old["artist"], old["title"]) != (new["artist"], new["title"]):
+        await remove_song(artists, old)
+        await add_songs(artists, [new])
+
+
+async def rebuild_directory(
+    songs: AsyncIOMotorCollection, artists: AsyncIOMotorCollection
+) -> int:
+    """Replace the directory with one built from the songs, returning its size."""
+    pipeline = [
+        {"$sort": {"artist": 1, "title": 1}},
+        {
+            "$group": {
+                "_id": "$artist",
+                "songs": {"$push": {"_id": "$_id", "title": "$title"}},
+            }
+        },
+    ]
+    documents = [
+        {
+            "name": group["_id"],
+            "sort_key": sort_key(group["_id"]),
+            "letter": letter(group["_id"]),
+            "song_count": len(group["songs"]),
+            "songs": group["songs"],
+        }
+        async for group in songs.aggregate(pipeline, allowDiskUse=True)
+    ]
+    await artists.delete_many({})
+    if documents:
+        await artists.insert_many(documents)
+    logger.info("Rebuilt the directory of %d artists", len(documents))
+    return len(documents)
+
+
+async def ensure_directory(
+    songs: AsyncIOMotorCollection, artists: AsyncIOMotorCollection
+):
+    """Build the directory if there are songs but no artists yet."""
+    if await artists.estimated_document_count() == 0 and await songs.find_one(
+        {}, {"_id": 1}
+    ):
+        await rebuild_directory(songs, artists)
+
+
+async def main(args):
+    from database import registry
+
+    database = registry.connect().get_database(settings.MONGODB_DATABASE)
+    count = await rebuild_directory(database.songs, database.artists)
+    print(f"Rebuilt the directory of {count} artists.")
+    registry.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,138 @@
+"""
+Print-ready HTML and PDF export of songbooks.
+
+Each song is rendered to a print page once per revision and transposition
+and kept in `print_cache`, so exporting a book again only renders the songs
+that changed since. Rendering runs in a pool of worker processes, and PDF
+conversion with WeasyPrint runs there too. WeasyPrint is in the requirements
+and the Pango library it needs is in the Docker image; where either is
+missing, PDF export answers 501 Not Implemented.
+"""
+
+import asyncio
+import hashlib
+
+from bson import ObjectId
+from cache import SongCache
+from markupsafe import Markup
+from models.songbook import Songbook
+from models.storage import from_document, song_fragments
+from motor.motor_asyncio import AsyncIOMotorCollection
+from rendering import render_sections, templates
+from settings import settings
+from utils import get_logger
+from workers import WorkerPool
+
+logger = get_logger(__file__)
+
+# Songs rendered by one task of the worker pool.
+RENDER_BATCH_SIZE = 50
+
+# Rendered print pages keyed by (song id, revision, transposition), and whole
+# PDFs keyed by the digest of their HTML.
+print_cache = SongCache(max_size=settings.EXPORT_CACHE_SIZE)
+pdf_cache = SongCache(max_size=16)
+
+
+class ExportUnavailable(RuntimeError):
+    """PDF export needs WeasyPrint and Pango, which are not installed."""
+
+
+export_pool = WorkerPool(settings.EXPORT_WORKERS)
+
+
+def render_print_songs(items: list[tuple[dict, int]]) -> list[str]:
+    """
+    Render full song documents, each transposed by its number of semitones, to
+    print pages. Runs in a worker process.
+    """
+    template = templates.get_template("print_song.html")
+    pages = []
+    for document, transpose in items:
+        if transpose % 12:
+            song = from_document(document).transpose(transpose)
+            fragments = render_sections(song)
+            capo = song.capo
+        else:
+            fragments = song_fragments(document)
+            capo = document.get("capo")
+        song = {**document, "capo": capo}
+        pages.append(template.render(song=song, fragments=fragments))
+    return pages
+
+
+def html_to_pdf(html: str) -> bytes:
+    """Lay out a print-ready page as PDF. Runs in a worker process."""
+    try:
+        from weasyprint import HTML
+    except ImportError as e:
+        raise ExportUnavailable("PDF export needs `pip install weasyprint`.") from e
+    except OSError as e:  # WeasyPrint is installed, but Pango is not.
+        raise ExportUnavailable(f"PDF export needs the Pango library: {e}") from e
+    return HTML(string=html).write_pdf()
+
+
+async def render_book(
+    collection: AsyncIOMotorCollection, songbook: Songbook, pool: WorkerPool
+) -> str:
+    """The songbook as one print-ready HTML page, one song per printed page."""
+    song_ids = songbook.song_ids()
+    cursor = collection.find(
+        {"_id": {"$in": song_ids}}, {"title": 1, "artist": 1, "revision": 1}
+    )
+    heads = {
+        str(document["_id"]): document
+        async for document in cursor.batch_size(max(len(song_ids), 1))
+    }
+    keys = [
+        (entry.song_id, heads[entry.song_id].get("revision", 0), entry.transpose % 12)
+        for entry in songbook.entries
+        if entry.song_id in heads
+    ]
+    pages = {key: print_cache.get(key) for key in dict.fromkeys(keys)}
+    missing = [key for key, page in pages.items() if page is None]
+
+    if missing:
+        ids = list({ObjectId(song_id) for song_id, _, _ in missing})
+        cursor = collection.find({"_id": {"$in": ids}}).batch_size(len(ids))
+        documents = {str(document["_id"]): document async for document in cursor}
+        items = [
+            (key, (documents[key[0]], key[2])) for key in missing if key[0] in documents
+        ]
+        batches = [
+            items[i : i + RENDER_BATCH_SIZE]
+            for i in range(0, len(items), RENDER_BATCH_SIZE)
+        ]
+        rendered = await asyncio.gather(
+            *(
+                pool.run(render_print_songs, [item for _, item in batch])
+                for batch in batches
+            )
+        )
+        for batch, batch_pages in zip(batches, rendered):
+            for (key, _), page in zip(batch, batch_pages):
+                print_cache.put(key, page)
+                pages[key] = page
+        logger.info(
+            "Rendered %d of %d songs of '%s'", len(items), len(keys), songbook.name
+        )
+
+    template = templates.get_template("print_book.html")
+    return template.render(
+        songbook=songbook,
+        contents=[heads[key[0]] for key in keys],
+        pages=[Markup(pages[key]) for key in keys],
+    )
+
+
+async def render_book_pdf(
+    collection: AsyncIOMotorCollection, songbook: Songbook, pool: WorkerPool
+) -> bytes:
+    """The songbook as PDF, laid out again only if its HTML changed."""
+    html = await render_book(collection, songbook, pool)
+    digest = hashlib.sha1(html.encode()).hexdigest()
+    pdf = pdf_cache.get((digest,))
+    if pdf is None:
+        pdf = await pool.run(html_to_pdf, html)
+        pdf_cache.put((digest,), pdf)
+    return pdf
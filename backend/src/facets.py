@@ -0,0 +1,69 @@
+"""
+Faceted filtering of songs by difficulty, genre and artist.
+
+Every combination of filters is served by a compound index in `indexes`, so
+a page of results is read in index order without sorting. The counts of
+every facet value among the matching songs come from a single `$facet`
+aggregation.
+"""
+
+from indexes import FACET_COVERING_INDEX
+from models.song import Difficulty
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+FACETS = ("difficulty", "genre", "artist")
+
+# Number of values counted for each facet, most frequent first.
+FACET_LIMIT = 20
+
+
+def facet_query(
+    difficulty: Difficulty | None = None,
+    genre: str | None = None,
+    artist: str | None = None,
+) -> dict:
+    """Equality filter on the given facets; empty values are ignored."""
+    query = {}
+    if difficulty:
+        query["difficulty"] = Difficulty(difficulty).value
+    if genre:
+        query["genre"] = genre.strip().lower()
+    if artist:
+        query["artist"] = artist
+    return query
+
+
+def facet_pipeline(query: dict, limit: int = FACET_LIMIT) -> list[dict]:
+    def counts(field):
+        return [
+            {"$match": {field: {"$ne": None}}},
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": limit},
+        ]
+
+    return [
+        {"$match": query},
+        # Only the facet fields are read, which FACET_COVERING_INDEX covers.
+        {"$project": {"_id": 0, **{field: 1 for field in FACETS}}},
+        {"$facet": {field: counts(field) for field in FACETS}},
+    ]
+
+
+async def facet_counts(
+    collection: AsyncIOMotorCollection, query: dict, limit: int = FACET_LIMIT
+) -> dict[str, list[tuple[str, int]]]:
+    """
+    The most frequent values of every facet among songs matching `query`.
+
+    Unless an artist narrows the songs down, they are counted by scanning the
+    covering index rather than the collection.
+    """
+    options = {} if "artist" in query else {"hint": FACET_COVERING_INDEX}
+    pipeline = facet_pipeline(query, limit)
+    results = await collection.aggregate(pipeline, **options).to_list(1)
+    facets = results[0] if results else {}
+    return {
+        field: [(bucket["_id"], bucket["count"]) for bucket in facets.get(field, [])]
+        for field in FACETS
+    }
@@ -0,0 +1,333 @@
+"""
+Bulk import of songs from ChordPro files, archives and lists of URLs.
+
+Files are parsed in batches in the import pool shared by all imports of the
+process, and each batch is written with one unordered `insert_many`. Progress
+is reported after every batch.
+
+Run from ``backend/src``::
+
+    MONGODB_URI=mongodb://localhost:27017 python -m importer songs.zip more/songs/
+    MONGODB_URI=mongodb://localhost:27017 python -m importer --urls urls.txt
+
+With PAGE_CACHE_DIR set, ``--offline`` parses the pages kept from an earlier
+import of the URLs again without downloading them.
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import tarfile
+import zipfile
+from collections.abc import AsyncIterator, Iterable, Iterator
+from itertools import islice
+
+import dedup
+import directory
+from models.song import Song
+from models.storage import to_document
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import BulkWriteError
+from search import search_index
+from settings import settings
+from sources import download
+from utils import get_logger
+from workers import WorkerPool, import_pool
+
+logger = get_logger(__file__)
+
+CHORDPRO_SUFFIXES = (".cho", ".chordpro", ".chopro", ".crd", ".pro", ".txt")
+
+
+def is_chordpro_file(name: str) -> bool:
+    basename = os.path.basename(name)
+    return not basename.startswith(".") and name.lower().endswith(CHORDPRO_SUFFIXES)
+
+
+def read_archive(data: bytes) -> Iterator[tuple[str, str]]:
+    """
+    Yield the name and text of every ChordPro file in a zip or tar archive.
+
+    Raises ValueError right away if `data` is neither.
+    """
+    if zipfile.is_zipfile(io.BytesIO(data)):
+        return _read_zip(zipfile.ZipFile(io.BytesIO(data)))
+    try:
+        return _read_tar(tarfile.open(fileobj=io.BytesIO(data)))
+    except tarfile.TarError as e:
+        raise ValueError("Uploaded file is not a zip or tar archive.") from e
+
+
+def _read_zip(archive: zipfile.ZipFile) -> Iterator[tuple[str, str]]:
+    with archive:
+        for name in archive.namelist():
+            if is_chordpro_file(name):
+                yield name, archive.read(name).decode("utf-8", "replace")
+
+
+def _read_tar(archive: tarfile.TarFile) -> Iterator[tuple[str, str]]:
+    with archive:
+        for member in archive:
+            if member.isfile() and is_chordpro_file(member.name):
+                text = archive.extractfile(member).read()
+                yield member.name, text.decode("utf-8", "replace")
+
+
+def read_path(path: str) -> Iterator[tuple[str, str]]:
+    """Yield ChordPro files from a file, an archive or a directory tree."""
+    if os.path.isdir(path):
+        for root, _, names in os.walk(path):
+            for name in sorted(names):
+                if is_chordpro_file(name):
+                    yield from read_path(os.path.join(root, name))
+    elif zipfile.is_zipfile(path) or tarfile.is_tarfile(path):
+        with open(path, "rb") as file:
+            yield from read_archive(file.read())
+    else:
+        with open(path, encoding="utf-8", errors="replace") as file:
+            yield path, file.read()
+
+
+def parse_batch(files: list[tuple[str, str]]) -> list[tuple[str, dict | None, str]]:
+    """
+    Parse ChordPro files into documents ready for insertion.
+
+    Runs in a worker process, so it returns plain dictionaries and error
+    messages rather than models and exceptions.
+    """
+    results = []
+    for name, text in files:
+        try:
+            song = Song.from_chordpro(text)
+            results.append((name, to_document(song), ""))
+        except Exception as e:
+            results.append((name, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def song_documents(songs: list[Song]) -> list[dict]:
+    """The documents of downloaded songs, rendered and fingerprinted."""
+    return [to_document(song) for song in songs]
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class ImportProgress:
+    """
+    Counts of an import in progress, plus the failures of the last batch.
+    Duplicates are inserted, flagged with the songs they duplicate.
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.inserted = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.errors: list[dict] = []
+
+    def fail(self, name: str, error: str):
+        self.failed += 1
+        self.errors.append({"file": name, "error": error})
+
+    def as_dict(self, done: bool = False) -> dict:
+        return {
+            "files": self.files,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "done": done,
+        }
+
+
+async def insert_batch(
+    collection: AsyncIOMotorCollection,
+    results: list[tuple[str, dict | None, str]],
+    progress: ImportProgress,
+):
+    progress.errors = []
+    progress.files += len(results)
+    names, documents = [], []
+    for name, document, error in results:
+        if document is None:
+            progress.fail(name, error)
+        else:
+            names.append(name)
+            documents.append(document)
+    if not documents:
+        return
+
+    failed = set()
+    try:
+        result = await collection.insert_many(documents, ordered=False)
+        progress.inserted += len(result.inserted_ids)
+    except BulkWriteError as e:
+        progress.inserted += e.details["nInserted"]
+        for write_error in e.details["writeErrors"]:
+            failed.add(write_error["index"])
+            progress.fail(names[write_error["index"]], write_error["errmsg"])
+
+    # insert_many sets the _id of every document it was given.
+    inserted = [document for i, document in enumerate(documents) if i not in failed]
+    search_index.add_documents(inserted)
+    progress.duplicates += await dedup.flag_duplicates(collection, inserted)
+    await directory.add_songs(directory.artists_collection(collection), inserted)
+
+
+async def import_chordpro(
+    collection: AsyncIOMotorCollection,
+    files: Iterable[tuple[str, str]],
+    batch_size: int | None = None,
+    workers: int | None = None,
+) -> AsyncIterator[dict]:
+    """
+    Parse and insert ChordPro files, yielding progress after every batch.
+
+    Batches are parsed in the shared import pool, up to one batch per worker
+    ahead of the one being written, or in a pool of its own of `workers`
+    processes if given, e.g. from the command line. With 0 workers they are
+    parsed in the event loop's default thread pool instead.
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    pool = import_pool if workers is None else WorkerPool(workers)
+    progress = ImportProgress()
+    pending: list[asyncio.Future] = []
+
+    try:
+        for batch in batched(files, batch_size):
+            parsed = pool.run(parse_batch, batch, wait=True)
+            pending.append(asyncio.ensure_future(parsed))
+            if len(pending) > max(pool.workers, 1):
+                await insert_batch(collection, await pending.pop(0), progress)
+                yield progress.as_dict()
+
+        for future in pending:
+            await insert_batch(collection, await future, progress)
+            yield progress.as_dict()
+    finally:
+        for future in pending:
+            future.cancel()
+        if pool is not import_pool:
+            pool.close()
+
+    progress.errors = []
+    logger.info(
+        "Imported %d of %d ChordPro files (%d failed, %d duplicates)",
+        progress.inserted,
+        progress.files,
+        progress.failed,
+        progress.duplicates,
+    )
+    yield progress.as_dict(done=True)
+
+
+async def download_batch(
+    urls: list[str], offline: bool = False
+) -> list[tuple[str, dict | None, str]]:
+    async def fetch(url):
+        try:
+            song = await download(url, offline)
+        except Exception as e:
+            return url, None, f"{type(e).__name__}: {e}"
+        if song is None:
+            return url, None, "Song couldn't be extracted from url."
+        return url, song, ""
+
+    results = await asyncio.gather(*(fetch(url) for url in urls))
+    songs = [song for _, song, _ in results if song is not None]
+    documents = iter(await import_pool.run(song_documents, songs, wait=True))
+    return [
+        (url, None if song is None else next(documents), error)
+        for url, song, error in results
+    ]
+
+
+async def import_urls(
+    collection: AsyncIOMotorCollection,
+    urls: Iterable[str],
+    batch_size: int | None = None,
+    offline: bool = False,
+) -> AsyncIterator[dict]:
+    """
+    Download and insert songs from URLs, yielding progress after every batch.
+
+    If `offline`, pages in the page cache are parsed without downloading them.
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    progress = ImportProgress()
+    urls = (url.strip() for url in urls if url.strip())
+
+    for batch in batched(urls, batch_size):
+        results = await download_batch(batch, offline)
+        await insert_batch(collection, results, progress)
+        yield progress.as_dict()
+
+    progress.errors = []
+    logger.info(
+        "Imported %d of %d URLs (%d failed, %d duplicates)",
+        progress.inserted,
+        progress.files,
+        progress.failed,
+        progress.duplicates,
+    )
+    yield progress.as_dict(done=True)
+
+
+async def run_import(updates: AsyncIterator[dict]) -> dict:
+    """Run an import to the end and return its totals with all failures."""
+    errors = []
+    async for update in updates:
+        errors.extend(update["errors"])
+    return {**update, "errors": errors}
+
+
+async def main(args):
+    from database import registry
+    from tqdm import tqdm
+    from utils import downloader
+
+    client = registry.connect()
+    collection = client.get_database(settings.MONGODB_DATABASE).songs
+
+    if args.urls:
+        with open(args.urls) as file:
+            urls = file.readlines()
+        updates = import_urls(collection, urls, args.batch_size, args.offline)
+    else:
+        files = (file for path in args.paths for file in read_path(path))
+        updates = import_chordpro(collection, files, args.batch_size, args.workers)
+
+    with tqdm(unit="song") as bar:
+        async for update in updates:
+            bar.update(update["files"] - bar.n)
+            for error in update["errors"]:
+                bar.write(f"{error['file']}: {error['error']}")
+
+    print(
+        f"Inserted {update['inserted']} of {update['files']} songs, "
+        f"{update['failed']} failed, {update['duplicates']} flagged as duplicates."
+    )
+    await downloader.close()
+    registry.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="*", help="ChordPro files, archives or folders")
+    parser.add_argument("--urls", help="File with one song URL per line")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Parse cached pages of --urls again without downloading them",
+    )
+    parser.add_argument("--batch-size", type=int, default=settings.IMPORT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=settings.IMPORT_WORKERS)
+    args = parser.parse_args()
+    if not args.paths and not args.urls:
+        parser.error("Provide ChordPro paths or --urls.")
+    asyncio.run(main(args))
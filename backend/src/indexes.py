@@ -0,0 +1,68 @@
+"""
+Declarative index definitions of every collection, applied at startup.
+
+`create_index` is a no-op for an index that already exists with the same
+keys and options, so applying the definitions on every start is safe. Each
+index is created on its own, so one that cannot be built, e.g. a unique
+index over existing duplicates, is logged without blocking the others.
+"""
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+from search import TEXT_INDEX_NAME, TEXT_INDEX_WEIGHTS
+from utils import get_logger
+
+logger = get_logger(__file__)
+
+# Covers every facet field, so facet counts are read from the index alone.
+FACET_COVERING_INDEX = "genre_difficulty_artist_title"
+
+
+def index(*fields: str, **options) -> IndexModel:
+    name = options.pop("name", "_".join(field.strip("_") for field in fields))
+    return IndexModel([(field, ASCENDING) for field in fields], name=name, **options)
+
+
+# Equality fields come first and the listing order (artist, title, _id) last,
+# so that filtered pages are read in index order without sorting.
+SONG_INDEXES = [
+    index("artist", "title", name="artist_title_unique", unique=True),
+    index("artist", "title", "_id"),
+    index("difficulty", "artist", "title", "_id"),
+    index("genre", "artist", "title", "_id"),
+    index("genre", "difficulty", "artist", "title", "_id", name=FACET_COVERING_INDEX),
+    index("chords"),
+    index("progressions"),
+    index("fingerprint.key"),
+    index("fingerprint.bands"),
+    IndexModel(
+        [(field, TEXT) for field in TEXT_INDEX_WEIGHTS],
+        name=TEXT_INDEX_NAME,
+        weights=TEXT_INDEX_WEIGHTS,
+    ),
+]
+
+INDEXES: dict[str, list[IndexModel]] = {
+    "songs": SONG_INDEXES,
+    "songbooks": [index("name", unique=True)],
+    "artists": [
+        index("name", unique=True),
+        index("sort_key", "_id"),
+        index("letter", "sort_key", "_id"),
+    ],
+    "users": [index("username", unique=True)],
+}
+
+
+async def ensure_indexes(database: AsyncIOMotorDatabase):
+    for collection_name, models in INDEXES.items():
+        collection = database.get_collection(collection_name)
+        for model in models:
+            try:
+                await collection.create_indexes([model])
+            except OperationFailure as e:
+                name = model.document["name"]
+                logger.error(
+                    "Index %s.%s was not created: %s", collection_name, name, e
+                )
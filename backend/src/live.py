@@ -0,0 +1,207 @@
+"""
+Live updates of open songbooks, pushed to the browsers showing them.
+
+Each server process watches the songs and songbooks collections with one
+MongoDB change stream, `feed`, and hands every change to a handler, which
+publishes events to the `hub`. The hub fans each event out to the connections
+following the songbook it belongs to, as Server-Sent Events encoded once for
+all of them. A connection waits on its own queue, so idle ones cost a queue
+and a suspended coroutine each, and one task keeps them all alive.
+
+Change streams need a replica set, a single node one will do. Without one
+the feed is unavailable and so are live updates.
+"""
+
+import asyncio
+import json
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from pymongo.errors import OperationFailure, PyMongoError
+from settings import settings
+from utils import get_logger
+
+logger = get_logger(__file__)
+
+# Only which document changed is read, the handler fetches what it needs.
+PIPELINE = [
+    {
+        "$match": {
+            "ns.coll": {"$in": ["songs", "songbooks"]},
+            "operationType": {"$in": ["update", "replace", "delete"]},
+        }
+    },
+    {"$project": {"operationType": 1, "ns": 1, "documentKey": 1}},
+]
+# Error codes of a server without change streams, and of a stream resumed
+# after its position fell out of the oplog.
+CHANGE_STREAMS_UNSUPPORTED = {40573, 40324}
+CHANGE_STREAM_HISTORY_LOST = 286
+RETRY_DELAY_S = 1.0
+MAX_RETRY_DELAY_S = 30.0
+KEEP_ALIVE = b": keep-alive\n\n"
+
+Handler = Callable[[str, str, object], Awaitable[None]]
+
+
+def format_event(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+class Subscriber:
+    """One connection following the songbook `songbook_id`."""
+
+    def __init__(self, songbook_id: str, queue_size: int):
+        self.songbook_id = songbook_id
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(queue_size)
+        # Set when the connection fell too far behind, it is then closed and
+        # the browser reconnects to a fresh snapshot.
+        self.overflowed = False
+
+    def put(self, message: bytes):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def messages(self) -> AsyncIterator[bytes]:
+        while not self.overflowed:
+            yield await self.queue.get()
+
+
+class Hub:
+    """
+    The connections following each songbook, and the last state of every
+    followed songbook as published to them, see `songbooks`.
+    """
+
+    def __init__(self, queue_size: int | None = None):
+        self.queue_size = queue_size or settings.LIVE_QUEUE_SIZE
+        self.songbooks: dict[str, dict] = {}
+        self._subscribers: dict[str, set[Subscriber]] = {}
+
+    @property
+    def connections(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def subscribe(self, songbook_id: str) -> Subscriber:
+        subscriber = Subscriber(songbook_id, self.queue_size)
+        self._subscribers.setdefault(songbook_id, set()).add(subscriber)
+        return subscriber
+
+    def is_followed(self, songbook_id: str) -> bool:
+        return songbook_id in self._subscribers
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self._subscribers.get(subscriber.songbook_id, set())
+        subscribers.discard(subscriber)
+        if not subscribers:
+            self._subscribers.pop(subscriber.songbook_id, None)
+            self.songbooks.pop(subscriber.songbook_id, None)
+
+    def publish(self, songbook_id: str, event: str, data):
+        subscribers = self._subscribers.get(songbook_id)
+        if subscribers:
+            message = format_event(event, data)
+            for subscriber in subscribers:
+                subscriber.put(message)
+
+    async def keep_alive(self, interval: float):
+        """
+        Send every connection a comment each `interval` seconds, to keep
+        proxies from closing idle ones. One task for all connections costs
+        less than a timer for each.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            for subscribers in self._subscribers.values():
+                for subscriber in subscribers:
+                    subscriber.put(KEEP_ALIVE)
+
+    def songbooks_with_song(self, song_id: str) -> list[str]:
+        return [
+            songbook_id
+            for songbook_id, state in self.songbooks.items()
+            if any(entry["song_id"] == song_id for entry in state["entries"])
+        ]
+
+    def close_all(self):
+        """Close every connection, e.g. when changes may have been missed."""
+        for subscribers in self._subscribers.values():
+            for subscriber in subscribers:
+                subscriber.overflowed = True
+                subscriber.put(b"")
+
+
+class ChangeFeed:
+    """
+    The change stream of one process, resumed after transient errors, and
+    the keep-alive comments of the hub's connections.
+    """
+
+    def __init__(self):
+        self.available = False
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self, database, handle: Handler):
+        self._tasks = [
+            asyncio.create_task(self.watch(database, handle)),
+            asyncio.create_task(hub.keep_alive(settings.LIVE_HEARTBEAT_S)),
+        ]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.available = False
+
+    async def watch(self, database, handle: Handler):
+        resume_after = None
+        delay = RETRY_DELAY_S
+        while True:
+            try:
+                async with database.watch(
+                    PIPELINE, resume_after=resume_after
+                ) as stream:
+                    self.available = True
+                    delay = RETRY_DELAY_S
+                    logger.info("Watching songs and songbooks for live updates")
+                    async for change in stream:
+                        resume_after = stream.resume_token
+                        await self.dispatch(handle, change)
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                    logger.warning("Live updates are off, %s", e)
+                    self.available = False
+                    return
+                if e.code == CHANGE_STREAM_HISTORY_LOST:
+                    logger.warning("Missed changes, closing live connections")
+                    resume_after = None
+                    hub.close_all()
+                else:
+                    logger.warning("Change stream failed, retrying: %s", e)
+            except PyMongoError as e:
+                logger.warning("Change stream failed, retrying: %s", e)
+            except Exception as e:  # E.g. mongomock, which has no change streams.
+                logger.warning("Live updates are off, %s", e)
+                self.available = False
+                return
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY_S)
+
+    async def dispatch(self, handle: Handler, change: dict):
+        collection = change["ns"]["coll"]
+        document_id = change["documentKey"]["_id"]
+        try:
+            await handle(collection, change["operationType"], document_id)
+        except Exception:
+            logger.error(
+                "Failed to publish the change of %s %s",
+                collection,
+                document_id,
+                exc_info=True,
+            )
+
+
+hub = Hub()
+feed = ChangeFeed()
@@ -1,16 +1,64 @@
+import functools
+from contextlib import asynccontextmanager
 from posixpath import realpath
 
-from fastapi import FastAPI
+from compress_middleware import CompressionMiddleware
+from database import registry
+from directory import ensure_directory
+from export import export_pool
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from routes import artists, songs
+from indexes import ensure_indexes
+from live import feed, hub
+from metrics import MetricsMiddleware
+from rendering import warm_templates
+from request_profiler import ProfilerMiddleware
+from routes import api, artists, health, metrics, search, songbook, songs
+from search import build_chord_index, build_search_index
+from settings import settings
+from utils import downloader
+from workers import PoolSaturated, import_pool, parse_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_templates()
+    database = registry.get().get_database(settings.MONGODB_DATABASE)
+    await ensure_indexes(database)
+    songs_collection = database.songs
+    await build_search_index(songs_collection)
+    await build_chord_index(songs_collection)
+    await ensure_directory(songs_collection, database.artists)
+    feed.start(database, functools.partial(songbook.publish_change, database))
+    yield
+    hub.close_all()
+    await feed.close()
+    registry.close()
+    await downloader.close()
+    export_pool.close()
+    parse_pool.close()
+    import_pool.close()
+
 
 app = FastAPI(
     title="Songbook API",
     summary="Search, add, edit and create your personal guitar chords songbook.",
     static_url_path="/static",
+    lifespan=lifespan,
 )
 
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated(request: Request, exc: PoolSaturated):
+    return PlainTextResponse(
+        str(exc),
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": "1"},
+    )
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -18,6 +66,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(CompressionMiddleware)
+# Added last to be outermost, so that the time of every other layer counts.
+app.add_middleware(MetricsMiddleware)
 app.mount(
     "/static",
     StaticFiles(directory=realpath(f"{realpath(__file__)}/../static")),
@@ -25,3 +77,8 @@ app.mount(
 )
 app.include_router(songs.router)
 app.include_router(artists.router)
+app.include_router(songbook.router)
+app.include_router(search.router)
+app.include_router(health.router)
+app.include_router(metrics.router)
+app.include_router(api.router)
@@ -0,0 +1,290 @@
+"""
+Metrics of the server, served at /metrics in the Prometheus text format.
+
+Counters and histograms live in the memory of one server process, and values
+kept elsewhere, like cache hit counts, are read when the metrics are scraped.
+They are recorded from the event loop and from the threads of the MongoDB
+driver's listeners, so each metric guards its values with a lock.
+What a worker process records while running a task is sent back with its
+result and replayed into the server process, see `recorded`.
+"""
+
+import bisect
+import functools
+import math
+import threading
+import time
+from collections.abc import Callable
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Observations made by `recorded` tasks of this thread, None outside of one.
+_local = threading.local()
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def _record(self, value: float, labels: tuple):
+        raise NotImplementedError
+
+    def _divert(self, value: float, labels: tuple) -> bool:
+        observations = getattr(_local, "observations", None)
+        if observations is None:
+            return False
+        observations.append((self.name, labels, value))
+        return True
+
+    def samples(self):
+        """Tuples of a name suffix, label values, extra labels and a value."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        if not self._divert(amount, labels):
+            self._record(amount, labels)
+
+    def _record(self, value: float, labels: tuple):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield "", labels, (), value
+
+
+class Histogram(Metric):
+    """Counts of observed values by upper bound, e.g. durations in seconds."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # Per label values, the count of each bucket, of larger values and the sum.
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        if not self._divert(value, labels):
+            self._record(value, labels)
+
+    def _record(self, value: float, labels: tuple):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def count(self, *labels) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return sum(series[:-1]) if series else 0
+
+    def timed(self, *labels) -> Callable:
+        """Decorator observing the duration of every call of a function."""
+
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, *labels)
+
+            return wrapper
+
+        return decorator
+
+    def samples(self):
+        with self._lock:
+            all_series = [
+                (labels, list(series))
+                for labels, series in sorted(self._series.items())
+            ]
+        for labels, series in all_series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), series):
+                cumulative += count
+                yield "_bucket", labels, (("le", bound),), cumulative
+            yield "_sum", labels, (), series[-1]
+            yield "_count", labels, (), cumulative
+
+
+class Collected(Metric):
+    """A metric whose values are read from `collect` when scraped."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        type: str,
+        labels: tuple[str, ...],
+        collect: Callable[[], dict[tuple, float]],
+    ):
+        super().__init__(name, help, labels)
+        self.type = type
+        self.collect = collect
+
+    def samples(self):
+        for labels, value in self.collect().items():
+            yield "", labels, (), value
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def replay(self, observations: list[tuple[str, tuple, float]]):
+        for name, labels, value in observations:
+            self.metrics[name]._record(value, labels)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, extra, value in metric.samples():
+                pairs = [*zip(metric.labels, labels), *extra]
+                label_text = ",".join(
+                    f'{name}="{_escape(_format(label))}"' for name, label in pairs
+                )
+                label_text = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"{metric.name}{suffix}{label_text} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format(value) -> str:
+    if isinstance(value, str):
+        return value
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def recorded(function: Callable, *args) -> tuple:
+    """
+    Call `function` in a worker and return its result with the observations it
+    made, for `registry.replay` in the server process.
+    """
+    _local.observations = observations = []
+    try:
+        result = function(*args)
+    finally:
+        _local.observations = None
+    return result, observations
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware observing the duration of every HTTP request, labelled by
+    its route template, so that /songs/{id} is one series for all songs.
+
+    Streamed responses, like live updates and import progress, may stay open
+    for minutes, so they are timed to their first chunk of body instead.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        observed = False
+
+        def observe():
+            nonlocal observed
+            if observed:
+                return
+            observed = True
+            # The router sets the matched route in the scope it was given, and
+            # a mount like /static its path as the root path.
+            route = getattr(scope.get("route"), "path", None)
+            route = route or scope.get("root_path") or "unmatched"
+            http_request_seconds.observe(
+                time.perf_counter() - start, scope["method"], route, str(status)
+            )
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and message.get("more_body"):
+                observe()
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            observe()
+
+
+registry = Registry()
+
+http_request_seconds = registry.register(
+    Histogram(
+        "songbook_http_request_duration_seconds",
+        "Time to answer HTTP requests, to the first chunk of streamed ones, "
+        "by route.",
+        ("method", "route", "status"),
+    )
+)
+mongodb_command_seconds = registry.register(
+    Histogram(
+        "songbook_mongodb_command_duration_seconds",
+        "Time of MongoDB commands, by command name.",
+        ("command",),
+    )
+)
+mongodb_command_failures = registry.register(
+    Counter(
+        "songbook_mongodb_command_failures_total",
+        "Failed MongoDB commands, by command name.",
+        ("command",),
+    )
+)
+parse_seconds = registry.register(
+    Histogram(
+        "songbook_parse_duration_seconds",
+        "Time to parse a song, by format.",
+        ("format",),
+    )
+)
@@ -0,0 +1,70 @@
+"""
+Rewrite songs stored in the original nested format into the compact format,
+and render the sections and compute the fingerprints of songs whose fragments
+or fingerprints are missing or outdated.
+
+Run from ``backend/src``::
+
+    MONGODB_URI=mongodb://localhost:27017 python -m migrate
+
+Songs already in the current format are skipped, so the command can be run
+again after an interruption.
+"""
+
+import argparse
+import asyncio
+
+from models.fingerprint import FINGERPRINT_VERSION
+from models.storage import FORMAT_VERSION, from_document, to_document
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+from rendering import FRAGMENTS_VERSION
+from settings import settings
+from utils import get_logger
+
+logger = get_logger(__file__)
+
+OUTDATED = {
+    "$or": [
+        {"format": {"$ne": FORMAT_VERSION}},
+        {"fragments_version": {"$ne": FRAGMENTS_VERSION}},
+        {"fingerprint.version": {"$ne": FINGERPRINT_VERSION}},
+    ]
+}
+
+
+async def migrate_songs(collection: AsyncIOMotorCollection, batch_size: int = 1000):
+    """Convert every song not in the current format, yielding the running count."""
+    migrated = 0
+    updates = []
+    async for document in collection.find(OUTDATED).batch_size(batch_size):
+        compact = to_document(from_document(document))
+        updates.append(UpdateOne({"_id": document["_id"]}, {"$set": compact}))
+        if len(updates) == batch_size:
+            await collection.bulk_write(updates, ordered=False)
+            migrated += len(updates)
+            updates = []
+            yield migrated
+    if updates:
+        await collection.bulk_write(updates, ordered=False)
+        migrated += len(updates)
+        yield migrated
+    logger.info("Migrated %d songs to storage format %d", migrated, FORMAT_VERSION)
+
+
+async def main(args):
+    from database import registry
+    from tqdm import tqdm
+
+    collection = registry.connect().get_database(settings.MONGODB_DATABASE).songs
+    total = await collection.count_documents(OUTDATED)
+    with tqdm(total=total, unit="song") as bar:
+        async for migrated in migrate_songs(collection, args.batch_size):
+            bar.update(migrated - bar.n)
+    registry.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
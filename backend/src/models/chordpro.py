@@ -0,0 +1,245 @@
+"""
+Single-pass ChordPro parser.
+
+Lines are read one at a time, from a string, a file-like object or an async
+byte stream, and each is tokenized once into a directive, a blank line or a
+line of lyrics and chords. Sections, lines and chords are built as the lines
+arrive, without joining and splitting the text again, and without validating
+the models the parser itself typed. Errors carry the line and column they were
+found at.
+
+Directives follow the ChordPro 6 specification: the song fields (title,
+artist, capo, difficulty, genre), environments such as ``start_of_chorus``
+and their short forms, comments, and ``chorus`` to repeat the last chorus.
+Every other directive, metadata like ``key`` or ``tempo`` and layout hints
+like ``new_page`` alike, is kept in `Song.meta`.
+"""
+
+import codecs
+from collections.abc import AsyncIterable, Iterable
+
+from metrics import parse_seconds
+from models.composition import Chord
+from models.song import Difficulty, Line, Section, Song
+
+ALIASES = {
+    "t": "title",
+    "st": "subtitle",
+    "c": "comment",
+    "ci": "comment_italic",
+    "cb": "comment_box",
+    "soc": "start_of_chorus",
+    "eoc": "end_of_chorus",
+    "sov": "start_of_verse",
+    "eov": "end_of_verse",
+    "sob": "start_of_bridge",
+    "eob": "end_of_bridge",
+    "sot": "start_of_tab",
+    "eot": "end_of_tab",
+    "sog": "start_of_grid",
+    "eog": "end_of_grid",
+    "np": "new_page",
+    "npp": "new_physical_page",
+    "colb": "column_break",
+    "col": "columns",
+    "g": "grid",
+    "ng": "no_grid",
+    "ns": "new_song",
+}
+
+COMMENTS = {"comment", "comment_italic", "comment_box", "highlight"}
+
+# Environments whose lines are kept verbatim instead of parsed for chords.
+VERBATIM_ENVIRONMENTS = {"tab", "grid", "abc", "ly", "svg", "textblock"}
+
+COMMENT_LABEL = "comment"
+
+
+class ChordProError(ValueError):
+    def __init__(self, message: str, line: int, column: int = 1):
+        super().__init__(f"line {line}, column {column}: {message}")
+        self.message = message
+        self.line = line
+        self.column = column
+
+    def __reduce__(self):
+        # Raised in worker processes and pickled back with its position.
+        return type(self), (self.message, self.line, self.column)
+
+
+def parse_line(text: str, number: int = 1) -> Line:
+    """Split a line of lyrics at its [chords] in one pass."""
+    first, *splits = text.split("[")
+    parts: list[str | Chord] = [first] if first else []
+    column = len(first) + 1
+    for split in splits:
+        label, bracket, lyrics = split.partition("]")
+        if not bracket:
+            raise ChordProError("Unterminated chord", number, column)
+        try:
+            parts.append(Chord.parse(label))
+        except (KeyError, IndexError) as e:
+            raise ChordProError(f"Invalid chord {label!r}", number, column + 1) from e
+        if lyrics:
+            parts.append(lyrics)
+        column += len(split) + 1
+    return Line.model_construct(parts=parts)
+
+
+def parse_directive(text: str, number: int) -> tuple[str, str | None]:
+    """The canonical name and the value, if any, of a `{name: value}` line."""
+    inner = text.strip()[1:-1]
+    name, separator, value = inner.partition(":")
+    name = name.strip().lower()
+    if not name:
+        raise ChordProError("Directive has no name", number, text.find("{") + 2)
+    # Conditional directives such as {textfont-piano: ...} apply to all.
+    if "-" in name and not name.startswith("x_"):
+        name = name.split("-", 1)[0]
+    return ALIASES.get(name, name), value.strip() if separator else None
+
+
+class ChordProParser:
+    """
+    Incremental parser fed one line at a time with `feed`, returning the song
+    from `close`.
+
+    Outside of environments, consecutive lines of lyrics form a section that
+    ends at a blank line or a directive, as a paragraph would.
+    """
+
+    def __init__(self):
+        self.title = "Unknown"
+        self.artist = "Unknown"
+        self.capo = 0
+        self.difficulty: Difficulty | None = None
+        self.genre: str | None = None
+        self.meta: dict[str, str] = {}
+        self.sections: list[Section] = []
+        self.number = 0
+        # The open section: its environment, if any, title and lines.
+        self.label: str | None = None
+        self.section_title: str | None = None
+        self.lines: list[Line] = []
+        self.last_chorus: Section | None = None
+
+    def feed(self, text: str):
+        self.number += 1
+        text = text.rstrip("\r\n")
+        stripped = text.strip()
+        if not stripped:
+            if self.label is None:
+                self.flush()
+        elif stripped.startswith("{"):
+            if not stripped.endswith("}"):
+                raise ChordProError("Unterminated directive", self.number, len(text))
+            self.directive(*parse_directive(stripped, self.number))
+        elif stripped.startswith("#"):
+            # ChordPro comment lines are not part of the song.
+            pass
+        elif self.label in VERBATIM_ENVIRONMENTS:
+            self.lines.append(Line.model_construct(parts=[text]))
+        else:
+            self.lines.append(parse_line(text, self.number))
+
+    def directive(self, name: str, value: str | None):
+        if name.startswith("start_of_"):
+            self.flush()
+            self.label = name[len("start_of_") :]
+            self.section_title = value
+        elif name.startswith("end_of_"):
+            self.flush()
+            self.label = None
+        elif name in COMMENTS:
+            self.flush(keep_environment=True)
+            self.sections.append(Section([], COMMENT_LABEL, value or ""))
+        elif name == "chorus":
+            self.flush(keep_environment=True)
+            if self.last_chorus is not None:
+                title = value if value is not None else self.last_chorus.title
+                self.sections.append(Section(self.last_chorus.lines, "chorus", title))
+        else:
+            self.flush(keep_environment=True)
+            self.metadata(name, value)
+
+    def metadata(self, name: str, value: str | None):
+        if name == "title":
+            self.title = value or ""
+        elif name == "artist":
+            self.artist = value or ""
+        elif name == "capo":
+            try:
+                self.capo = int(value or "")
+            except ValueError as e:
+                raise ChordProError(f"Invalid capo {value!r}", self.number) from e
+        elif name == "difficulty":
+            try:
+                self.difficulty = Difficulty((value or "").lower())
+            except ValueError as e:
+                raise ChordProError(f"Invalid difficulty {value!r}", self.number) from e
+        elif name == "genre":
+            self.genre = (value or "").lower() or None
+        else:
+            self.meta[name] = value or ""
+
+    def flush(self, keep_environment: bool = False):
+        """Close the open section, continuing its environment if asked to."""
+        if self.lines:
+            section = Section.model_construct(
+                lines=self.lines, label=self.label, title=self.section_title
+            )
+            self.sections.append(section)
+            if self.label == "chorus":
+                self.last_chorus = section
+            self.lines = []
+        if not keep_environment:
+            self.label = None
+            self.section_title = None
+
+    def close(self) -> Song:
+        self.flush()
+        return Song(
+            self.sections,
+            self.title,
+            self.artist,
+            self.capo,
+            _id=None,
+            difficulty=self.difficulty,
+            genre=self.genre,
+            meta=self.meta,
+        )
+
+
+@parse_seconds.timed("chordpro")
+def parse_chordpro(source: str | Iterable[str]) -> Song:
+    """Parse ChordPro text, or any iterable of its lines such as an open file."""
+    parser = ChordProParser()
+    lines = source.split("\n") if isinstance(source, str) else source
+    for line in lines:
+        parser.feed(line)
+    return parser.close()
+
+
+async def parse_chordpro_stream(
+    chunks: AsyncIterable[bytes], encoding: str = "utf-8"
+) -> Song:
+    """
+    Parse ChordPro from an async stream of bytes, one line at a time. Only the
+    newly decoded text is split, the start of an unfinished line is kept in
+    parts, so a long line takes linear time however it is chunked.
+    """
+    parser = ChordProParser()
+    decoder = codecs.getincrementaldecoder(encoding)("replace")
+    pending: list[str] = []
+    async for chunk in chunks:
+        *lines, rest = decoder.decode(chunk).split("\n")
+        if lines:
+            lines[0] = "".join(pending) + lines[0]
+            pending = []
+            for line in lines:
+                parser.feed(line)
+        pending.append(rest)
+    pending.append(decoder.decode(b"", final=True))
+    for line in "".join(pending).split("\n"):
+        parser.feed(line)
+    return parser.close()
@@ -1,6 +1,8 @@
+from collections import OrderedDict
 from enum import Enum
 
 from pydantic import BaseModel, constr
+from pydantic_core import core_schema
 
 tones: dict[str, int] = {
     "C": 0,
@@ -111,6 +113,15 @@ chord_quality_canonical_name: dict[ChordQuality, str] = {
     quality: chord_names[0] for quality, chord_names in chord_quality_names.items()
 }
 
+# Bound the labels remembered by Chord.parse and the chords of unknown
+# qualities kept interned, as both come from user input.
+PARSE_CACHE_SIZE = 10_000
+UNKNOWN_QUALITY_CACHE_SIZE = 10_000
+
+chord_qualities: dict[str, ChordQuality] = {
+    quality.value: quality for quality in ChordQuality
+}
+
 chord_name_quality: dict[str, ChordQuality] = {
     chord_name.lower(): quality
     for quality, chord_names in chord_quality_names.items()
@@ -118,18 +129,47 @@ chord_name_quality: dict[str, ChordQuality] = {
 }
 
 
-class Tone(BaseModel):
-    value: int
+class Tone:
+    """
+    One of the twelve pitch classes, valued 0 for C to 11 for B. There is a
+    single instance per value, so tones compare by identity and transposing
+    one is a table lookup.
+    """
+
+    __slots__ = ("value",)
+
+    def __new__(cls, value: int) -> "Tone":
+        if not 0 <= value < 12:
+            raise ValueError(f"Tone value must be from 0 to 11, not {value}.")
+        return all_tones[value]
 
     @classmethod
     def parse(cls, label: str) -> "Tone":
-        return Tone(value=tones[label])
+        return all_tones[tones[label]]
 
     def __str__(self) -> str:
         return chromatic_scale[self.value]
 
+    def __repr__(self) -> str:
+        return f"Tone(value={self.value})"
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Tone is immutable")
+
+    def __reduce__(self):
+        return Tone, (self.value,)
+
     def transpose(self, interval: int) -> "Tone":
-        return Tone(value=(self.value + interval) % 12)
+        return all_tones[(self.value + interval) % 12]
+
+
+def _make_tone(value: int) -> Tone:
+    tone = object.__new__(Tone)
+    object.__setattr__(tone, "value", value)
+    return tone
+
+
+all_tones: tuple[Tone, ...] = tuple(_make_tone(value) for value in range(12))
 
 
 class Interval(BaseModel):
@@ -148,38 +188,150 @@ class Interval(BaseModel):
         return label
 
 
-class Chord(BaseModel):
-    root: Tone
-    quality: ChordQuality | str
-    bass: Tone | None
+class Chord:
+    """
+    A chord, interned by (root, quality, bass) so that equal chords are the
+    same immutable object.
+
+    Parsed labels, names and the twelve transpositions of each chord are cached
+    on first use, so hot paths like parsing or transposing a song do no
+    validation and allocate no new chords. Pydantic models holding chords
+    validate them from and serialize them to the nested
+    ``{root: {value}, quality, bass}`` form.
+
+    Chords of the known qualities are few and always interned. Chords of other
+    qualities, e.g. "sus", and parsed labels are kept in bounded least
+    recently used caches, so chords also compare equal by their key.
+    """
+
+    __slots__ = ("root", "quality", "bass", "_key", "_name", "_transpositions")
+
+    _interned: dict[tuple, "Chord"] = {}
+    _interned_unknown: OrderedDict[tuple, "Chord"] = OrderedDict()
+    _parsed: OrderedDict[str, "Chord"] = OrderedDict()
+
+    def __new__(
+        cls, root: Tone, quality: ChordQuality | str, bass: Tone | None = None
+    ) -> "Chord":
+        quality = chord_qualities.get(quality, quality)
+        key = (root.value, quality, bass.value if bass is not None else None)
+        known = isinstance(quality, ChordQuality)
+        interned = cls._interned if known else cls._interned_unknown
+        chord = interned.get(key)
+        if chord is not None:
+            if not known:
+                interned.move_to_end(key)
+            return chord
+
+        chord = object.__new__(cls)
+        object.__setattr__(chord, "root", root)
+        object.__setattr__(chord, "quality", quality)
+        object.__setattr__(chord, "bass", bass)
+        object.__setattr__(chord, "_key", key)
+        object.__setattr__(chord, "_name", None)
+        object.__setattr__(chord, "_transpositions", None)
+        interned[key] = chord
+        while not known and len(interned) > UNKNOWN_QUALITY_CACHE_SIZE:
+            interned.popitem(last=False)
+        return chord
 
     # TODO Add dim
     # TODO Add bass G/H
     @classmethod
     def parse(cls, label: str) -> "Chord":
+        chord = cls._parsed.get(label)
+        if chord is not None:
+            cls._parsed.move_to_end(label)
+            return chord
+
         bass = None
         slash_splits = label.rsplit("/", 1)
+        chord_label = label
         if len(slash_splits) > 1 and slash_splits[1] in tones:
-            label = slash_splits[0]
+            chord_label = slash_splits[0]
             bass = Tone.parse(slash_splits[1])
         split = 1
-        if len(label) > 1 and label[1] in ("#", "b"):
+        if len(chord_label) > 1 and chord_label[1] in ("#", "b"):
             split = 2
 
-        root = Tone.parse(label[0:split])
-        quality_str = label[split:]
+        root = Tone.parse(chord_label[0:split])
+        quality_str = chord_label[split:]
         quality = chord_name_quality.get(quality_str.lower(), quality_str)
-        return Chord(root=root, quality=quality, bass=bass)
+        chord = Chord(root=root, quality=quality, bass=bass)
+        cls._parsed[label] = chord
+        while len(cls._parsed) > PARSE_CACHE_SIZE:
+            cls._parsed.popitem(last=False)
+        return chord
+
+    def transpose(self, interval) -> "Chord":
+        if self._transpositions is None:
+            transpositions = tuple(
+                Chord(
+                    root=self.root.transpose(step),
+                    quality=self.quality,
+                    bass=self.bass.transpose(step) if self.bass is not None else None,
+                )
+                for step in range(12)
+            )
+            object.__setattr__(self, "_transpositions", transpositions)
+        return self._transpositions[interval % 12]
+
+    def __str__(self) -> str:
+        if self._name is None:
+            quality = chord_quality_canonical_name.get(self.quality, self.quality)
+            bass = f"/{self.bass}" if self.bass is not None else ""
+            object.__setattr__(self, "_name", f"{self.root}{quality}{bass}")
+        return self._name
+
+    def __repr__(self) -> str:
+        return f"Chord({str(self)!r})"
+
+    def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        return isinstance(other, Chord) and self._key == other._key
+
+    def __hash__(self) -> int:
+        return hash(self._key)
 
-    def transpose(self, interval):
+    def __setattr__(self, name, value):
+        raise AttributeError("Chord is immutable")
+
+    def __reduce__(self):
+        return Chord, (self.root, self.quality, self.bass)
+
+    def as_dict(self) -> dict:
+        return {
+            "root": {"value": self.root.value},
+            "quality": self.quality,
+            "bass": {"value": self.bass.value} if self.bass is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Chord":
+        bass = data.get("bass")
         return Chord(
-            root=self.root.transpose(interval),
-            quality=self.quality,
-            bass=self.bass.transpose(interval) if self.bass is not None else None,
+            root=Tone(data["root"]["value"]),
+            quality=data["quality"],
+            bass=Tone(bass["value"]) if bass is not None else None,
         )
 
-    def __str__(self) -> str:
-        quality = chord_quality_canonical_name.get(self.quality, self.quality)
-        bass = f"/{self.bass}" if self.bass is not None else ""
+    @classmethod
+    def _validate(cls, value) -> "Chord":
+        if isinstance(value, Chord):
+            return value
+        if isinstance(value, dict):
+            try:
+                return cls.from_dict(value)
+            except (KeyError, IndexError, TypeError) as e:
+                raise ValueError(f"Invalid chord: {value}") from e
+        raise ValueError(f"Invalid chord: {value!r}")
 
-        return f"{self.root}{quality}{bass}"
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source, handler):
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                Chord.as_dict
+            ),
+        )
@@ -0,0 +1,122 @@
+"""
+Content fingerprints of songs, to find duplicates without comparing songs
+pairwise.
+
+A fingerprint holds the normalized artist and title, and a MinHash signature
+of the song's lyrics, as shingles of consecutive words, and of its chord
+progressions in every key. The share of equal values in two signatures
+estimates how much of the two songs is the same, and songs sharing at least
+SIMILARITY of it are near-duplicates. Songs with fewer than MIN_SHINGLES
+shingles of lyrics have no signature, as a few chords alone match unrelated
+songs, and are only matched by artist and title.
+
+For locality sensitive hashing the signature is split into BANDS bands, each
+stored as one indexed string. Near-duplicates almost always agree on a whole
+band, so an index lookup of the bands finds them, while unrelated songs rarely
+do.
+"""
+
+import hashlib
+import random
+
+from models.progression import chord_index
+from models.utils import tokenize
+
+FINGERPRINT_VERSION = 2
+SIGNATURE_SIZE = 32
+BANDS = 8
+SIMILARITY = 0.7
+SHINGLE_SIZE = 3
+MIN_SHINGLES = 4
+
+# Each signature value is the minimum over the features of their 63 bit hash
+# XOR one of these fixed random masks, which shuffles the order of the hashes
+# as differently as independent hash functions would, for a fraction of the
+# cost. 63 bits keep the values within a signed 64 bit BSON integer.
+MASKS = [random.Random(i).getrandbits(63) for i in range(SIGNATURE_SIZE)]
+
+
+def song_key(artist: str, title: str) -> str:
+    """Artist and title without case, accents or punctuation."""
+    return f"{' '.join(tokenize(artist))} - {' '.join(tokenize(title))}"
+
+
+def shingles(song) -> set[str]:
+    """Runs of SHINGLE_SIZE consecutive words of the lyrics."""
+    words = tokenize(
+        " ".join(
+            part
+            for section in song.sections
+            for line in section.lines
+            for part in line.parts
+            if isinstance(part, str)
+        )
+    )
+    return {
+        " ".join(words[i : i + SHINGLE_SIZE])
+        for i in range(max(len(words) - SHINGLE_SIZE + 1, 0))
+    }
+
+
+def progressions(song) -> set[str]:
+    return {f"chords {window}" for window in chord_index(song)["progressions"]}
+
+
+def features(song, lyrics: set[str] | None = None) -> list[str]:
+    """The features of `song`, with its `lyrics` shingles if already known."""
+    if lyrics is None:
+        lyrics = shingles(song)
+    return sorted(lyrics | progressions(song))
+
+
+def signature(features: list[str]) -> list[int]:
+    hashes = [
+        int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+        >> 1
+        for feature in features
+    ]
+    return [min(map(mask.__xor__, hashes)) for mask in MASKS]
+
+
+def bands(values: list[int]) -> list[str]:
+    """The bands of a signature, each prefixed with its position."""
+    rows = len(values) // BANDS
+    return [
+        f"{band}:"
+        + hashlib.blake2b(
+            repr(values[band * rows : (band + 1) * rows]).encode(), digest_size=8
+        ).hexdigest()
+        for band in range(BANDS)
+    ]
+
+
+def similarity(first: list[int], second: list[int]) -> float:
+    """Estimated share of the features of two songs they have in common."""
+    return sum(a == b for a, b in zip(first, second)) / SIGNATURE_SIZE
+
+
+def fingerprint(song) -> dict:
+    """
+    The fingerprint stored with a song. A song with fewer than MIN_SHINGLES
+    shingles of lyrics has no signature, so that short or empty songs are not
+    near-duplicates of each other by their chords alone.
+    """
+    values = []
+    lyrics = shingles(song)
+    if len(lyrics) >= MIN_SHINGLES:
+        values = signature(features(song, lyrics))
+    return {
+        "version": FINGERPRINT_VERSION,
+        "key": song_key(song.artist, song.title),
+        "minhash": values,
+        "bands": bands(values) if values else [],
+    }
+
+
+def is_duplicate(first: dict, second: dict) -> bool:
+    """Whether two fingerprints are of the same song."""
+    if first["key"] == second["key"]:
+        return True
+    return bool(first["minhash"] and second["minhash"]) and (
+        similarity(first["minhash"], second["minhash"]) >= SIMILARITY
+    )
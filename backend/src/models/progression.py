@@ -0,0 +1,154 @@
+import re
+
+from models.composition import Chord, ChordQuality
+
+# Length of the chord windows stored for progression search. Shorter queries
+# match a prefix of a window, longer ones must contain all of their windows.
+PROGRESSION_LENGTH = 4
+
+minor_qualities = {
+    ChordQuality.minor,
+    ChordQuality.min7,
+    ChordQuality.minmaj7,
+    ChordQuality.minadd4,
+    ChordQuality.minadd6,
+}
+diminished_qualities = {ChordQuality.dim, ChordQuality.dim7, ChordQuality.min7b5}
+
+# Semitones above the tonic of each scale degree of the major scale.
+degrees = {"I": 0, "II": 2, "III": 4, "IV": 5, "V": 7, "VI": 9, "VII": 11}
+
+roman_numeral = re.compile(r"^([b#]?)(VII|VI|IV|V|III|II|I)(°|dim|\+|aug)?7?$", re.I)
+
+
+def chord_family(chord: Chord) -> str:
+    """The triad a chord is built on: '' major, 'm' minor, 'dim' or 'aug'."""
+    if chord.quality in minor_qualities:
+        return "m"
+    if chord.quality in diminished_qualities:
+        return "dim"
+    if chord.quality == ChordQuality.aug:
+        return "aug"
+    return ""
+
+
+def relative_token(root: int, family: str, tonic: int) -> str:
+    return f"{(root - tonic) % 12}{family}"
+
+
+def encode_progression(chords: list[tuple[int, str]]) -> str:
+    """
+    Encode (root, family) pairs relative to the root of the first chord, so the
+    same progression in any key has the same encoding, e.g. 'C G Am F' and
+    'D A Bm G' both become '0 7 9m 5'.
+    """
+    tonic = chords[0][0]
+    return " ".join(relative_token(root, family, tonic) for root, family in chords)
+
+
+def song_chords(song) -> list[Chord]:
+    return [
+        part
+        for section in song.sections
+        for line in section.lines
+        for part in line.parts
+        if isinstance(part, Chord)
+    ]
+
+
+def chord_index(song) -> dict:
+    """
+    The chord fields stored with a song: its distinct chords and every window
+    of PROGRESSION_LENGTH consecutive chord changes, in any key.
+    """
+    chords = song_chords(song)
+    sequence: list[tuple[int, str]] = []
+    for chord in chords:
+        pair = (chord.root.value, chord_family(chord))
+        if not sequence or sequence[-1] != pair:
+            sequence.append(pair)
+
+    # Windows starting near the end are shorter, so that short progressions
+    # still match the last chords of a song.
+    progressions = {
+        encode_progression(sequence[i : i + PROGRESSION_LENGTH])
+        for i in range(len(sequence))
+    }
+    return {
+        "chords": sorted({str(chord) for chord in chords}),
+        "progressions": sorted(progressions),
+    }
+
+
+def parse_chord_names(text: str) -> list[str]:
+    """Canonical names of comma or space separated chords, e.g. 'G, C, D, Em'."""
+    return sorted(
+        {str(Chord.parse(label)) for label in re.split(r"[\s,]+", text) if label}
+    )
+
+
+def parse_progression_step(label: str) -> tuple[int, str]:
+    match = roman_numeral.match(label)
+    if match is None:
+        chord = Chord.parse(label)
+        return chord.root.value, chord_family(chord)
+
+    accidental, numeral, suffix = match.groups()
+    root = degrees[numeral.upper()] + {"": 0, "b": -1, "#": 1}[accidental]
+    if suffix in ("°", "dim"):
+        family = "dim"
+    elif suffix in ("+", "aug"):
+        family = "aug"
+    else:
+        family = "m" if numeral.islower() else ""
+    return root % 12, family
+
+
+def parse_progression(text: str) -> list[str]:
+    """
+    Split a progression of roman numerals or chord names, e.g. 'I-V-vi-IV' or
+    'C G Am F', into encoded windows to look up.
+
+    A progression shorter than PROGRESSION_LENGTH becomes a single prefix.
+    """
+    labels = [label for label in re.split(r"[\s,\-–—]+", text) if label]
+    if not labels:
+        raise ValueError("Progression has no chords.")
+    sequence = [parse_progression_step(label) for label in labels]
+    if len(sequence) <= PROGRESSION_LENGTH:
+        return [encode_progression(sequence)]
+    return [
+        encode_progression(sequence[i : i + PROGRESSION_LENGTH])
+        for i in range(len(sequence) - PROGRESSION_LENGTH + 1)
+    ]
+
+
+def progression_query(text: str) -> dict:
+    windows = parse_progression(text)
+    if len(windows) == 1 and len(windows[0].split()) < PROGRESSION_LENGTH:
+        return {"progressions": {"$regex": f"^{re.escape(windows[0])}( |$)"}}
+    return {"progressions": {"$all": windows}}
+
+
+def playable_query(chord_names: list[str]) -> dict:
+    """Songs with at least one chord, all of them among `chord_names`."""
+    return {
+        # Narrows the candidates through the chords index before the $nor.
+        "chords": {"$in": chord_names},
+        "$nor": [{"chords": {"$elemMatch": {"$nin": chord_names}}}],
+    }
+
+
+def chord_search_query(playable: str = "", progression: str = "") -> dict:
+    """
+    Query for songs playable with only the `playable` chords and containing
+    the `progression`, either of which may be empty but not both.
+    """
+    queries = []
+    if playable.strip():
+        queries.append(playable_query(parse_chord_names(playable)))
+    if progression.strip():
+        queries.append(progression_query(progression))
+    if not queries:
+        raise ValueError("Provide chords to play or a progression.")
+    return {"$and": queries}
@@ -0,0 +1,89 @@
+"""
+Response models of the JSON API, see `routes.api`.
+
+Every field of a song but its id is optional, as a client may ask for only
+some of them with `fields`.
+"""
+
+from pydantic import BaseModel
+
+SONG_FIELDS = (
+    "id",
+    "title",
+    "artist",
+    "capo",
+    "difficulty",
+    "genre",
+    "meta",
+    "chordpro",
+    "sections",
+)
+DEFAULT_SONG_FIELDS = (
+    "id",
+    "title",
+    "artist",
+    "capo",
+    "difficulty",
+    "genre",
+    "meta",
+    "chordpro",
+)
+SUMMARY_FIELDS = ("id", "title", "artist")
+
+
+class SectionResource(BaseModel):
+    label: str | None
+    title: str | None
+    # Each line as its lyrics, with the chords as {"chord": "Am"} before the
+    # lyrics they are played on.
+    lines: list[list[str | dict[str, str]]]
+
+
+class SongResource(BaseModel):
+    id: str
+    title: str | None = None
+    artist: str | None = None
+    capo: int | None = None
+    difficulty: str | None = None
+    genre: str | None = None
+    meta: dict[str, str] | None = None
+    chordpro: str | None = None
+    sections: list[SectionResource] | None = None
+
+
+class SongPage(BaseModel):
+    items: list[SongResource]
+    next: str | None
+
+
+class SongBatch(BaseModel):
+    items: list[SongResource]
+    # Requested ids of songs that do not exist.
+    missing: list[str]
+
+
+class ArtistResource(BaseModel):
+    name: str
+    song_count: int
+
+
+class ArtistPage(BaseModel):
+    items: list[ArtistResource]
+    next: str | None
+
+
+class SongbookSummary(BaseModel):
+    id: str
+    name: str
+    song_count: int
+
+
+class SongbookEntryResource(SongResource):
+    transpose: int
+
+
+class SongbookResource(BaseModel):
+    id: str
+    name: str
+    songs: list[SongbookEntryResource]
+    missing: list[str]
@@ -0,0 +1,38 @@
+from typing import Annotated
+
+from bson import ObjectId
+from models.song import PyObjectId
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field
+
+# Semitones up, within an octave, so that 13 and -11 are both stored as 1.
+Transposition = Annotated[int, AfterValidator(lambda semitones: semitones % 12)]
+
+
+class SongbookEntry(BaseModel):
+    """A song in a songbook, transposed by `transpose` semitones."""
+
+    song_id: PyObjectId
+    transpose: Transposition = 0
+
+    def to_document(self) -> dict:
+        return {"song_id": ObjectId(self.song_id), "transpose": self.transpose}
+
+
+class Songbook(BaseModel):
+    """A named, ordered list of songs, e.g. the setlist of a gig."""
+
+    id: PyObjectId = Field(alias="_id", default=None)
+    name: str
+    entries: list[SongbookEntry] = []
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    def to_document(self) -> dict:
+        return {
+            "name": self.name,
+            "entries": [entry.to_document() for entry in self.entries],
+        }
+
+    def song_ids(self) -> list[ObjectId]:
+        """The distinct songs of the songbook, in order of first appearance."""
+        return list(dict.fromkeys(ObjectId(entry.song_id) for entry in self.entries))
@@ -0,0 +1,172 @@
+"""
+Compact storage format of songs in MongoDB.
+
+Instead of nesting every chord as ``{root: {value}, quality, bass: {value}}``
+inside the line it appears on, a song stores a table of its distinct chords
+as ``[root, quality, bass]`` triples, and each line is a flat list of lyric
+strings and indices into that table::
+
+    {
+        "format": 1,
+        "chord_table": [[0, "major", None], [9, "minor", None]],
+        "sections": [{"label": "verse", "title": None, "lines": [[0, "La ", 1]]}],
+        ...
+    }
+
+Documents without a ``format`` field use the original nested model dump and
+are still decoded.
+"""
+
+from datetime import datetime, timezone
+
+from markupsafe import Markup
+from models.composition import Chord, ChordQuality, Tone
+from models.fingerprint import fingerprint
+from models.progression import chord_index
+from models.song import Difficulty, Line, Section, Song
+from rendering import FRAGMENTS_VERSION, render_sections
+
+FORMAT_VERSION = 1
+
+
+def encode_chord(chord: Chord) -> list:
+    bass = chord.bass.value if chord.bass is not None else None
+    quality = chord.quality
+    if isinstance(quality, ChordQuality):
+        quality = quality.value
+    return [chord.root.value, quality, bass]
+
+
+def decode_chord(encoded: list) -> Chord:
+    root, quality, bass = encoded
+    return Chord(
+        root=Tone(root),
+        quality=quality,
+        bass=Tone(bass) if bass is not None else None,
+    )
+
+
+def encode_song(song: Song) -> dict:
+    """The metadata and sections of `song` in the compact format."""
+    chord_table: list[list] = []
+    chord_indices: dict[tuple, int] = {}
+
+    def table_index(chord: Chord) -> int:
+        key = tuple(encode_chord(chord))
+        if key not in chord_indices:
+            chord_indices[key] = len(chord_table)
+            chord_table.append(list(key))
+        return chord_indices[key]
+
+    sections = [
+        {
+            "label": section.label,
+            "title": section.title,
+            "lines": [
+                [
+                    table_index(part) if isinstance(part, Chord) else part
+                    for part in line.parts
+                ]
+                for line in section.lines
+            ],
+        }
+        for section in song.sections
+    ]
+    return {
+        "title": song.title,
+        "artist": song.artist,
+        "capo": song.capo,
+        "difficulty": song.difficulty.value if song.difficulty else None,
+        "genre": song.genre,
+        "meta": song.meta,
+        "format": FORMAT_VERSION,
+        "chord_table": chord_table,
+        "sections": sections,
+    }
+
+
+def from_document(document: dict) -> Song:
+    """
+    Build a Song from a stored document in either format.
+
+    Compact documents are trusted to have been written by `encode_song`, so the
+    models are constructed without validation.
+    """
+    if document.get("format") is None:
+        return Song.model_validate(document)
+    if document["format"] != FORMAT_VERSION:
+        raise ValueError(f"Unknown song storage format: {document['format']}")
+
+    chords = [decode_chord(encoded) for encoded in document["chord_table"]]
+    sections = [
+        Section.model_construct(
+            label=section["label"],
+            title=section["title"],
+            lines=[
+                Line.model_construct(
+                    parts=[
+                        part if isinstance(part, str) else chords[part] for part in line
+                    ]
+                )
+                for line in section["lines"]
+            ],
+        )
+        for section in document["sections"]
+    ]
+    song_id = document.get("_id")
+    difficulty = document.get("difficulty")
+    return Song.model_construct(
+        id=str(song_id) if song_id is not None else None,
+        sections=sections,
+        title=document["title"],
+        artist=document["artist"],
+        capo=document["capo"],
+        difficulty=Difficulty(difficulty) if difficulty else None,
+        genre=document.get("genre"),
+        meta=document.get("meta") or {},
+    )
+
+
+def to_document(song: Song) -> dict:
+    """
+    The song as stored in MongoDB, with the chord fields used by chord search,
+    its fingerprint and its sections rendered to HTML.
+    """
+    return {
+        **encode_song(song),
+        **chord_index(song),
+        "fingerprint": fingerprint(song),
+        "fragments": [str(fragment) for fragment in render_sections(song)],
+        "fragments_version": FRAGMENTS_VERSION,
+    }
+
+
+def chordpro_document(text: str) -> dict:
+    """Parse ChordPro text into the document to store, in a worker process."""
+    return to_document(Song.from_chordpro(text))
+
+
+def song_fragments(document: dict) -> list[Markup]:
+    """
+    The rendered sections of a stored song, rendered again if they are missing
+    or were rendered by an older section template.
+    """
+    if document.get("fragments_version") == FRAGMENTS_VERSION:
+        return [Markup(fragment) for fragment in document["fragments"]]
+    return render_sections(from_document(document))
+
+
+def last_modified(document: dict) -> datetime:
+    """
+    When a stored song last changed: its `updated_at`, set by every update, or
+    the creation time in its ObjectId otherwise. Always in UTC.
+    """
+    updated_at = document.get("updated_at") or document["_id"].generation_time
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return updated_at.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def line_parts(line) -> list:
+    """The parts of a stored line in either format."""
+    return line["parts"] if isinstance(line, dict) else line
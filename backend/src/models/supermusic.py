@@ -0,0 +1,117 @@
+"""
+Songs from supermusic.cz and supermusic.sk pages.
+
+The page title reads ``Artist - Title`` and the song text is the ``<pre>``
+block of the page, or its body if it has none, with every chord inline as
+``<sup>Am</sup>`` or ``<a class="sup">Am</a>`` before the syllable it is played
+on. Other tags are dropped and ``<br>`` ends a line.
+
+Blank lines separate sections, and as in Czech and Slovak songbooks a section
+starting with ``R:`` or ``Ref:`` is the chorus, one starting with ``1.``, ``2.``
+and so on a verse, and one starting with ``B:`` or ``Bridge:`` the bridge. A
+lone ``R:`` repeats the last chorus.
+"""
+
+import html
+import re
+
+from metrics import parse_seconds
+from models.composition import Chord
+from models.song import Line, Section, Song
+
+TITLE_PATTERN = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+PRE_PATTERN = re.compile(r"<pre[^>]*>(.*?)</pre>", re.IGNORECASE | re.DOTALL)
+BODY_PATTERN = re.compile(r"<body[^>]*>(.*?)</body>", re.IGNORECASE | re.DOTALL)
+CHORD_PATTERN = re.compile(
+    r"""<sup[^>]*>(.*?)</sup>|<a\s[^>]*class=["']?sup\b[^>]*>(.*?)</a>""",
+    re.IGNORECASE | re.DOTALL,
+)
+BREAK_PATTERN = re.compile(r"<br\s*/?>\r?\n?", re.IGNORECASE)
+TAG_PATTERN = re.compile(r"<[^>]*>")
+# The chords of a line are moved out of the text as "\x00Am\x01".
+CHORD_MARK = re.compile(r"\x00([^\x01]*)\x01")
+# The mark starting a section, possibly after the chords of its first line.
+SECTION_MARK = re.compile(
+    r"^(?P<chords>(?:\x00[^\x01]*\x01)*)\s*"
+    r"(?:(?P<chorus>R|Ref|Refr[eé]n)|(?P<bridge>B|Bridge)|(?P<verse>\d+))"
+    r"\s*[.:]\s*",
+    re.IGNORECASE,
+)
+
+
+def page_title(page: str) -> tuple[str, str]:
+    """The title and artist of a page titled ``Artist - Title``."""
+    match = TITLE_PATTERN.search(page)
+    if match is None:
+        raise ValueError("Page has no title.")
+    text = html.unescape(match.group(1)).strip()
+    # Drop a site suffix like "| Supermusic" or "[akordy a text]".
+    text = re.split(r"\s+(?:\||\[)", text)[0]
+    artist, separator, title = text.partition(" - ")
+    if not separator:
+        return text, "Unknown"
+    return title.strip(), artist.strip()
+
+
+def song_text(page: str) -> str:
+    """The song text with chords marked, tags dropped and entities decoded."""
+    body = BODY_PATTERN.search(page)
+    if body is None:
+        raise ValueError("Page has no song text.")
+    block = PRE_PATTERN.search(body.group(1)) or body
+    text = CHORD_PATTERN.sub(
+        lambda match: f"\x00{match.group(1) or match.group(2)}\x01", block.group(1)
+    )
+    text = TAG_PATTERN.sub("", BREAK_PATTERN.sub("\n", text))
+    return html.unescape(text).replace("\r", "")
+
+
+def parse_line(text: str) -> Line:
+    parts: list[str | Chord] = []
+    position = 0
+    for match in CHORD_MARK.finditer(text):
+        if match.start() > position:
+            parts.append(text[position : match.start()])
+        try:
+            parts.append(Chord.parse(match.group(1).strip()))
+        except (KeyError, IndexError):
+            pass
+        position = match.end()
+    if position < len(text):
+        parts.append(text[position:])
+    return Line.model_construct(parts=parts)
+
+
+def parse_section(lines: list[str]) -> Section:
+    label = None
+    match = SECTION_MARK.match(lines[0])
+    if match is not None:
+        label = next(name for name in ("chorus", "bridge", "verse") if match[name])
+        lines = [match["chords"] + lines[0][match.end() :], *lines[1:]]
+    parsed = [parse_line(line) for line in lines if line.strip()]
+    return Section.model_construct(lines=parsed, label=label, title=None)
+
+
+@parse_seconds.timed("supermusic")
+def parse_page(page: str) -> Song:
+    """The song on a supermusic song page."""
+    title, artist = page_title(page)
+    paragraphs: list[list[str]] = [[]]
+    for line in song_text(page).split("\n"):
+        if line.strip():
+            paragraphs[-1].append(line.rstrip())
+        elif paragraphs[-1]:
+            paragraphs.append([])
+
+    sections: list[Section] = []
+    chorus: Section | None = None
+    for paragraph in filter(None, paragraphs):
+        section = parse_section(paragraph)
+        if section.label == "chorus":
+            if section.lines:
+                chorus = section
+            elif chorus is not None:
+                section = chorus
+        if section.lines:
+            sections.append(section)
+    return Song(sections, title, artist, 0, _id=None)
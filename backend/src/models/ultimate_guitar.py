@@ -0,0 +1,157 @@
+"""
+Songs from Ultimate Guitar pages.
+
+A page keeps the whole tab as JSON in the ``data-content`` attribute of its
+``div.js-store``. The attribute is found with one regular expression scan of
+the HTML, without building a DOM of the rest of the page, and the tab content
+is parsed in one pass over its lines: ``[Verse 1]`` style tags start sections,
+and a ``[tab]`` line of ``[ch]`` chords is merged over the lyrics below it.
+"""
+
+import html
+import json
+import re
+
+from metrics import parse_seconds
+from models.composition import Chord
+from models.song import Line, Section, Song
+from models.utils import is_ug_tag
+
+# The opening tag of div.js-store, its attributes in any order. Quoted values
+# may contain ">".
+ATTRIBUTES = r"""(?:[^>"']|"[^"]*"|'[^']*')*"""
+JS_STORE = r"(?<![\w-])js-store(?![\w-])"
+STORE_PATTERN = re.compile(
+    rf"""<div\s{ATTRIBUTES}?\bclass\s*=\s*"""
+    rf"""(?:"[^"]*{JS_STORE}[^"]*"|'[^']*{JS_STORE}[^']*'){ATTRIBUTES}>""",
+    re.IGNORECASE,
+)
+DATA_CONTENT_PATTERN = re.compile(
+    r"""\bdata-content\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE
+)
+CHORD_PATTERN = re.compile(r"\[ch\](.*?)\[/ch\]")
+TOKEN_PATTERN = re.compile(r"\S+")
+
+SECTION_LABELS = {"chorus", "verse", "bridge"}
+
+
+def extract_store(page: str) -> dict:
+    """The JSON of the js-store div of an Ultimate Guitar page."""
+    tag = STORE_PATTERN.search(page)
+    content = DATA_CONTENT_PATTERN.search(tag.group(0)) if tag else None
+    if content is None:
+        raise ValueError("Page has no Ultimate Guitar tab data.")
+    return json.loads(html.unescape(content.group(1) or content.group(2) or ""))
+
+
+def parse_chord(label: str) -> Chord | None:
+    try:
+        return Chord.parse(label)
+    except (KeyError, IndexError):
+        return None
+
+
+def chords_line(line: str) -> Line:
+    """A line of [ch] chords, and any text between them, without lyrics."""
+    parts: list[str | Chord] = []
+    for i, part in enumerate(CHORD_PATTERN.split(line.rstrip())):
+        chord = parse_chord(part) if i % 2 else None
+        if chord is not None:
+            parts.append(chord)
+        elif part:
+            parts.append(part)
+    return Line.model_construct(parts=parts)
+
+
+def merge_line(chords: str, lyrics: str) -> Line:
+    """
+    The `lyrics` with the chords of the line above them inserted where they
+    start, e.g. "[ch]Am[/ch]   [ch]C[/ch]" over "Help me" is "[Am]Help [C]me".
+    Chords past the end of the lyrics follow them.
+    """
+    chords = CHORD_PATTERN.sub(r"\1", chords)
+    parts: list[str | Chord] = []
+    position = 0
+    for token in TOKEN_PATTERN.finditer(chords):
+        chord = parse_chord(token.group())
+        if chord is None:
+            continue
+        start = min(token.start(), len(lyrics))
+        if start > position:
+            parts.append(lyrics[position:start])
+            position = start
+        parts.append(chord)
+    if position < len(lyrics):
+        parts.append(lyrics[position:])
+    return Line.model_construct(parts=parts)
+
+
+def section_label(title: str) -> str:
+    label = title.lower().split(" ")[0]
+    return label if label in SECTION_LABELS else "verse"
+
+
+def parse_content(content: str) -> list[Section]:
+    """Sections of the `wiki_tab` content of a page, in one pass."""
+    sections: list[Section] = []
+    label, title = "verse", None
+    lines: list[Line] = []
+
+    def flush():
+        if lines:
+            sections.append(
+                Section.model_construct(lines=lines, label=label, title=title)
+            )
+
+    text_lines = content.replace("\r", "").split("\n")
+    i = 0
+    while i < len(text_lines):
+        line = text_lines[i]
+        stripped = line.strip()
+        i += 1
+        if not stripped:
+            continue
+        if is_ug_tag(stripped):
+            flush()
+            title = stripped.strip("[]")
+            label, lines = section_label(title), []
+        elif stripped.startswith("[tab]"):
+            # A line of chords over a line of lyrics, or chords alone.
+            chords = line.replace("[tab]", "").replace("[/tab]", "")
+            if "[/tab]" in line or i == len(text_lines):
+                lines.append(chords_line(chords))
+            else:
+                lyrics = text_lines[i].replace("[/tab]", "")
+                lines.append(merge_line(chords, lyrics))
+                i += 1
+        elif "[ch]" in stripped:
+            lines.append(chords_line(stripped))
+        else:
+            lines.append(Line.model_construct(parts=[line]))
+    flush()
+    return sections
+
+
+@parse_seconds.timed("ultimate-guitar")
+def parse_page(page: str) -> Song:
+    """The song on an Ultimate Guitar tab page, with its capo and tuning."""
+    data = extract_store(page)["store"]["page"]["data"]
+    tab_view = data["tab_view"]
+    tab = data.get("tab") or tab_view["versions"][0]
+    view_meta = tab_view.get("meta") or {}
+
+    meta = {}
+    tuning = view_meta.get("tuning") or {}
+    if tuning.get("value"):
+        meta["tuning"] = tuning["value"]
+    if tab.get("tonality_name"):
+        meta["key"] = tab["tonality_name"]
+
+    return Song(
+        parse_content(tab_view["wiki_tab"]["content"]),
+        tab["song_name"],
+        tab["artist_name"],
+        int(view_meta.get("capo") or 0),
+        _id=None,
+        meta=meta,
+    )
@@ -1,6 +1,5 @@
-def is_tag(text: str) -> bool:
-    stripped = text.strip()
-    return "\n" not in stripped and stripped.startswith("{") and stripped.endswith("}")
+import re
+import unicodedata
 
 
 def is_ug_tag(text: str) -> bool:
@@ -14,6 +13,12 @@ def is_ug_tag(text: str) -> bool:
     )
 
 
-def get_tag_items(tag):
-    splits = tag.strip()[1:-1].split(":", 1)
-    return splits[0].strip(), (splits[1].strip() if len(splits) == 2 else None)
+def normalize(text: str) -> str:
+    """Lowercase `text`, strip accents and replace punctuation with spaces."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return re.sub(r"[^\w]+", " ", stripped)
+
+
+def tokenize(text: str) -> list[str]:
+    return normalize(text).split()
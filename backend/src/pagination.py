@@ -0,0 +1,117 @@
+import base64
+from collections.abc import AsyncIterator
+
+from bson import ObjectId, json_util
+from fastapi import Query
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# The types of sort key values a cursor may hold. None stands for a missing
+# field. Anything else, like an operator document, is rejected, since the
+# values go into the query.
+CURSOR_VALUE_TYPES = (str, int, ObjectId, type(None))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class PageQuery:
+    """The `limit` and `after` query parameters of a paginated list view."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after: str | None = None,
+    ):
+        self.limit = limit
+        self.after = after
+
+
+def with_tie_breaker(sort_keys: list[str]) -> list[str]:
+    """Append `_id` to the sort keys so documents with equal keys keep a total order."""
+    if sort_keys[-1] != "_id":
+        return [*sort_keys, "_id"]
+    return sort_keys
+
+
+def encode_cursor(values: list) -> str:
+    """Encode the sort key values of the last document into an opaque token."""
+    raw = json_util.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json_util.loads(raw)
+    except Exception as e:
+        raise InvalidCursor(f"Invalid page cursor: {token}") from e
+    if not isinstance(values, list) or not all(
+        isinstance(value, CURSOR_VALUE_TYPES) for value in values
+    ):
+        raise InvalidCursor(f"Invalid page cursor: {token}")
+    return values
+
+
+def keyset_filter(sort_keys: list[str], values: list) -> dict:
+    """
+    Build a filter matching documents strictly after `values` in `sort_keys` order.
+
+    For keys (a, b, _id) this is
+    a > va OR (a == va AND b > vb) OR (a == va AND b == vb AND _id > vid),
+    which MongoDB answers with index bounds on a compound index over the keys.
+    """
+    if len(values) != len(sort_keys):
+        raise InvalidCursor("Page cursor does not match the sort order.")
+
+    clauses = []
+    for i, key in enumerate(sort_keys):
+        clause = {sort_keys[j]: values[j] for j in range(i)}
+        clause[key] = {"$gt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+async def paginate(
+    collection: AsyncIOMotorCollection,
+    query: dict,
+    sort_keys: list[str],
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: str | None = None,
+    projection: dict | None = None,
+) -> tuple[list[dict], str | None]:
+    """
+    Fetch one page of documents ordered by `sort_keys` using keyset pagination.
+
+    Returns the documents and the cursor of the next page (None on the last page).
+    """
+    sort_keys = with_tie_breaker(sort_keys)
+
+    if after is not None:
+        query = {"$and": [query, keyset_filter(sort_keys, decode_cursor(after))]}
+
+    cursor = collection.find(query, projection).sort([(key, 1) for key in sort_keys])
+    documents = await cursor.limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor([documents[-1][key] for key in sort_keys])
+    return documents, next_cursor
+
+
+async def stream(
+    collection: AsyncIOMotorCollection,
+    query: dict,
+    sort_keys: list[str],
+    projection: dict | None = None,
+    batch_size: int = DEFAULT_PAGE_SIZE,
+) -> AsyncIterator[dict]:
+    """Yield every matching document ordered by `sort_keys`, one batch at a time."""
+    sort_keys = with_tie_breaker(sort_keys)
+
+    cursor = collection.find(query, projection).sort([(key, 1) for key in sort_keys])
+    async for document in cursor.batch_size(batch_size):
+        yield document
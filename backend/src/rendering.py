@@ -0,0 +1,55 @@
+"""
+The application's template environments and pre-rendered song sections.
+
+Templates are compiled once per process and their bytecode is cached on disk,
+so a restarted server skips compiling them again. Each section of a song is
+rendered to an HTML fragment when the song is written, and pages stitch the
+stored fragments together instead of rendering every line and chord.
+"""
+
+import os
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from markupsafe import Markup
+from models.composition import Chord
+from settings import settings
+
+TEMPLATES_DIR = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "static", "templates"
+)
+
+# Bump when section.html changes, so stored fragments are rendered again.
+FRAGMENTS_VERSION = 1
+
+
+def make_environment(enable_async: bool = False) -> Environment:
+    # Async templates compile to different code, so they are cached apart.
+    pattern = "__songbook_async_%s.cache" if enable_async else "__songbook_%s.cache"
+    bytecode_cache = FileSystemBytecodeCache(settings.TEMPLATE_CACHE_DIR, pattern)
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=True,
+        auto_reload=settings.TEMPLATE_AUTO_RELOAD,
+        bytecode_cache=bytecode_cache,
+        enable_async=enable_async,
+    )
+    env.tests["chord"] = lambda part: isinstance(part, Chord)
+    return env
+
+
+templates = Jinja2Templates(env=make_environment())
+# Rendered with `generate_async`, so loops can consume async iterators.
+streaming_templates = Jinja2Templates(env=make_environment(enable_async=True))
+
+
+def warm_templates():
+    """Compile every template in both environments."""
+    for env in (templates.env, streaming_templates.env):
+        for name in env.list_templates(extensions=["html"]):
+            env.get_template(name)
+
+
+def render_sections(song) -> list[Markup]:
+    template = templates.get_template("section.html")
+    return [Markup(template.render(section=section)) for section in song.sections]
@@ -0,0 +1,126 @@
+"""
+Sampling profiles of single requests, for finding hot paths in production.
+
+A profiled request has the stack of the event loop thread sampled every
+PROFILE_INTERVAL_MS from a background thread, and the samples are written to
+PROFILE_DIR in the folded format, one ``frame;frame;frame count`` line per
+distinct stack, which flamegraph.pl, speedscope and inferno draw as a flame
+graph. The response names the file in its ``X-Profile`` header.
+
+Requests are profiled when PROFILE_REQUESTS is set and they send an
+``X-Profile`` header, or at random at PROFILE_SAMPLE_RATE. As other requests
+run on the same event loop meanwhile, their stacks show up in the profile too.
+One request is profiled at a time.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from settings import settings
+from utils import get_logger
+
+logger = get_logger(__file__)
+
+
+class SamplingProfiler:
+    """Counts the stacks of the thread `thread_id` every `interval` seconds."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(
+                    f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+def profile_directory() -> str:
+    return settings.PROFILE_DIR or os.path.join(
+        tempfile.gettempdir(), "songbook-profiles"
+    )
+
+
+def write_profile(name: str, folded: str) -> str:
+    """Write a profile into the profile directory and return its path."""
+    directory = profile_directory()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(folded)
+    return path
+
+
+class ProfilerMiddleware:
+    """ASGI middleware profiling the requests chosen as described above."""
+
+    def __init__(self, app):
+        self.app = app
+        self.active = False
+
+    def wanted(self, scope) -> bool:
+        if settings.PROFILE_REQUESTS and any(
+            name == b"x-profile" for name, _ in scope["headers"]
+        ):
+            return True
+        return random.random() < settings.PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.active or not self.wanted(scope):
+            return await self.app(scope, receive, send)
+
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        name = f"{stamp}-{os.getpid()}-{random.getrandbits(32):08x}.folded"
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                headers = [*message.get("headers", ()), (b"x-profile", name.encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        self.active = True
+        profiler = SamplingProfiler(
+            threading.get_ident(), settings.PROFILE_INTERVAL_MS / 1000
+        )
+        try:
+            with profiler:
+                await self.app(scope, receive, send_with_header)
+        finally:
+            self.active = False
+            # Written off the event loop, which serves other requests meanwhile.
+            path = await asyncio.to_thread(write_profile, name, profiler.folded())
+            logger.info(
+                "Profiled %s %s with %d samples into %s",
+                scope["method"],
+                scope["path"],
+                sum(profiler.stacks.values()),
+                path,
+            )
@@ -0,0 +1,352 @@
+"""
+JSON API of songs, artists and songbooks, for apps and scripts.
+
+Songs hold the fields named in `fields`, e.g. ``fields=title,artist``, and
+only the ChordPro text and sections need the whole song to be read. A batch of
+songs is fetched in one request with ``ids=...``, and a songbook with all of
+its songs, each transposed as in the songbook.
+"""
+
+import dependencies
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
+from models import resources
+from models.composition import Chord
+from models.song import Song
+from models.storage import from_document
+from pagination import MAX_PAGE_SIZE, InvalidCursor, PageQuery, paginate
+
+router = APIRouter(
+    prefix="/api/v1", tags=["api"], default_response_class=ORJSONResponse
+)
+
+FIELDS_DESCRIPTION = (
+    f"Comma separated fields of the songs, from {', '.join(resources.SONG_FIELDS)}"
+)
+
+# The fields needing the whole song, and the fields of the song they read.
+BODY_FIELDS = {"chordpro", "sections"}
+BODY_PROJECTION = dict.fromkeys(
+    [
+        "title",
+        "artist",
+        "capo",
+        "difficulty",
+        "genre",
+        "meta",
+        "format",
+        "chord_table",
+        "sections",
+    ],
+    1,
+)
+
+
+def requested_fields(
+    fields: str | None = Query(None, description=FIELDS_DESCRIPTION)
+) -> tuple[str, ...] | None:
+    """The fields asked for, with the id always first, None if not asked."""
+    if fields is None:
+        return None
+    selected = tuple(
+        dict.fromkeys(["id", *filter(None, map(str.strip, fields.split(",")))])
+    )
+    unknown = [field for field in selected if field not in resources.SONG_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            f"Unknown fields: {', '.join(unknown)}. "
+            f"Choose from: {', '.join(resources.SONG_FIELDS)}.",
+        )
+    return selected
+
+
+def song_fields(
+    fields: tuple[str, ...] | None = Depends(requested_fields),
+) -> tuple[str, ...]:
+    return fields or resources.DEFAULT_SONG_FIELDS
+
+
+def summary_fields(
+    fields: tuple[str, ...] | None = Depends(requested_fields),
+) -> tuple[str, ...]:
+    return fields or resources.SUMMARY_FIELDS
+
+
+def projection(fields: tuple[str, ...]) -> dict:
+    if BODY_FIELDS.intersection(fields):
+        return BODY_PROJECTION
+    return {field: 1 for field in fields if field != "id"} or {"_id": 1}
+
+
+def sections_resource(song: Song) -> list[dict]:
+    return [
+        {
+            "label": section.label,
+            "title": section.title,
+            "lines": [
+                [
+                    {"chord": str(part)} if isinstance(part, Chord) else part
+                    for part in line.parts
+                ]
+                for line in section.lines
+            ],
+        }
+        for section in song.sections
+    ]
+
+
+def song_resource(
+    document: dict, fields: tuple[str, ...], transpose: int = 0, capo: int | None = None
+) -> dict:
+    """The `fields` of a stored song, transposed like `Song.transpose`."""
+    song = None
+    if BODY_FIELDS.intersection(fields):
+        song = from_document(document)
+        if transpose % 12 or capo is not None:
+            song = song.transpose(transpose, capo)
+
+    resource = {}
+    for field in fields:
+        if field == "id":
+            resource["id"] = str(document["_id"])
+        elif field == "chordpro":
+            resource["chordpro"] = str(song)
+        elif field == "sections":
+            resource["sections"] = sections_resource(song)
+        elif field == "capo" and capo is not None:
+            resource["capo"] = capo
+        elif field == "meta":
+            resource["meta"] = document.get("meta") or {}
+        else:
+            resource[field] = document.get(field)
+    return resource
+
+
+def object_id(value: str, kind: str) -> ObjectId:
+    try:
+        return ObjectId(value)
+    except InvalidId:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"No {kind} with id '{value}'.")
+
+
+async def songs_by_id(
+    collection, ids: list[str], fields: tuple[str, ...]
+) -> dict[str, dict]:
+    """The stored songs of `ids` that exist, by id, in one query."""
+    object_ids = []
+    for song_id in ids:
+        try:
+            object_ids.append(ObjectId(song_id))
+        except InvalidId:
+            pass
+    cursor = collection.find({"_id": {"$in": object_ids}}, projection(fields))
+    return {str(document["_id"]): document async for document in cursor}
+
+
+@router.get(
+    "/songs",
+    response_model=resources.SongPage | resources.SongBatch,
+    response_model_exclude_unset=True,
+)
+async def get_songs(
+    ids: str | None = Query(
+        None,
+        description=(
+            "Comma separated ids of the songs to return, in this order, "
+            f"at most {MAX_PAGE_SIZE}"
+        ),
+    ),
+    transpose: int = 0,
+    capo: int | None = Query(None, ge=0, le=12),
+    fields: tuple[str, ...] | None = Depends(requested_fields),
+    page: PageQuery = Depends(),
+    collection=Depends(dependencies.get_collection_songs),
+):
+    """
+    A batch of songs by `ids`, with all fields by default, or else a page of
+    all songs by artist and title, with their title and artist by default.
+    """
+    if ids is not None:
+        selected = fields or resources.DEFAULT_SONG_FIELDS
+        requested = list(filter(None, map(str.strip, ids.split(","))))
+        if len(requested) > MAX_PAGE_SIZE:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                f"At most {MAX_PAGE_SIZE} songs can be requested at once.",
+            )
+        documents = await songs_by_id(collection, requested, selected)
+        return {
+            "items": [
+                song_resource(documents[song_id], selected, transpose, capo)
+                for song_id in requested
+                if song_id in documents
+            ],
+            "missing": list(
+                dict.fromkeys(
+                    song_id for song_id in requested if song_id not in documents
+                )
+            ),
+        }
+
+    selected = fields or resources.SUMMARY_FIELDS
+    try:
+        documents, next_cursor = await paginate(
+            collection,
+            {},
+            ["artist", "title"],
+            limit=page.limit,
+            after=page.after,
+            # The sort keys make the cursor of the next page.
+            projection={**projection(selected), "artist": 1, "title": 1},
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+    return {
+        "items": [
+            song_resource(document, selected, transpose, capo) for document in documents
+        ],
+        "next": next_cursor,
+    }
+
+
+@router.get(
+    "/songs/{id}",
+    response_model=resources.SongResource,
+    response_model_exclude_unset=True,
+)
+async def get_song(
+    id: str,
+    transpose: int = 0,
+    capo: int | None = Query(None, ge=0, le=12),
+    fields: tuple[str, ...] = Depends(song_fields),
+    collection=Depends(dependencies.get_collection_songs),
+):
+    document = await collection.find_one(
+        {"_id": object_id(id, "song")}, projection(fields)
+    )
+    if document is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"No song with id '{id}'.")
+    return song_resource(document, fields, transpose, capo)
+
+
+@router.get("/artists", response_model=resources.ArtistPage)
+async def get_artists(
+    letter: str | None = Query(None, pattern="^[A-Z#]$"),
+    page: PageQuery = Depends(),
+    collection=Depends(dependencies.get_collection_artists),
+):
+    """Artists in A-Z order, optionally under one `letter`."""
+    try:
+        artists, next_cursor = await paginate(
+            collection,
+            {"letter": letter} if letter else {},
+            ["sort_key"],
+            limit=page.limit,
+            after=page.after,
+            projection={"name": 1, "song_count": 1, "sort_key": 1},
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+    return {
+        "items": [
+            {"name": artist["name"], "song_count": artist["song_count"]}
+            for artist in artists
+        ],
+        "next": next_cursor,
+    }
+
+
+@router.get(
+    "/artists/{artist_name}/songs",
+    response_model=resources.SongPage,
+    response_model_exclude_unset=True,
+)
+async def get_artist_songs(
+    artist_name: str,
+    fields: tuple[str, ...] = Depends(summary_fields),
+    page: PageQuery = Depends(),
+    collection=Depends(dependencies.get_collection_songs),
+):
+    """The songs of an artist by title."""
+    try:
+        documents, next_cursor = await paginate(
+            collection,
+            {"artist": artist_name},
+            ["title"],
+            limit=page.limit,
+            after=page.after,
+            projection={**projection(fields), "title": 1},
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+    if not documents and page.after is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND, f"No songs found for artist '{artist_name}'."
+        )
+    return {
+        "items": [song_resource(document, fields) for document in documents],
+        "next": next_cursor,
+    }
+
+
+@router.get("/songbooks", response_model=list[resources.SongbookSummary])
+async def get_songbooks(collection=Depends(dependencies.get_collection_songbooks)):
+    pipeline = [
+        {"$sort": {"name": 1}},
+        {"$project": {"name": 1, "song_count": {"$size": "$entries"}}},
+    ]
+    songbooks = await collection.aggregate(pipeline).to_list(None)
+    return [
+        {
+            "id": str(songbook["_id"]),
+            "name": songbook["name"],
+            "song_count": songbook["song_count"],
+        }
+        for songbook in songbooks
+    ]
+
+
+@router.get(
+    "/songbooks/{id}",
+    response_model=resources.SongbookResource,
+    response_model_exclude_unset=True,
+)
+async def get_songbook(
+    id: str,
+    fields: tuple[str, ...] = Depends(song_fields),
+    songbooks=Depends(dependencies.get_collection_songbooks),
+    collection=Depends(dependencies.get_collection_songs),
+):
+    """
+    A songbook with its songs in order, each transposed as in the songbook,
+    in one response. `missing` lists the songs deleted since they were added.
+    """
+    songbook = await songbooks.find_one({"_id": object_id(id, "songbook")})
+    if songbook is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"No songbook with id '{id}'.")
+
+    entries = [
+        (str(entry["song_id"]), entry.get("transpose", 0))
+        for entry in songbook["entries"]
+    ]
+    documents = await songs_by_id(
+        collection, [song_id for song_id, _ in entries], fields
+    )
+    return {
+        "id": id,
+        "name": songbook["name"],
+        "songs": [
+            {
+                **song_resource(documents[song_id], fields, transpose),
+                "transpose": transpose,
+            }
+            for song_id, transpose in entries
+            if song_id in documents
+        ],
+        "missing": list(
+            dict.fromkeys(song_id for song_id, _ in entries if song_id not in documents)
+        ),
+    }
@@ -1,7 +1,10 @@
+import dependencies
 from dependencies import get_collection_songs, get_templates
-from fastapi import APIRouter, Depends, Request
+from directory import LETTERS
+from fastapi import APIRouter, Depends, Query, Request, status
 from fastapi.templating import Jinja2Templates
-from models.song import Song
+from models.song import SongSummary
+from pagination import InvalidCursor, PageQuery, paginate
 from utils import get_logger
 
 from .common import show_error
@@ -11,6 +14,45 @@ router = APIRouter()
 logger = get_logger(__file__)
 
 
+@router.get("/artists")
+async def get_artists(
+    request: Request,
+    letter: str | None = Query(None, pattern="^[A-Z#]$"),
+    collection=Depends(dependencies.get_collection_artists),
+    templates: Jinja2Templates = Depends(get_templates),
+    page: PageQuery = Depends(),
+):
+    """Artists from the directory in A-Z order, optionally under one `letter`."""
+    try:
+        artists, next_cursor = await paginate(
+            collection,
+            {"letter": letter} if letter else {},
+            ["sort_key"],
+            limit=page.limit,
+            after=page.after,
+            projection={"name": 1, "song_count": 1, "sort_key": 1},
+        )
+    except InvalidCursor as e:
+        return show_error(
+            str(e),
+            e,
+            request=request,
+            templates=templates,
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+
+    return templates.TemplateResponse(
+        name="artists.html",
+        request=request,
+        context={
+            "artists": artists,
+            "letters": LETTERS,
+            "letter": letter,
+            "next_cursor": next_cursor,
+        },
+    )
+
+
 @router.get(
     "/artist/{artist_name}",
 )
@@ -19,15 +61,38 @@ async def get_artist(
     artist_name: str,
     collection=Depends(get_collection_songs),
     templates: Jinja2Templates = Depends(get_templates),
+    page: PageQuery = Depends(),
 ):
-    documents = await collection.find({"artist": artist_name}).to_list(100)
+    try:
+        documents, next_cursor = await paginate(
+            collection,
+            {"artist": artist_name},
+            ["title"],
+            limit=page.limit,
+            after=page.after,
+            projection=SongSummary.projection,
+        )
+    except InvalidCursor as e:
+        return show_error(
+            str(e),
+            e,
+            request=request,
+            templates=templates,
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
 
     if documents:
-        songs = [Song.from_json(document) for document in documents]
-        logger.info(f"Found {len(songs)} songs by artist: {artist_name}")
+        songs = [SongSummary.model_validate(document) for document in documents]
+        logger.debug("Found %d songs by artist: %s", len(songs), artist_name)
         return templates.TemplateResponse(
-            "artist.html", {"request": request, "songs": songs, "artist": artist_name}
+            name="artist.html",
+            request=request,
+            context={
+                "songs": songs,
+                "artist": artist_name,
+                "next_cursor": next_cursor,
+            },
         )
     else:
         error_message = f"No songs found for artist '{artist_name}'."
-        return show_error(error_message, request=request)
+        return show_error(error_message, request=request, templates=templates)
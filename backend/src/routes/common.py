@@ -1,20 +1,72 @@
-import traceback
+from email.utils import format_datetime, parsedate_to_datetime
 
+from cache import RenderedPage
+from fastapi import Request, Response, status
 from utils import get_logger
 
 logger = get_logger(__file__)
 
 
 def show_error(
-    message: str, exception: Exception | None = None, request=None, templates=None
+    message: str,
+    exception: Exception | None = None,
+    request=None,
+    templates=None,
+    status_code: int = 200,
 ):
-    logger.error(f"{message}")
-    if exception:
-        logger.error(f"Exception: {exception}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+    logger.error("%s", message, exc_info=exception)
     if request:
         return templates.TemplateResponse(
             name="error.html",
             request=request,
             context={"error_message": message},
+            status_code=status_code,
         )
+
+
+def show_import_result(result: dict, request=None, templates=None):
+    logger.info(
+        "Imported %d of %d songs, %d failed.",
+        result["inserted"],
+        result["files"],
+        result["failed"],
+    )
+    if result["failed"]:
+        failures = ", ".join(error["file"] for error in result["errors"])
+        message = (
+            f"{result['failed']} of {result['files']} songs could not be "
+            f"imported: {failures}"
+        )
+        return show_error(message, request=request, templates=templates)
+    return Response(status_code=status.HTTP_302_FOUND, headers={"Location": "/"})
+
+
+def not_modified(request: Request, page: RenderedPage) -> bool:
+    """
+    Whether the client's copy of `page` is current, by `If-None-Match` or, if
+    absent, by `If-Modified-Since`.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etags = {etag.strip().removeprefix("W/") for etag in if_none_match.split(",")}
+        return "*" in etags or page.etag in etags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        return page.last_modified <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def conditional_response(request: Request, page: RenderedPage) -> Response:
+    """`page` with its validators, or 304 Not Modified if the client has it."""
+    headers = {
+        "ETag": page.etag,
+        "Last-Modified": format_datetime(page.last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if not_modified(request, page):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(page.content, media_type=page.media_type, headers=headers)
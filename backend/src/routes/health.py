@@ -0,0 +1,35 @@
+from cache import song_cache
+from database import get_db_client, registry
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import JSONResponse
+from motor.motor_asyncio import AsyncIOMotorClient
+from utils import get_logger
+
+router = APIRouter()
+
+logger = get_logger(__file__)
+
+
+@router.get("/health")
+async def get_health(db_client: AsyncIOMotorClient = Depends(get_db_client)):
+    try:
+        await db_client.admin.command("ping")
+        database = "ok"
+        status_code = status.HTTP_200_OK
+    except Exception as e:
+        logger.error("Database ping failed: %s", e)
+        database = "unavailable"
+        status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    return JSONResponse(
+        status_code=status_code,
+        content={
+            "database": database,
+            "pools": registry.pool_stats(),
+            "song_cache": {
+                "size": len(song_cache),
+                "hits": song_cache.hits,
+                "misses": song_cache.misses,
+            },
+        },
+    )
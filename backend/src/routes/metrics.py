@@ -0,0 +1,110 @@
+import export
+import live
+import metrics
+from cache import song_cache
+from database import registry
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from metrics import Collected
+from workers import parse_pool
+
+router = APIRouter()
+
+CACHES = {
+    "song": song_cache,
+    "print": export.print_cache,
+    "pdf": export.pdf_cache,
+}
+POOLS = {"parse": parse_pool, "export": export.export_pool}
+
+
+def cache_values(read) -> dict[tuple, float]:
+    return {(name,): read(cache) for name, cache in CACHES.items()}
+
+
+def hit_ratio(cache) -> float:
+    lookups = cache.hits + cache.misses
+    return cache.hits / lookups if lookups else 0.0
+
+
+def connection_values(field: str) -> dict[tuple, float]:
+    return {(name,): stats[field] for name, stats in registry.pool_stats().items()}
+
+
+for metric in (
+    Collected(
+        "songbook_cache_hits_total",
+        "Lookups of an in-memory cache that found the entry.",
+        "counter",
+        ("cache",),
+        lambda: cache_values(lambda cache: cache.hits),
+    ),
+    Collected(
+        "songbook_cache_misses_total",
+        "Lookups of an in-memory cache that missed the entry.",
+        "counter",
+        ("cache",),
+        lambda: cache_values(lambda cache: cache.misses),
+    ),
+    Collected(
+        "songbook_cache_hit_ratio",
+        "Share of the lookups of an in-memory cache that found the entry.",
+        "gauge",
+        ("cache",),
+        lambda: cache_values(hit_ratio),
+    ),
+    Collected(
+        "songbook_cache_entries",
+        "Entries held by an in-memory cache.",
+        "gauge",
+        ("cache",),
+        lambda: cache_values(len),
+    ),
+    Collected(
+        "songbook_cache_bytes",
+        "Total size of the entries held by an in-memory cache.",
+        "gauge",
+        ("cache",),
+        lambda: cache_values(lambda cache: cache.size_bytes),
+    ),
+    Collected(
+        "songbook_worker_pool_pending",
+        "Tasks queued or running in a worker pool.",
+        "gauge",
+        ("pool",),
+        lambda: {(name,): pool.pending for name, pool in POOLS.items()},
+    ),
+    Collected(
+        "songbook_mongodb_connections_checked_out",
+        "Connections of a MongoDB client in use.",
+        "gauge",
+        ("client",),
+        lambda: connection_values("checked_out"),
+    ),
+    Collected(
+        "songbook_mongodb_checkout_wait_max_seconds",
+        "Longest wait for a connection of a MongoDB client.",
+        "gauge",
+        ("client",),
+        lambda: {
+            labels: value / 1000
+            for labels, value in connection_values("checkout_wait_max_ms").items()
+        },
+    ),
+    Collected(
+        "songbook_live_connections",
+        "Open connections following a songbook live.",
+        "gauge",
+        (),
+        lambda: {(): live.hub.connections},
+    ),
+):
+    metrics.registry.register(metric)
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Metrics of this server process in the Prometheus text format."""
+    return PlainTextResponse(
+        metrics.registry.render(), media_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,146 @@
+import asyncio
+
+from bson import ObjectId
+from dependencies import get_collection_songs, get_templates
+from facets import facet_counts, facet_query
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.templating import Jinja2Templates
+from models.progression import chord_search_query
+from models.song import Difficulty, SongSummary
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PageQuery, paginate
+from search import search_index, text_search
+from utils import get_logger
+
+from .common import show_error
+
+router = APIRouter()
+
+logger = get_logger(__file__)
+
+
+@router.get("/search")
+async def search_songs(
+    request: Request,
+    q: str = "",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    collection: AsyncIOMotorCollection = Depends(get_collection_songs),
+    templates: Jinja2Templates = Depends(get_templates),
+):
+    # Exact title and artist matches come first, then typo tolerant matches
+    # over titles, artists and lyrics.
+    song_ids = await text_search(collection, q, limit) if q.strip() else []
+    for song_id, _ in search_index.search(q, limit):
+        if song_id not in song_ids:
+            song_ids.append(song_id)
+    song_ids = song_ids[:limit]
+
+    documents = await collection.find(
+        {"_id": {"$in": [ObjectId(song_id) for song_id in song_ids]}},
+        SongSummary.projection,
+    ).to_list(len(song_ids))
+    by_id = {str(document["_id"]): document for document in documents}
+    songs = [
+        SongSummary.model_validate(by_id[song_id])
+        for song_id in song_ids
+        if song_id in by_id
+    ]
+    logger.debug("Found %d songs for query: %s", len(songs), q)
+
+    return templates.TemplateResponse(
+        name="index.html", request=request, context={"songs": songs, "query": q}
+    )
+
+
+@router.get("/search/chords")
+async def search_songs_by_chords(
+    request: Request,
+    playable: str = "",
+    progression: str = "",
+    page: PageQuery = Depends(),
+    collection: AsyncIOMotorCollection = Depends(get_collection_songs),
+    templates: Jinja2Templates = Depends(get_templates),
+):
+    """
+    Songs playable with only the `playable` chords, e.g. 'G, C, D, Em', and/or
+    containing a `progression` in any key, e.g. 'I-V-vi-IV' or 'C G Am F'.
+    """
+    try:
+        documents, next_cursor = await paginate(
+            collection,
+            chord_search_query(playable, progression),
+            ["artist", "title"],
+            limit=page.limit,
+            after=page.after,
+            projection=SongSummary.projection,
+        )
+    except (KeyError, IndexError, ValueError) as e:
+        error_message = f"Invalid chord search: {e}"
+        return show_error(
+            error_message,
+            e,
+            request=request,
+            templates=templates,
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+
+    songs = [SongSummary.model_validate(document) for document in documents]
+    return templates.TemplateResponse(
+        name="index.html",
+        request=request,
+        context={
+            "songs": songs,
+            "next_cursor": next_cursor,
+            "query": " ".join(filter(None, [playable, progression])),
+        },
+    )
+
+
+@router.get("/filter_songs")
+async def filter_songs(
+    request: Request,
+    difficulty: Difficulty | None = None,
+    genre: str = "",
+    artist: str = "",
+    page: PageQuery = Depends(),
+    collection: AsyncIOMotorCollection = Depends(get_collection_songs),
+    templates: Jinja2Templates = Depends(get_templates),
+):
+    """
+    Songs matching every given facet, with the counts of each facet value among
+    them, read concurrently.
+    """
+    query = facet_query(difficulty, genre, artist)
+    try:
+        (documents, next_cursor), facets = await asyncio.gather(
+            paginate(
+                collection,
+                query,
+                ["artist", "title"],
+                limit=page.limit,
+                after=page.after,
+                projection=SongSummary.projection,
+            ),
+            facet_counts(collection, query),
+        )
+    except ValueError as e:
+        return show_error(
+            str(e),
+            e,
+            request=request,
+            templates=templates,
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+
+    songs = [SongSummary.model_validate(document) for document in documents]
+    return templates.TemplateResponse(
+        name="index.html",
+        request=request,
+        context={
+            "songs": songs,
+            "next_cursor": next_cursor,
+            "facets": facets,
+            "filters": query,
+            "query": ", ".join(query.values()),
+        },
+    )
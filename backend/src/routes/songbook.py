@@ -1,22 +1,462 @@
-from dependencies import get_collection_songs, get_templates
-from fastapi import APIRouter, Depends, Request
+from collections.abc import AsyncIterator
+from typing import Literal
+
+import dependencies
+import export
+import live
+import pymongo
+from bson import ObjectId
+from dependencies import get_collection_songs, get_streaming_templates
+from fastapi import APIRouter, Depends, Form, Request, Response, status
+from fastapi.exceptions import HTTPException
+from fastapi.responses import StreamingResponse
 from fastapi.templating import Jinja2Templates
-from models.song import Song
+from models.songbook import Songbook, SongbookEntry
+from models.storage import from_document, song_fragments
+from pagination import stream
+from rendering import FRAGMENTS_VERSION, render_sections, templates
 from utils import get_logger
 
+from .common import show_error
+
 router = APIRouter()
 
 logger = get_logger(__file__)
 
+SONGBOOK_PROJECTION = {
+    "title": 1,
+    "artist": 1,
+    "capo": 1,
+    "fragments": 1,
+    "fragments_version": 1,
+    "revision": 1,
+}
+# The fields needed to transpose a song and render it again.
+SECTIONS_PROJECTION = {"format": 1, "chord_table": 1, "sections": 1}
+
 
 @router.get("/songbook/")
 async def get_songbook(
     request: Request,
     collection=Depends(get_collection_songs),
-    templates: Jinja2Templates = Depends(get_templates),
+    templates: Jinja2Templates = Depends(get_streaming_templates),
+):
+    template = templates.get_template("songbook.html")
+    return StreamingResponse(
+        template.generate_async(request=request, songs=songbook_songs(collection)),
+        media_type="text/html",
+    )
+
+
+async def songbook_songs(collection) -> AsyncIterator[dict]:
+    """
+    Every song with its rendered sections, as the cursor yields them, so only
+    one batch of documents is held in memory at a time.
+
+    Only the stored fragments are fetched. The few songs whose fragments are
+    missing or outdated are fetched again whole and rendered.
+    """
+    async for document in stream(
+        collection, {}, ["artist", "title"], projection=SONGBOOK_PROJECTION
+    ):
+        yield await with_fragments(collection, document)
+
+
+async def with_fragments(collection, document: dict, transpose: int = 0) -> dict:
+    """
+    The song `document` with its sections rendered, transposed by `transpose`
+    semitones. The song is fetched again whole if `document` lacks the
+    sections it must be rendered from.
+    """
+    stale = transpose % 12 or document.get("fragments_version") != FRAGMENTS_VERSION
+    if stale and "sections" not in document:
+        document = await collection.find_one({"_id": document["_id"]})
+    if transpose % 12:
+        song = from_document(document).transpose(transpose)
+        return {**document, "capo": song.capo, "fragments": render_sections(song)}
+    return {**document, "fragments": song_fragments(document)}
+
+
+async def songbook_entries(collection, songbook: Songbook) -> AsyncIterator[dict]:
+    """
+    The songs of `songbook` in its order, each with its own transposition.
+
+    All songs are fetched with one `$in` query in a single batch and put back
+    in order in memory. Songs deleted since they were added are skipped.
+    """
+    song_ids = songbook.song_ids()
+    projection = dict(SONGBOOK_PROJECTION)
+    if any(entry.transpose % 12 for entry in songbook.entries):
+        projection.update(SECTIONS_PROJECTION)
+    cursor = collection.find({"_id": {"$in": song_ids}}, projection)
+    documents = await cursor.batch_size(max(len(song_ids), 1)).to_list(None)
+    by_id = {document["_id"]: document for document in documents}
+
+    for position, entry in enumerate(songbook.entries):
+        document = by_id.get(ObjectId(entry.song_id))
+        if document is not None:
+            song = await with_fragments(collection, document, entry.transpose)
+            yield {**song, "position": position, "transpose": entry.transpose}
+
+
+@router.get("/songbooks")
+async def get_songbooks(
+    request: Request,
+    collection=Depends(dependencies.get_collection_songbooks),
+    templates: Jinja2Templates = Depends(dependencies.get_templates),
 ):
-    documents = await collection.find().to_list(100)
-    songs = [Song.model_validate(document) for document in documents]
+    pipeline = [
+        {"$sort": {"name": 1}},
+        {"$project": {"name": 1, "song_count": {"$size": "$entries"}}},
+    ]
+    songbooks = await collection.aggregate(pipeline).to_list(None)
     return templates.TemplateResponse(
-        "songbook.html", {"request": request, "songs": songs}
+        name="songbooks.html", request=request, context={"songbooks": songbooks}
     )
+
+
+@router.post("/songbooks")
+async def create_songbook(
+    request: Request,
+    collection=Depends(dependencies.get_collection_songbooks),
+    templates: Jinja2Templates = Depends(dependencies.get_templates),
+):
+    form_data = await request.form()
+    songbook = Songbook(name=form_data["name"].strip())
+    try:
+        result = await collection.insert_one(songbook.to_document())
+    except pymongo.errors.DuplicateKeyError as e:
+        error_message = f"Songbook '{songbook.name}' already exists."
+        return show_error(error_message, e, request=request, templates=templates)
+    return Response(
+        status_code=status.HTTP_302_FOUND,
+        headers={"Location": f"/songbooks/{result.inserted_id}"},
+    )
+
+
+@router.get("/songbooks/{id}")
+async def get_songbook_songs(
+    request: Request,
+    id: str,
+    collection=Depends(get_collection_songs),
+    songbooks=Depends(dependencies.get_collection_songbooks),
+    templates: Jinja2Templates = Depends(dependencies.get_templates),
+    streaming: Jinja2Templates = Depends(get_streaming_templates),
+):
+    """The songs of a songbook, rendered into the page as they are ready."""
+    document = await songbooks.find_one({"_id": ObjectId(id)})
+    if document is None:
+        error_message = f"No songbook found with id '{id}'."
+        return show_error(error_message, request=request, templates=templates)
+
+    songbook = Songbook.model_validate(document)
+    template = streaming.get_template("songbook.html")
+    songs = songbook_entries(collection, songbook)
+    return StreamingResponse(
+        template.generate_async(request=request, songbook=songbook, songs=songs),
+        media_type="text/html",
+    )
+
+
+@router.get("/songbooks/{id}/export")
+async def export_songbook(
+    request: Request,
+    id: str,
+    format: Literal["html", "pdf"] = "html",
+    collection=Depends(get_collection_songs),
+    songbooks=Depends(dependencies.get_collection_songbooks),
+    templates: Jinja2Templates = Depends(dependencies.get_templates),
+):
+    """The songbook as print-ready HTML or PDF, one song per page."""
+    document = await songbooks.find_one({"_id": ObjectId(id)})
+    if document is None:
+        error_message = f"No songbook found with id '{id}'."
+        return show_error(error_message, request=request, templates=templates)
+
+    songbook = Songbook.model_validate(document)
+    if format == "html":
+        html = await export.render_book(collection, songbook, export.export_pool)
+        return Response(html, media_type="text/html; charset=utf-8")
+    try:
+        pdf = await export.render_book_pdf(collection, songbook, export.export_pool)
+    except export.ExportUnavailable as e:
+        raise HTTPException(status.HTTP_501_NOT_IMPLEMENTED, str(e))
+    filename = f"{songbook.name}.pdf".replace('"', "")
+    return Response(
+        pdf,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/songbooks/{id}")
+async def update_songbook(
+    request: Request,
+    id: str,
+    songbooks=Depends(dependencies.get_collection_songbooks),
+    templates: Jinja2Templates = Depends(dependencies.get_templates),
+):
+    """
+    Replace the songs of a songbook with the repeated `song_id` form fields, in
+    order, each transposed by the `transpose` field at the same position.
+    """
+    form_data = await request.form()
+    song_ids = form_data.getlist("song_id")
+    transpositions = form_data.getlist("transpose") or ["0"] * len(song_ids)
+    try:
+        entries = [
+            SongbookEntry(song_id=str(ObjectId(song_id)), transpose=int(transpose))
+            for song_id, transpose in zip(song_ids, transpositions, strict=True)
+        ]
+    except ValueError as e:
+        error_message = f"Invalid songbook entries: {e}"
+        return show_error(error_message, e, request=request, templates=templates)
+
+    document = await songbooks.find_one({"_id": ObjectId(id)}, {"playing": 1})
+    if document is None:
+        error_message = f"No songbook found with id '{id}'."
+        return show_error(error_message, request=request, templates=templates)
+
+    update = {"$set": {"entries": [entry.to_document() for entry in entries]}}
+    if form_data.get("name"):
+        update["$set"]["name"] = form_data["name"].strip()
+    playing = document.get("playing")
+    if playing and not points_at(playing, update["$set"]["entries"]):
+        update["$unset"] = {"playing": ""}
+    await songbooks.update_one({"_id": document["_id"]}, update)
+    return Response(
+        status_code=status.HTTP_302_FOUND, headers={"Location": f"/songbooks/{id}"}
+    )
+
+
+@router.post("/songbooks/{id}/songs")
+async def add_songbook_song(
+    request: Request,
+    id: str,
+    song_id: str = Form(),
+    transpose: int = Form(0),
+    songbooks=Depends(dependencies.get_collection_songbooks),
+    templates: Jinja2Templates = Depends(dependencies.get_templates),
+):
+    """Append a song to the end of a songbook."""
+    entry = SongbookEntry(song_id=song_id, transpose=transpose).to_document()
+    result = await songbooks.update_one(
+        {"_id": ObjectId(id)}, {"$push": {"entries": entry}}
+    )
+    if result.matched_count == 0:
+        error_message = f"No songbook found with id '{id}'."
+        return show_error(error_message, request=request, templates=templates)
+    return Response(
+        status_code=status.HTTP_302_FOUND, headers={"Location": f"/songbooks/{id}"}
+    )
+
+
+@router.post("/songbooks/delete/{id}")
+async def delete_songbook(
+    request: Request,
+    id: str,
+    songbooks=Depends(dependencies.get_collection_songbooks),
+    templates: Jinja2Templates = Depends(dependencies.get_templates),
+):
+    result = await songbooks.delete_one({"_id": ObjectId(id)})
+    if result.deleted_count == 0:
+        error_message = f"Failed to delete songbook with ID: {id}."
+        return show_error(error_message, request=request, templates=templates)
+    return Response(
+        status_code=status.HTTP_302_FOUND, headers={"Location": "/songbooks"}
+    )
+
+
+def points_at(playing: dict, entries: list[dict]) -> bool:
+    """Whether the `playing` pointer is still at its song among `entries`."""
+    position = playing["position"]
+    return 0 <= position < len(entries) and str(entries[position]["song_id"]) == str(
+        playing["song_id"]
+    )
+
+
+def songbook_state(document: dict) -> dict:
+    """
+    What the live connections of a stored songbook are told about it. A song
+    playing that is no longer at its position is told as none playing.
+    """
+    playing = document.get("playing")
+    if playing and not points_at(playing, document["entries"]):
+        playing = None
+    return {
+        "name": document["name"],
+        "entries": [
+            {"song_id": str(entry["song_id"]), "transpose": entry.get("transpose", 0)}
+            for entry in document["entries"]
+        ],
+        "playing": playing and {**playing, "song_id": str(playing["song_id"])},
+    }
+
+
+@router.get("/songbooks/{id}/live")
+async def follow_songbook(
+    id: str,
+    collection=Depends(get_collection_songs),
+    songbooks=Depends(dependencies.get_collection_songbooks),
+):
+    """
+    Server-Sent Events of the changes to a songbook, its songs and the song
+    playing, starting with a `snapshot` of the songbook with the revisions of
+    its songs, for reconnected pages to tell whether they missed changes.
+    """
+    if not live.feed.available:
+        raise HTTPException(
+            status.HTTP_501_NOT_IMPLEMENTED,
+            "Live updates need MongoDB change streams, run MongoDB as a replica set.",
+        )
+    # Subscribed before reading, so that changes in between are published to
+    # it, see `publish_change`.
+    subscriber = live.hub.subscribe(id)
+    try:
+        document = await songbooks.find_one({"_id": ObjectId(id)})
+        if document is None:
+            raise HTTPException(
+                status.HTTP_404_NOT_FOUND, f"No songbook found with id '{id}'."
+            )
+        state = songbook_state(document)
+        # Kept if already followed, so that changes are told against it.
+        live.hub.songbooks.setdefault(id, state)
+        song_ids = list(dict.fromkeys(ObjectId(e["song_id"]) for e in state["entries"]))
+        cursor = collection.find({"_id": {"$in": song_ids}}, {"revision": 1})
+        revisions = {str(song["_id"]): song.get("revision", 0) async for song in cursor}
+    except BaseException:
+        live.hub.unsubscribe(subscriber)
+        raise
+
+    return StreamingResponse(
+        songbook_events(subscriber, {**state, "revisions": revisions}),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def songbook_events(
+    subscriber: live.Subscriber, snapshot: dict
+) -> AsyncIterator[bytes]:
+    try:
+        yield live.format_event("snapshot", snapshot)
+        async for message in subscriber.messages():
+            yield message
+    finally:
+        live.hub.unsubscribe(subscriber)
+
+
+@router.post("/songbooks/{id}/playing", status_code=status.HTTP_204_NO_CONTENT)
+async def set_playing(
+    id: str,
+    position: int | None = Form(None),
+    songbooks=Depends(dependencies.get_collection_songbooks),
+):
+    """Show everyone following the songbook the song at `position` as playing."""
+    document = await songbooks.find_one({"_id": ObjectId(id)}, {"entries": 1})
+    if document is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND, f"No songbook found with id '{id}'."
+        )
+    if position is None:
+        update = {"$unset": {"playing": ""}}
+    elif 0 <= position < len(document["entries"]):
+        song_id = document["entries"][position]["song_id"]
+        update = {"$set": {"playing": {"position": position, "song_id": song_id}}}
+    else:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, f"No song at position {position}."
+        )
+    await songbooks.update_one({"_id": document["_id"]}, update)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+async def song_versions(
+    collection, song_id: str, transpositions: set[int]
+) -> tuple[int, dict[str, str]] | None:
+    """
+    The revision of a song and its HTML in each of `transpositions`, None if
+    it no longer exists.
+    """
+    document = await collection.find_one(
+        {"_id": ObjectId(song_id)}, {**SONGBOOK_PROJECTION, **SECTIONS_PROJECTION}
+    )
+    if document is None:
+        return None
+    template = templates.get_template("song_body.html")
+    versions = {}
+    for transpose in sorted(transpositions):
+        song = await with_fragments(collection, document, transpose)
+        versions[str(transpose)] = template.render(
+            song=song, fragments=song["fragments"]
+        )
+    return document.get("revision", 0), versions
+
+
+async def publish_change(database, collection_name: str, operation: str, document_id):
+    """
+    Tell the live connections following a songbook about a change to it or to
+    one of its songs. The songbook or song is read once per process, and its
+    event is encoded once for all connections following the same songbook.
+
+    A songbook followed by connections still reading its first state has no
+    last state yet, so its whole state is published to them, as they may
+    have read it before the change.
+    """
+    if collection_name == "songbooks":
+        songbook_id = str(document_id)
+        if not live.hub.is_followed(songbook_id):
+            return
+        document = None
+        if operation != "delete":
+            document = await database.songbooks.find_one({"_id": document_id})
+        if not live.hub.is_followed(songbook_id):
+            return
+        if document is None:
+            live.hub.publish(songbook_id, "songbook_deleted", {"id": songbook_id})
+            return
+        previous = live.hub.songbooks.get(songbook_id)
+        state = live.hub.songbooks[songbook_id] = songbook_state(document)
+        if previous is None or (state["name"], state["entries"]) != (
+            previous["name"],
+            previous["entries"],
+        ):
+            live.hub.publish(
+                songbook_id,
+                "songbook",
+                {"name": state["name"], "entries": state["entries"]},
+            )
+        if previous is None or state["playing"] != previous["playing"]:
+            live.hub.publish(songbook_id, "playing", state["playing"])
+        return
+
+    song_id = str(document_id)
+    transpositions = {
+        songbook_id: {
+            entry["transpose"]
+            for entry in live.hub.songbooks[songbook_id]["entries"]
+            if entry["song_id"] == song_id
+        }
+        for songbook_id in live.hub.songbooks_with_song(song_id)
+    }
+    if not transpositions:
+        return
+    song = None
+    if operation != "delete":
+        song = await song_versions(
+            database.songs, song_id, set().union(*transpositions.values())
+        )
+    for songbook_id, used in transpositions.items():
+        if song is None:
+            live.hub.publish(songbook_id, "song_deleted", {"id": song_id})
+            continue
+        revision, versions = song
+        live.hub.publish(
+            songbook_id,
+            "song",
+            {
+                "id": song_id,
+                "revision": revision,
+                "versions": {str(t): versions[str(t)] for t in sorted(used)},
+            },
+        )
@@ -1,13 +1,31 @@
+import json
+from datetime import datetime, timezone
+from typing import Literal
+
+import dedup
+import directory
+import importer
 import pymongo
 from bson import ObjectId
+from cache import RenderedPage, song_cache
 from dependencies import get_collection_songs, get_templates
-from fastapi import APIRouter, Depends, Request, Response, status
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.datastructures import UploadFile
+from fastapi.exceptions import HTTPException
+from fastapi.responses import StreamingResponse
 from fastapi.templating import Jinja2Templates
-from models.song import Song
+from models import storage
+from models.song import Song, SongSummary
+from models.storage import chordpro_document, from_document, to_document
 from motor.motor_asyncio import AsyncIOMotorCollection
-from utils import download, get_logger
+from pagination import InvalidCursor, PageQuery, paginate
+from rendering import render_sections
+from search import search_index, song_text
+from sources import download
+from utils import get_logger
+from workers import PoolSaturated, parse_pool
 
-from .common import show_error
+from .common import conditional_response, show_error, show_import_result
 
 router = APIRouter()
 
@@ -20,12 +38,31 @@ async def get_songs(
     request: Request,
     collection: AsyncIOMotorCollection = Depends(get_collection_songs),
     templates: Jinja2Templates = Depends(get_templates),
+    page: PageQuery = Depends(),
 ):
-    documents = await collection.find().to_list(100)
-    songs = [Song.model_validate(document) for document in documents]
+    try:
+        documents, next_cursor = await paginate(
+            collection,
+            {},
+            ["artist", "title"],
+            limit=page.limit,
+            after=page.after,
+            projection=SongSummary.projection,
+        )
+    except InvalidCursor as e:
+        return show_error(
+            str(e),
+            e,
+            request=request,
+            templates=templates,
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+    songs = [SongSummary.model_validate(document) for document in documents]
 
     return templates.TemplateResponse(
-        name="index.html", request=request, context={"songs": songs}
+        name="index.html",
+        request=request,
+        context={"songs": songs, "next_cursor": next_cursor},
     )
 
 
@@ -39,21 +76,37 @@ async def create_song(
     input_method = form_data["input-method"]
 
     if input_method == "text-field":
-        new_song = Song.from_chordpro(form_data["chordpro"])
+        try:
+            document = await parse_pool.run(chordpro_document, form_data["chordpro"])
+        except ValueError as e:
+            # ChordProError, whose message starts with the line and column.
+            error_message = f"Failed to parse song, {e}. Conform to Chordpro standards"
+            return show_error(error_message, e, request=request, templates=templates)
     elif input_method == "url-field":
         url = form_data["url-field"]
-        new_song = download(url)
+        new_song = await download(url)
         if not new_song:
             return show_error(
                 f"Song couldn't be extracted from url {url}.",
                 request=request,
                 templates=templates,
             )
+        document = await parse_pool.run(to_document, new_song)
     elif input_method == "file-field":
-        pass
+        urls = (await form_data["file-field"].read()).decode("utf-8", "replace")
+        result = await importer.run_import(
+            importer.import_urls(collection, urls.splitlines())
+        )
+        return show_import_result(result, request=request, templates=templates)
 
-    elif input_method == "import-field":
-        pass
+    elif input_method == "folder-field":
+        files = [
+            (file.filename, (await file.read()).decode("utf-8", "replace"))
+            for file in form_data.getlist("folder-field")
+            if importer.is_chordpro_file(file.filename)
+        ]
+        result = await importer.run_import(importer.import_chordpro(collection, files))
+        return show_import_result(result, request=request, templates=templates)
 
     else:
         return show_error(
@@ -63,20 +116,56 @@ async def create_song(
         )
 
     try:
-        created_song = await collection.insert_one(
-            new_song.model_dump(by_alias=True, exclude=["id"])
-        )
-        logger.info(
-            f"Song [{new_song.artist} - {new_song.title}] with ID: {created_song.inserted_id} inserted successfully."
-        )
+        created_song = await collection.insert_one(document)
     except pymongo.errors.DuplicateKeyError as e:
-        error_message = f"Song [{created_song.artist} - {created_song.title}] already exists and cannot be inserted again."
-        return show_error(error_message, e, request=request)
+        error_message = f"Song [{document['artist']} - {document['title']}] already exists and cannot be inserted again."
+        return show_error(error_message, e, request=request, templates=templates)
 
-    logger.info(f"Song with ID: {created_song.inserted_id} inserted successfully.")
+    search_index.add(str(created_song.inserted_id), song_text(document))
+    await dedup.flag_duplicates(collection, [document])
+    await directory.add_songs(directory.artists_collection(collection), [document])
+    logger.info(
+        "Song [%s - %s] with ID: %s inserted successfully.",
+        document["artist"],
+        document["title"],
+        created_song.inserted_id,
+    )
     return Response(status_code=status.HTTP_302_FOUND, headers={"Location": "/"})
 
 
+@router.post("/songs/import")
+async def import_songs(
+    archive: UploadFile | None = None,
+    urls: UploadFile | None = None,
+    collection=Depends(get_collection_songs),
+):
+    """
+    Import a zip or tar archive of ChordPro files or a file with one URL per line.
+
+    Progress is streamed as one JSON object per line after every batch.
+    """
+    if archive is not None:
+        try:
+            updates = importer.import_chordpro(
+                collection, importer.read_archive(await archive.read())
+            )
+        except ValueError as e:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+    elif urls is not None:
+        lines = (await urls.read()).decode("utf-8", "replace").splitlines()
+        updates = importer.import_urls(collection, lines)
+    else:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, "Upload an archive or a file with urls."
+        )
+
+    async def progress():
+        async for update in updates:
+            yield json.dumps(update) + "\n"
+
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
+
+
 @router.get("/songs/add")
 async def add_song(
     request: Request,
@@ -92,21 +181,79 @@ async def add_song(
 async def get_song(
     request: Request,
     id: str,
+    transpose: int = 0,
+    capo: int | None = Query(None, ge=0, le=12),
+    format: Literal["html", "chordpro", "json"] = "html",
     collection=Depends(get_collection_songs),
     templates: Jinja2Templates = Depends(get_templates),
 ):
-    document = await collection.find_one({"_id": ObjectId(id)})
-    if document:
-        song = Song.model_validate(document)
-        logger.info(f"Found document: \n{song}")
-        return templates.TemplateResponse(
-            name="song.html",
-            request=request,
-            context={"song": song},
-        )
-    else:
+    """
+    The song, transposed by `transpose` semitones and with the chord shapes for
+    `capo`, as an HTML page, ChordPro text or JSON.
+
+    Rendered pages are cached by the song's revision, with a strong ETag of
+    their content. Only the revision is read before a cached page is served,
+    so an edit made through any server process is seen by all of them, and a
+    request whose `If-None-Match` or `If-Modified-Since` matches the cached
+    page is answered with 304 Not Modified without reading the song.
+    """
+    current = await collection.find_one({"_id": ObjectId(id)}, {"revision": 1})
+    if current is None:
         error_message = f"No documents found with song_id '{id}'."
-        return show_error(error_message, request=request)
+        return show_error(error_message, request=request, templates=templates)
+
+    key = (id, current.get("revision", 0), transpose % 12, capo, format)
+    page = song_cache.get(key)
+    if page is None:
+        document = await collection.find_one({"_id": ObjectId(id)})
+        if not document:
+            error_message = f"No documents found with song_id '{id}'."
+            return show_error(error_message, request=request, templates=templates)
+        # Keyed by the revision rendered, should the song change meanwhile.
+        key = (id, document.get("revision", 0), *key[2:])
+
+        song = from_document(document)
+        if transpose % 12 or capo is not None:
+            song = song.transpose(transpose, capo)
+            fragments = render_sections(song)
+        else:
+            fragments = storage.song_fragments(document)
+        content, media_type = render_song(
+            song, transpose % 12, capo, format, templates, fragments
+        )
+        page = RenderedPage(content, media_type, storage.last_modified(document))
+        song_cache.put(key, page)
+
+    return conditional_response(request, page)
+
+
+def render_song(
+    song: Song, transpose: int, capo: int | None, format: str, templates, fragments
+):
+    """
+    The content of a song page and its media type. Pages are cached for all
+    requesters, so they are rendered from the arguments alone, not from the
+    request, and link to other transpositions relatively.
+    """
+    if format == "chordpro":
+        return str(song), "text/plain; charset=utf-8"
+    if format == "json":
+        content = json.dumps(
+            {
+                "id": song.id,
+                "title": song.title,
+                "artist": song.artist,
+                "capo": song.capo,
+                "transpose": transpose,
+                "chordpro": str(song),
+            }
+        )
+        return content, "application/json"
+    template = templates.get_template("song.html")
+    content = template.render(
+        song=song, transpose=transpose, capo=capo, fragments=fragments
+    )
+    return content, "text/html; charset=utf-8"
 
 
 @router.get("/songs/edit/{song_id}")
@@ -118,7 +265,7 @@ async def edit_song(
 ):
     document = await collection.find_one({"_id": ObjectId(song_id)})
     if document:
-        song = Song.model_validate(document)
+        song = from_document(document)
         return templates.TemplateResponse(
             name="edit_song.html",
             request=request,
@@ -138,24 +285,44 @@ async def update_song(
 ):
     form_data = await request.form()
     try:
-        song = Song.from_chordpro(form_data["chordpro"])
-
+        document = await parse_pool.run(chordpro_document, form_data["chordpro"])
+    except PoolSaturated:
+        raise
     except Exception as e:
-        error_message = f"Failed to parse song {form_data['chordpro']}. Conform to Chordpro standards"
+        error_message = f"Failed to parse song, {e}. Conform to Chordpro standards"
         return show_error(error_message, e, request=request, templates=templates)
 
-    update_result = await collection.find_one_and_update(
-        {"_id": ObjectId(id)},
-        {"$set": song.model_dump(exclude={"id"})},
-    )
+    try:
+        update_result = await collection.find_one_and_update(
+            {"_id": ObjectId(id)},
+            {
+                "$set": {**document, "updated_at": datetime.now(timezone.utc)},
+                "$inc": {"revision": 1},
+            },
+            {"artist": 1, "title": 1},
+        )
+    except pymongo.errors.DuplicateKeyError as e:
+        error_message = (
+            f"Song [{document['artist']} - {document['title']}] already exists."
+        )
+        return show_error(error_message, e, request=request, templates=templates)
     # update_result.id
     if update_result is not None:
-        logger.info(f"Song with ID: {id} updated successfully.")
+        search_index.add(id, song_text(document))
+        await directory.replace_song(
+            directory.artists_collection(collection),
+            update_result,
+            {**document, "_id": update_result["_id"]},
+        )
+        song_cache.invalidate(id)
+        logger.info("Song with ID: %s updated successfully.", id)
         return Response(
             status_code=status.HTTP_302_FOUND, headers={"Location": f"/songs/{id}"}
         )
     else:
-        error_message = f"Failed to update song: {song.json_meta()}."
+        error_message = (
+            f"Failed to update song: {document['artist']} - {document['title']}."
+        )
         return show_error(error_message, request=request, templates=templates)
 
 
@@ -166,9 +333,14 @@ async def delete_song(
     collection=Depends(get_collection_songs),
     templates: Jinja2Templates = Depends(get_templates),
 ):
-    delete_result = await collection.delete_one({"_id": ObjectId(id)})
+    deleted = await collection.find_one_and_delete(
+        {"_id": ObjectId(id)}, {"artist": 1, "title": 1}
+    )
 
-    if delete_result.deleted_count == 1:
+    if deleted is not None:
+        search_index.remove(id)
+        await directory.remove_song(directory.artists_collection(collection), deleted)
+        song_cache.invalidate(id)
         return Response(status_code=status.HTTP_302_FOUND, headers={"Location": "/"})
 
     else:
@@ -0,0 +1,165 @@
+import heapq
+from collections import defaultdict
+from collections.abc import Iterable
+
+from models.progression import chord_index
+from models.storage import from_document, line_parts
+from models.utils import tokenize
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+from utils import get_logger
+
+logger = get_logger(__file__)
+
+TEXT_INDEX_NAME = "title_artist_text"
+TEXT_INDEX_WEIGHTS = {"title": 2, "artist": 1}
+
+
+def trigrams(word: str) -> set[str]:
+    """
+    Trigrams of `word` padded at the start only, so that every trigram of a
+    prefix is also a trigram of the whole word.
+    """
+    padded = f"  {word}"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def song_text(document: dict) -> str:
+    """The title, artist and lyrics of a song document, without its chords."""
+    lyrics = [
+        part
+        for section in document.get("sections", [])
+        for line in section["lines"]
+        for part in line_parts(line)
+        if isinstance(part, str)
+    ]
+    return " ".join([document.get("title", ""), document.get("artist", ""), *lyrics])
+
+
+class TrigramIndex:
+    """
+    Typo tolerant prefix search over the words of songs.
+
+    Words are indexed by their trigrams, and a query word matches every indexed
+    word sharing at least `min_similarity` of its own trigrams. Songs are ranked
+    by the sum of their best match for each query word. The index lives in the
+    memory of one server process and is updated whenever that process writes a
+    song.
+    """
+
+    def __init__(self, min_similarity: float = 0.6):
+        self.min_similarity = min_similarity
+        self._word_songs: dict[str, set[str]] = defaultdict(set)
+        self._trigram_words: dict[str, set[str]] = defaultdict(set)
+        self._song_words: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._song_words)
+
+    def add(self, song_id: str, text: str):
+        self.remove(song_id)
+        words = set(tokenize(text))
+        self._song_words[song_id] = words
+        for word in words:
+            if not self._word_songs[word]:
+                for trigram in trigrams(word):
+                    self._trigram_words[trigram].add(word)
+            self._word_songs[word].add(song_id)
+
+    def remove(self, song_id: str):
+        for word in self._song_words.pop(song_id, ()):
+            songs = self._word_songs[word]
+            songs.discard(song_id)
+            if songs:
+                continue
+            del self._word_songs[word]
+            for trigram in trigrams(word):
+                self._trigram_words[trigram].discard(word)
+                if not self._trigram_words[trigram]:
+                    del self._trigram_words[trigram]
+
+    def clear(self):
+        self._word_songs.clear()
+        self._trigram_words.clear()
+        self._song_words.clear()
+
+    def similar_words(self, token: str) -> dict[str, float]:
+        token_trigrams = trigrams(token)
+        shared: dict[str, int] = defaultdict(int)
+        for trigram in token_trigrams:
+            for word in self._trigram_words.get(trigram, ()):
+                shared[word] += 1
+
+        scores = {}
+        for word, count in shared.items():
+            score = count / len(token_trigrams)
+            if score >= self.min_similarity:
+                # Rank the exact word above longer words it is a prefix of.
+                scores[word] = score if word == token else score * 0.9
+        return scores
+
+    def search(self, query: str, limit: int = 50) -> list[tuple[str, float]]:
+        scores: dict[str, float] = defaultdict(float)
+        for token in set(tokenize(query)):
+            best: dict[str, float] = {}
+            for word, score in self.similar_words(token).items():
+                for song_id in self._word_songs[word]:
+                    best[song_id] = max(best.get(song_id, 0.0), score)
+            for song_id, score in best.items():
+                scores[song_id] += score
+
+        return heapq.nsmallest(
+            limit, scores.items(), key=lambda item: (-item[1], item[0])
+        )
+
+    def add_documents(self, documents: Iterable[dict]):
+        for document in documents:
+            self.add(str(document["_id"]), song_text(document))
+
+
+search_index = TrigramIndex()
+
+
+async def build_search_index(collection: AsyncIOMotorCollection):
+    """Load every song into the trigram index."""
+    search_index.clear()
+    projection = {"title": 1, "artist": 1, "sections": 1}
+    async for document in collection.find({}, projection):
+        search_index.add_documents([document])
+    logger.info("Loaded %d songs into the search index", len(search_index))
+
+
+async def text_search(
+    collection: AsyncIOMotorCollection, query: str, limit: int
+) -> list[str]:
+    """
+    Ids of songs whose title or artist contain the words of `query`, best first.
+
+    Returns no songs if the server cannot answer `$text` queries.
+    """
+    pipeline = [
+        {"$match": {"$text": {"$search": query}}},
+        {"$project": {"score": {"$meta": "textScore"}}},
+        {"$sort": {"score": -1}},
+        {"$limit": limit},
+    ]
+    try:
+        documents = await collection.aggregate(pipeline).to_list(limit)
+    except (OperationFailure, NotImplementedError) as e:
+        logger.warning("Text search is unavailable: %s", e)
+        return []
+    return [str(document["_id"]) for document in documents]
+
+
+async def build_chord_index(collection: AsyncIOMotorCollection, batch_size: int = 1000):
+    """Compute the chord fields of songs stored without them."""
+    updates = []
+    async for document in collection.find({"chords": {"$exists": False}}):
+        song = from_document(document)
+        updates.append(UpdateOne({"_id": document["_id"]}, {"$set": chord_index(song)}))
+        if len(updates) == batch_size:
+            await collection.bulk_write(updates, ordered=False)
+            updates = []
+    if updates:
+        await collection.bulk_write(updates, ordered=False)
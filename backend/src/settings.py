@@ -8,9 +8,103 @@ class Settings:
     Attributes:
         MONGODB_URI (str | None): The URI for the MongoDB database.
         Defaults to the value of the environment variable 'MONGODB_URI'.
+        MONGODB_DATABASE (str): Name of the database holding the collections.
+        MONGODB_MAX_POOL_SIZE (int): Maximum number of connections in the pool.
+        MONGODB_MIN_POOL_SIZE (int): Number of connections kept open when idle.
+        MONGODB_MAX_IDLE_TIME_MS (int): Idle time after which a connection is closed.
+        MONGODB_CONNECT_TIMEOUT_MS (int): Timeout for opening a new connection.
+        MONGODB_SOCKET_TIMEOUT_MS (int): Timeout for a single socket operation.
+        MONGODB_SERVER_SELECTION_TIMEOUT_MS (int): Timeout for finding a server.
+        MONGODB_WAIT_QUEUE_TIMEOUT_MS (int): Timeout for checking a connection
+        out of a saturated pool.
+        MONGODB_READ_PREFERENCE (str): Read preference mode, e.g. 'primary' or
+        'secondaryPreferred'.
+        HTTP_TIMEOUT_S (float): Timeout for a single request when importing songs.
+        HTTP_MAX_CONNECTIONS (int): Maximum number of open import connections.
+        HTTP_MAX_CONNECTIONS_PER_HOST (int): Maximum number of concurrent
+        requests to one host.
+        HTTP_RETRIES (int): Number of retries of a failed import request.
+        HTTP_BACKOFF_S (float): Delay before the first retry, doubled on each
+        following one.
+        PAGE_CACHE_DIR (str | None): Directory keeping the raw pages songs were
+        imported from. No pages are kept if unset.
+        IMPORT_BATCH_SIZE (int): Number of songs parsed and inserted together
+        during a bulk import.
+        IMPORT_WORKERS (int): Number of processes parsing the bulk imports of
+        the server, shared by all of them, 0 to parse in threads of the
+        server process.
+        SONG_CACHE_SIZE (int): Number of rendered song pages kept in memory.
+        SONG_CACHE_MAX_BYTES (int): Total size of the rendered song pages kept
+        in memory.
+        EXPORT_WORKERS (int): Number of processes rendering songbook exports,
+        0 to render in a thread of the server process.
+        PARSE_WORKERS (int): Number of processes parsing songs added or edited
+        through the web pages, 0 to parse in threads of the server process.
+        PARSE_QUEUE_SIZE (int): Number of songs parsed or waiting to be at
+        once, beyond which new requests are answered 429 Too Many Requests.
+        EXPORT_CACHE_SIZE (int): Number of rendered print pages of songs kept
+        in memory.
+        TEMPLATE_CACHE_DIR (str | None): Directory of the compiled template
+        cache. Defaults to the system temporary directory.
+        TEMPLATE_AUTO_RELOAD (bool): Whether to check templates for changes on
+        every render, for development.
+        LOG_LEVEL (str): Lowest level of the messages logged, e.g. 'WARNING'.
+        LOG_FORMAT (str): 'text' for readable lines or 'json' for one JSON
+        object per message.
+        PROFILE_REQUESTS (bool): Whether requests sending an 'X-Profile' header
+        are profiled.
+        PROFILE_SAMPLE_RATE (float): Share of all requests profiled at random.
+        PROFILE_INTERVAL_MS (float): Time between two samples of a profile.
+        PROFILE_DIR (str | None): Directory the profiles are written to.
+        Defaults to 'songbook-profiles' in the system temporary directory.
+        LIVE_HEARTBEAT_S (float): Time between two comments sent to an idle
+        live connection, to keep proxies from closing it.
+        LIVE_QUEUE_SIZE (int): Number of events waiting to be sent to one live
+        connection, beyond which it is closed and the page reconnects.
     """
 
     MONGODB_URI: str | None = os.getenv("MONGODB_URI")
+    MONGODB_DATABASE: str = os.getenv("MONGODB_DATABASE", "songbook")
+    MONGODB_MAX_POOL_SIZE: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", 100))
+    MONGODB_MIN_POOL_SIZE: int = int(os.getenv("MONGODB_MIN_POOL_SIZE", 0))
+    MONGODB_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", 60000))
+    MONGODB_CONNECT_TIMEOUT_MS: int = int(
+        os.getenv("MONGODB_CONNECT_TIMEOUT_MS", 10000)
+    )
+    MONGODB_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", 20000))
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = int(
+        os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 10000)
+    )
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = int(
+        os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", 5000)
+    )
+    MONGODB_READ_PREFERENCE: str = os.getenv("MONGODB_READ_PREFERENCE", "primary")
+    HTTP_TIMEOUT_S: float = float(os.getenv("HTTP_TIMEOUT_S", 10.0))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = int(
+        os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", 4)
+    )
+    HTTP_RETRIES: int = int(os.getenv("HTTP_RETRIES", 3))
+    HTTP_BACKOFF_S: float = float(os.getenv("HTTP_BACKOFF_S", 0.5))
+    PAGE_CACHE_DIR: str | None = os.getenv("PAGE_CACHE_DIR")
+    IMPORT_BATCH_SIZE: int = int(os.getenv("IMPORT_BATCH_SIZE", 1000))
+    IMPORT_WORKERS: int = int(os.getenv("IMPORT_WORKERS", os.cpu_count() or 1))
+    SONG_CACHE_SIZE: int = int(os.getenv("SONG_CACHE_SIZE", 1024))
+    SONG_CACHE_MAX_BYTES: int = int(os.getenv("SONG_CACHE_MAX_BYTES", 64 * 2**20))
+    EXPORT_WORKERS: int = int(os.getenv("EXPORT_WORKERS", 2))
+    PARSE_WORKERS: int = int(os.getenv("PARSE_WORKERS", 2))
+    PARSE_QUEUE_SIZE: int = int(os.getenv("PARSE_QUEUE_SIZE", 64))
+    EXPORT_CACHE_SIZE: int = int(os.getenv("EXPORT_CACHE_SIZE", 4096))
+    TEMPLATE_CACHE_DIR: str | None = os.getenv("TEMPLATE_CACHE_DIR")
+    TEMPLATE_AUTO_RELOAD: bool = os.getenv("TEMPLATE_AUTO_RELOAD", "") == "1"
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+    PROFILE_REQUESTS: bool = os.getenv("PROFILE_REQUESTS", "") == "1"
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", 0.0))
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", 5.0))
+    PROFILE_DIR: str | None = os.getenv("PROFILE_DIR")
+    LIVE_HEARTBEAT_S: float = float(os.getenv("LIVE_HEARTBEAT_S", 15.0))
+    LIVE_QUEUE_SIZE: int = int(os.getenv("LIVE_QUEUE_SIZE", 32))
 
 
 settings = Settings()
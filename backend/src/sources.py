@@ -0,0 +1,146 @@
+"""
+Sites songs are imported from.
+
+Each source handles the pages of some hosts: it fetches a page and parses it
+into a Song. Fetched pages are kept in an on-disk cache with their ETag when
+PAGE_CACHE_DIR is set, so that a page is downloaded again only if it changed,
+and an import can be parsed again offline, e.g. after a parser is improved.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from collections.abc import Callable
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+import httpx
+from models import supermusic, ultimate_guitar
+from models.song import Song
+from settings import settings
+from utils import downloader, get_logger
+from workers import parse_pool
+
+logger = get_logger(__file__)
+
+
+class PageNotCached(LookupError):
+    """A page to be read offline that is not in the page cache."""
+
+
+class CachedPage(NamedTuple):
+    url: str
+    etag: str | None
+    page: str
+
+
+class PageCache:
+    """Raw pages by URL, one JSON file each, in `directory` if it is set."""
+
+    def __init__(self, directory: str | None):
+        self.directory = directory
+
+    def path(self, url: str) -> str:
+        key = hashlib.sha1(url.encode()).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, url: str) -> CachedPage | None:
+        if not self.directory:
+            return None
+        try:
+            with open(self.path(url), encoding="utf-8") as file:
+                cached = CachedPage(**json.load(file))
+        except (OSError, ValueError, TypeError):
+            return None
+        return cached if cached.url == url else None
+
+    def put(self, url: str, page: str, etag: str | None):
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(url)
+        # Written aside and renamed, so readers never see half a page.
+        with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+            json.dump(CachedPage(url, etag, page)._asdict(), file)
+        os.replace(f"{path}.tmp", path)
+
+
+page_cache = PageCache(settings.PAGE_CACHE_DIR)
+
+
+class Source:
+    """A site songs are imported from, and how to parse its pages."""
+
+    def __init__(self, name: str, hosts: tuple[str, ...], parse: Callable):
+        self.name = name
+        self.hosts = hosts
+        self.parse: Callable[[str], Song] = parse
+
+    def matches(self, url: str) -> bool:
+        host = (urlsplit(url).hostname or "").lower()
+        return any(host == name or host.endswith(f".{name}") for name in self.hosts)
+
+    async def fetch(self, url: str, offline: bool = False) -> str:
+        """
+        The page at `url`, from the cache if the server says it is unchanged,
+        or without asking the server at all if `offline`, when PageNotCached
+        is raised for pages not in the cache.
+        """
+        cached = await asyncio.to_thread(page_cache.get, url)
+        if offline:
+            if cached is None:
+                raise PageNotCached(f"The page of {url} is not in the page cache.")
+            return cached.page
+        response = await downloader.fetch(url, cached.etag if cached else None)
+        if response.status_code == 304:
+            return cached.page
+        await asyncio.to_thread(
+            page_cache.put, url, response.text, response.headers.get("ETag")
+        )
+        return response.text
+
+    async def download(self, url: str, offline: bool = False) -> Song:
+        """The song at `url`, parsed in the parse pool once there is room."""
+        page = await self.fetch(url, offline)
+        return await parse_pool.run(self.parse, page, wait=True)
+
+
+sources: list[Source] = []
+
+
+def register(source: Source) -> Source:
+    sources.append(source)
+    return source
+
+
+def source_for(url: str) -> Source:
+    for source in sources:
+        if source.matches(url):
+            return source
+    supported = [host for source in sources for host in source.hosts]
+    raise NotImplementedError(
+        f"This url is not supported yet: {url}. Supported: {supported}"
+    )
+
+
+register(
+    Source("ultimate-guitar", ("ultimate-guitar.com",), ultimate_guitar.parse_page)
+)
+register(
+    Source("supermusic", ("supermusic.cz", "supermusic.sk"), supermusic.parse_page)
+)
+
+
+async def download(url: str, offline: bool = False) -> Song | None:
+    """
+    The song at `url`, or None if the page cannot be retrieved. Offline,
+    PageNotCached is raised for a page that was not kept.
+    """
+    source = source_for(url)
+    logger.info("Processing url as %s: %s", source.name, url)
+    try:
+        return await source.download(url, offline)
+    except httpx.HTTPError as e:
+        logger.error("Requested URL %s cannot be retrieved: %s", url, e)
+        return None
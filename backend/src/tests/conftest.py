@@ -0,0 +1,26 @@
+import os
+
+import pytest
+from database import registry
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+SRC_DIR = os.path.realpath(f"{os.path.realpath(__file__)}/../..")
+
+
+@pytest.fixture
+def db_client():
+    client = AsyncMongoMockClient()
+    registry.register(client)
+    yield client
+    registry.close()
+
+
+@pytest.fixture
+def client(db_client, monkeypatch):
+    # Templates are resolved relative to the source directory, as in the Dockerfile.
+    monkeypatch.chdir(SRC_DIR)
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,109 @@
+from compress_middleware import accepted_encoding
+
+SONGS = {
+    "Help": "{title: Help}\n{artist: Beatles}\n{key: A}\n\n[Am]Help, I need [F]somebody",
+    "Yesterday": "{title: Yesterday}\n{artist: Beatles}\n\n[F]Yesterday, [Em]all my",
+    "Ring of Fire": "{title: Ring of Fire}\n{artist: Johnny Cash}\n\n[G]Love is a [C]burning",
+}
+
+
+def add_songs(client) -> dict[str, str]:
+    for chordpro in SONGS.values():
+        data = {"input-method": "text-field", "chordpro": chordpro}
+        client.post("/songs", data=data, follow_redirects=False)
+    page = client.get("/api/v1/songs").json()
+    return {song["title"]: song["id"] for song in page["items"]}
+
+
+def test_batch_keeps_order_and_selects_fields(client, db_client):
+    ids = add_songs(client)
+    requested = [ids["Yesterday"], "000000000000000000000000", ids["Help"], "bad"]
+
+    response = client.get(
+        "/api/v1/songs",
+        params={"ids": ",".join(requested), "fields": "title,meta", "transpose": 2},
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "items": [
+            {"id": ids["Yesterday"], "title": "Yesterday", "meta": {}},
+            {"id": ids["Help"], "title": "Help", "meta": {"key": "A"}},
+        ],
+        "missing": ["000000000000000000000000", "bad"],
+    }
+
+    song = client.get(
+        f"/api/v1/songs/{ids['Help']}", params={"transpose": 2, "fields": "sections"}
+    ).json()
+    assert song["sections"][0]["lines"] == [
+        [{"chord": "Bm"}, "Help, I need ", {"chord": "G"}, "somebody"]
+    ]
+    assert client.get("/api/v1/songs", params={"fields": "lyrics"}).status_code == 400
+    assert client.get("/api/v1/songs/000000000000000000000000").status_code == 404
+
+
+def test_pages_of_songs_and_artists(client, db_client):
+    add_songs(client)
+    first = client.get("/api/v1/songs", params={"limit": 2}).json()
+    second = client.get(
+        "/api/v1/songs", params={"limit": 2, "after": first["next"]}
+    ).json()
+    titles = [song["title"] for song in first["items"] + second["items"]]
+    assert titles == ["Help", "Yesterday", "Ring of Fire"]
+    assert second["next"] is None
+
+    artists = client.get("/api/v1/artists").json()["items"]
+    assert artists == [
+        {"name": "Beatles", "song_count": 2},
+        {"name": "Johnny Cash", "song_count": 1},
+    ]
+    songs = client.get("/api/v1/artists/Beatles/songs").json()["items"]
+    assert [song["title"] for song in songs] == ["Help", "Yesterday"]
+
+
+def test_songbook_comes_with_its_songs(client, db_client):
+    ids = add_songs(client)
+    response = client.post("/songbooks", data={"name": "Gig"}, follow_redirects=False)
+    songbook_id = response.headers["location"].rsplit("/", 1)[1]
+    client.post(
+        f"/songbooks/{songbook_id}",
+        data={
+            "song_id": [ids["Ring of Fire"], ids["Help"], ids["Yesterday"]],
+            "transpose": [0, 2, 0],
+        },
+    )
+    client.post(f"/songs/delete/{ids['Yesterday']}", follow_redirects=False)
+
+    songbook = client.get(
+        f"/api/v1/songbooks/{songbook_id}", params={"fields": "title,chordpro"}
+    ).json()
+    assert songbook["name"] == "Gig"
+    assert [(song["title"], song["transpose"]) for song in songbook["songs"]] == [
+        ("Ring of Fire", 0),
+        ("Help", 2),
+    ]
+    assert "[Bm]Help" in songbook["songs"][1]["chordpro"]
+    assert songbook["missing"] == [ids["Yesterday"]]
+    assert client.get("/api/v1/songbooks").json() == [
+        {"id": songbook_id, "name": "Gig", "song_count": 3}
+    ]
+
+
+def test_responses_are_compressed(client, db_client):
+    ids = add_songs(client)
+    batch = ",".join([ids["Help"]] * 50)
+
+    response = client.get(
+        "/api/v1/songs", params={"ids": batch}, headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert len(response.json()["items"]) == 50
+
+    raw = client.get(
+        f"/api/v1/songs/{ids['Help']}", headers={"Accept-Encoding": "identity"}
+    )
+    assert "content-encoding" not in raw.headers
+
+    assert accepted_encoding("br;q=0, gzip;q=0.5") == "gzip"
+    assert accepted_encoding("gzip;q=0") is None
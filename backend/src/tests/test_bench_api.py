@@ -0,0 +1,34 @@
+import argparse
+import asyncio
+
+from benchmarks import bench_api
+from workers import import_pool
+
+
+def test_every_route_of_the_load_test_succeeds(db_client, monkeypatch):
+    monkeypatch.setattr(import_pool, "workers", 0)
+    args = argparse.Namespace(
+        songs=40,
+        requests=4,
+        connections=2,
+        url=None,
+        routes=None,
+        seed=0,
+        json=None,
+        check=False,
+        update_thresholds=False,
+    )
+    results = asyncio.run(bench_api.main(args))
+
+    assert set(results) == {scenario.name for scenario in bench_api.SCENARIOS}
+    assert {
+        name: result["errors"] for name, result in results.items()
+    } == dict.fromkeys(results, 0)
+
+
+def test_thresholds_are_kept_for_each_kind_of_run():
+    config = {"database": "mongodb", "driver": "http", "songs": 100_000}
+    stand_in = {**config, "database": "mongomock", "routes": {}}
+    recorded = [stand_in, {**config, "routes": {}}]
+    assert bench_api.thresholds_for(recorded, config) is recorded[1]
+    assert bench_api.thresholds_for(recorded, {**config, "songs": 1000}) is None
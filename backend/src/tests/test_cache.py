@@ -0,0 +1,119 @@
+import asyncio
+
+from cache import SongCache, song_cache
+from models.song import Song
+from models.storage import to_document
+from settings import settings
+
+CHORDPRO = "{title: Help}\n{artist: Beatles}\n{capo: 2}\n[Am]Help, I need [F]somebody"
+
+
+def test_lru_eviction_and_invalidation():
+    cache = SongCache(max_size=2)
+    cache.put(("a", 0), "a0")
+    cache.put(("b", 0), "b0")
+    assert cache.get(("a", 0)) == "a0"
+    cache.put(("a", 1), "a1")
+    assert cache.get(("b", 0)) is None
+    cache.invalidate("a")
+    assert len(cache) == 0
+
+
+def test_transpose_with_capo():
+    song = Song.from_chordpro(CHORDPRO)
+    assert str(song.transpose(2).sections[0]) == "[Bm]Help, I need [G]somebody"
+    # Capo 2 -> 0 moves the shapes up two semitones to sound the same.
+    moved = song.transpose(0, capo=0)
+    assert moved.capo == 0
+    assert str(moved.sections[0]) == "[Bm]Help, I need [G]somebody"
+
+
+def test_transposed_song_is_cached_until_update(client, db_client):
+    song_cache.clear()
+    song_cache.hits = 0
+    songs = db_client.get_database(settings.MONGODB_DATABASE).songs
+    result = asyncio.run(songs.insert_one(to_document(Song.from_chordpro(CHORDPRO))))
+    song_id = str(result.inserted_id)
+
+    params = {"transpose": 2, "format": "json"}
+    response = client.get(f"/songs/{song_id}", params=params)
+    assert response.json()["chordpro"].endswith("[Bm]Help, I need [G]somebody")
+    client.get(f"/songs/{song_id}", params=params)
+    assert song_cache.hits == 1
+
+    chordpro = CHORDPRO.replace("Am", "Em")
+    client.post(
+        f"/songs/update/{song_id}",
+        data={"chordpro": chordpro},
+        follow_redirects=False,
+    )
+    response = client.get(f"/songs/{song_id}", params=params)
+    assert response.json()["chordpro"].endswith("[F#m]Help, I need [G]somebody")
+
+    response = client.get(f"/songs/{song_id}", params={"transpose": 1})
+    assert "Transpose 1" in response.text
+
+
+def test_cached_song_follows_updates_by_other_processes(client, db_client):
+    song_cache.clear()
+    songs = db_client.get_database(settings.MONGODB_DATABASE).songs
+    result = asyncio.run(songs.insert_one(to_document(Song.from_chordpro(CHORDPRO))))
+    url = f"/songs/{result.inserted_id}"
+    etag = client.get(url).headers["etag"]
+
+    # Written directly, as another server process would, without invalidating.
+    edited = to_document(Song.from_chordpro(CHORDPRO.replace("Help", "Yelp")))
+    update = {"$set": edited, "$inc": {"revision": 1}}
+    asyncio.run(songs.update_one({"_id": result.inserted_id}, update))
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "Yelp" in response.text
+
+
+def test_cached_page_does_not_depend_on_the_requester(client, db_client):
+    song_cache.clear()
+    songs = db_client.get_database(settings.MONGODB_DATABASE).songs
+    result = asyncio.run(songs.insert_one(to_document(Song.from_chordpro(CHORDPRO))))
+    url = f"/songs/{result.inserted_id}"
+
+    first = client.get(url, params={"transpose": 1, "capo": 0, "x": "evil"}).text
+    headers = {"Host": "evil.example"}
+    second = client.get(url, params={"transpose": 1, "capo": 0}, headers=headers).text
+    assert first == second
+    assert "evil" not in first
+    assert 'href="?transpose=2&amp;capo=0"' in first
+
+
+def test_cache_is_bounded_by_bytes():
+    cache = SongCache(max_size=10, max_bytes=10)
+    cache.put(("a", 0), "aaaaaa")
+    cache.put(("b", 0), "bbbbbb")
+    assert cache.get(("a", 0)) is None
+    assert cache.size_bytes == 6
+    cache.invalidate("b")
+    assert cache.size_bytes == 0
+
+
+def test_conditional_get(client, db_client):
+    song_cache.clear()
+    songs = db_client.get_database(settings.MONGODB_DATABASE).songs
+    result = asyncio.run(songs.insert_one(to_document(Song.from_chordpro(CHORDPRO))))
+    url = f"/songs/{result.inserted_id}"
+
+    response = client.get(url)
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    response = client.get(url, headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+    client.post(
+        f"/songs/update/{result.inserted_id}",
+        data={"chordpro": CHORDPRO.replace("Am", "Em")},
+        follow_redirects=False,
+    )
+    assert asyncio.run(songs.find_one())["revision"] == 1
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
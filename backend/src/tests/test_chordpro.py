@@ -0,0 +1,89 @@
+import asyncio
+import io
+
+import pytest
+from models import chordpro
+
+CHORDPRO = """{t: Help}
+{artist: Beatles}
+{key: A}
+{tempo: 95}
+# Not part of the song
+{c: Intro}
+
+{soc: Refrain}
+[Am]Help, I need [F]somebody
+
+[C]Help, not just anybody
+{eoc}
+{sov}
+When I was [F/C]younger
+{eov}
+{chorus}
+{start_of_tab}
+e|--0--[x]--|
+{end_of_tab}
+"""
+
+
+def test_directives():
+    song = chordpro.parse_chordpro(CHORDPRO)
+    assert (song.title, song.artist) == ("Help", "Beatles")
+    assert song.meta == {"key": "A", "tempo": "95"}
+    labels = [(section.label, section.title) for section in song.sections]
+    assert labels == [
+        ("comment", "Intro"),
+        ("chorus", "Refrain"),
+        ("verse", None),
+        ("chorus", "Refrain"),
+        ("tab", None),
+    ]
+    # Blank lines inside an environment do not split it.
+    assert len(song.sections[1].lines) == 2
+    assert song.sections[3].lines == song.sections[1].lines
+    assert str(song.sections[4].lines[0]) == "e|--0--[x]--|"
+
+
+def test_round_trip():
+    song = chordpro.parse_chordpro(CHORDPRO)
+    assert chordpro.parse_chordpro(str(song)).sections == song.sections
+    assert chordpro.parse_chordpro(str(song)).meta == song.meta
+
+
+@pytest.mark.parametrize(
+    "text, line, column",
+    [
+        ("{title: X}\n\nLa [Am la", 3, 4),
+        ("{title: X}\n[Xm]La", 2, 2),
+        ("{capo: two}", 1, 1),
+        ("{title: X", 1, 9),
+    ],
+)
+def test_errors_have_positions(text, line, column):
+    with pytest.raises(chordpro.ChordProError) as error:
+        chordpro.parse_chordpro(text)
+    assert (error.value.line, error.value.column) == (line, column)
+
+
+def test_file_and_stream_input():
+    expected = chordpro.parse_chordpro(CHORDPRO)
+    assert chordpro.parse_chordpro(io.StringIO(CHORDPRO)) == expected
+
+    async def chunks():
+        data = CHORDPRO.encode()
+        for i in range(0, len(data), 7):
+            yield data[i : i + 7]
+
+    assert asyncio.run(chordpro.parse_chordpro_stream(chunks())) == expected
+
+
+def test_long_line_streamed_byte_by_byte():
+    lyrics = "la " * 100_000
+
+    async def chunks():
+        data = f"{{title: Long}}\n{lyrics}\nEnd".encode()
+        for i in range(len(data)):
+            yield data[i : i + 1]
+
+    song = asyncio.run(chordpro.parse_chordpro_stream(chunks()))
+    assert song == chordpro.parse_chordpro(f"{{title: Long}}\n{lyrics}\nEnd")
@@ -0,0 +1,68 @@
+import pickle
+
+import pytest
+from models import composition
+from models.composition import Chord, ChordQuality, Tone
+from models.song import Line
+
+
+def test_chords_are_interned():
+    assert Chord.parse("Am") is Chord.parse("Amin")
+    assert Chord.parse("A#") is Chord.parse("Bb")
+    assert Chord(root=Tone(9), quality="minor") is Chord.parse("Am")
+    assert Chord.parse("Am").quality is ChordQuality.minor
+
+
+def test_caches_of_user_labels_are_bounded(monkeypatch):
+    monkeypatch.setattr(composition, "PARSE_CACHE_SIZE", 10)
+    monkeypatch.setattr(composition, "UNKNOWN_QUALITY_CACHE_SIZE", 10)
+    chord = Chord.parse("Cfirst")
+    for i in range(50):
+        Chord.parse(f"Cq{i}")
+    assert len(Chord._parsed) <= 10
+    assert len(Chord._interned_unknown) <= 10
+    assert Chord.parse("Cfirst") == chord
+    assert hash(Chord.parse("Cfirst")) == hash(chord)
+
+
+def test_tone_values_are_checked():
+    with pytest.raises(ValueError):
+        Tone(-1)
+    with pytest.raises(ValueError):
+        Tone(12)
+
+
+def test_chords_are_immutable():
+    with pytest.raises(AttributeError):
+        Chord.parse("C").root = Tone(2)
+
+
+def test_transpose():
+    chord = Chord.parse("C#m7/G#")
+    assert str(chord.transpose(2)) == "D#m7/A#"
+    assert str(chord.transpose(-1)) == "Cm7/G"
+    assert chord.transpose(12) is chord
+
+
+def test_str_uses_canonical_names():
+    assert [str(Chord.parse(label)) for label in ("Hmi", "Ebmaj", "Gsus")] == [
+        "Bm",
+        "D#",
+        "Gsus",
+    ]
+
+
+def test_pickle_keeps_identity():
+    chord = Chord.parse("F/C")
+    assert pickle.loads(pickle.dumps(chord)) is chord
+
+
+def test_models_serialize_nested_chords():
+    line = Line.from_chordpro("[G/B]Hello [Cadd6]world")
+    dumped = line.model_dump()
+    assert dumped["parts"][0] == {
+        "root": {"value": 7},
+        "quality": ChordQuality.major,
+        "bass": {"value": 11},
+    }
+    assert Line.model_validate(dumped).parts == line.parts
@@ -0,0 +1,46 @@
+import asyncio
+
+from database import get_db_client, registry
+from indexes import INDEXES, ensure_indexes
+from settings import settings
+
+
+def test_client_is_shared(db_client):
+    assert get_db_client() is db_client
+    assert get_db_client() is get_db_client()
+
+
+def test_pool_stats_track_checkouts(db_client):
+    _, stats = next(iter(registry._pool_stats.items()))
+    stats.connection_created(None)
+    stats.connection_check_out_started(None)
+    stats.connection_checked_out(None)
+
+    assert registry.pool_stats()["default"]["checked_out"] == 1
+    assert registry.pool_stats()["default"]["connections_open"] == 1
+
+    stats.connection_checked_in(None)
+    assert registry.pool_stats()["default"]["checked_out"] == 0
+    assert registry.pool_stats()["default"]["checkouts"] == 1
+
+
+def test_health_reports_pools(client):
+    response = client.get("/health")
+    assert "default" in response.json()["pools"]
+
+
+def test_indexes_are_idempotent_and_reject_duplicates(client, db_client):
+    database = db_client.get_database(settings.MONGODB_DATABASE)
+    asyncio.run(ensure_indexes(database))
+    names = asyncio.run(database.songs.index_information())
+    assert {model.document["name"] for model in INDEXES["songs"]} <= set(names)
+
+    chordpro = "{title: Help}\n{artist: Beatles}\n\n[Am]Help"
+    for _ in range(2):
+        response = client.post(
+            "/songs",
+            data={"input-method": "text-field", "chordpro": chordpro},
+            follow_redirects=False,
+        )
+    assert "already exists" in response.text
+    assert asyncio.run(database.songs.count_documents({})) == 1
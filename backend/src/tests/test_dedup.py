@@ -0,0 +1,106 @@
+import asyncio
+
+import dedup
+from importer import import_chordpro, run_import
+from models.fingerprint import fingerprint, is_duplicate, similarity
+from models.song import Song
+from settings import settings
+
+VERSES = [
+    "[Am]Walking down the [F]empty road under [C]skies of grey and [G]rain",
+    "[Am]Every step I [F]take brings me [C]closer to the [G]night",
+    "[F]Hold on hold [G]on to the [Am]light we found",
+    "[F]Nothing but the [G]night and the [C]sound of the [E]town",
+    "[Am]Lanterns on the [F]water and a [C]song I used to [G]know",
+    "[Am]Turning every [F]corner where the [C]river used to [G]flow",
+    "[F]Carry me [G]home through the [Am]cold and the dark",
+    "[F]Carry me [G]home to the [C]fire and the [E]spark",
+]
+
+
+def song_text(title: str, artist: str, lines: list[str]) -> str:
+    return "\n".join([f"{{title: {title}}}", f"{{artist: {artist}}}", "", *lines])
+
+
+def transposed(line: str) -> str:
+    """The line two semitones up, with sevenths instead of the triads."""
+    chords = {"[Am]": "[Bm7]", "[F]": "[G]", "[C]": "[D]", "[G]": "[A7]", "[E]": "[F#]"}
+    for chord in sorted(chords, key=len, reverse=True):
+        line = line.replace(chord, chords[chord].replace("[", "{").replace("]", "}"))
+    return line.replace("{", "[").replace("}", "]")
+
+
+ORIGINAL = song_text("Empty Road", "Synthetic Band", VERSES)
+RETITLED = song_text("Empty road!", "Synthétic Band", VERSES)
+TRANSPOSED = song_text(
+    "Empty Road (live)", "Synthetic Band", [transposed(line) for line in VERSES]
+)
+EDITED = song_text(
+    "Empty Road (v2)",
+    "Synthetic Band",
+    [*VERSES[:-1], VERSES[-1].replace("spark", "flame")],
+)
+OTHER = song_text("Night Road", "Synthetic Band", ["[G]Something [D]else entirely"])
+
+
+def fingerprint_of(text: str) -> dict:
+    return fingerprint(Song.from_chordpro(text))
+
+
+def test_same_song_under_another_spelling():
+    assert fingerprint_of(RETITLED)["key"] == fingerprint_of(ORIGINAL)["key"]
+
+
+def test_transposed_chords_do_not_change_the_signature():
+    original, other = fingerprint_of(ORIGINAL), fingerprint_of(TRANSPOSED)
+    assert other["key"] != original["key"]
+    assert other["minhash"] == original["minhash"]
+
+
+def test_near_duplicates():
+    original = fingerprint_of(ORIGINAL)
+    edited = fingerprint_of(EDITED)
+    assert 0.7 <= similarity(original["minhash"], edited["minhash"]) < 1
+    # Near-duplicates share at least one band to be looked up by.
+    assert set(original["bands"]) & set(edited["bands"])
+    assert is_duplicate(original, edited)
+    assert not is_duplicate(original, fingerprint_of(OTHER))
+
+
+def test_empty_songs_are_not_near_duplicates():
+    empty = fingerprint_of(song_text("A", "B", []))
+    assert empty["bands"] == []
+    assert not is_duplicate(empty, fingerprint_of(song_text("C", "D", [])))
+
+
+def test_songs_with_few_lyrics_are_not_near_duplicates():
+    first = fingerprint_of(song_text("One", "B", ["[C]x"]))
+    second = fingerprint_of(song_text("Two", "B", ["[D]new"]))
+    assert first["minhash"] == second["minhash"] == []
+    assert not is_duplicate(first, second)
+
+
+def test_import_flags_duplicates_of_older_songs(db_client):
+    collection = db_client.get_database(settings.MONGODB_DATABASE).songs
+    files = [
+        ("original.cho", ORIGINAL),
+        ("other.cho", OTHER),
+        ("retitled.cho", RETITLED),
+        ("transposed.cho", TRANSPOSED),
+    ]
+    result = asyncio.run(run_import(import_chordpro(collection, files, 2, 0)))
+    assert (result["inserted"], result["duplicates"]) == (4, 2)
+
+    songs = asyncio.run(collection.find({}).sort("_id", 1).to_list(None))
+    original_id = songs[0]["_id"]
+    assert [song.get("duplicate_of") for song in songs] == [
+        None,
+        None,
+        [original_id],
+        [original_id, songs[2]["_id"]],
+    ]
+
+    groups = asyncio.run(dedup.duplicate_groups(collection))
+    assert [[song["title"] for song in group] for group in groups] == [
+        ["Empty Road", "Empty road!", "Empty Road (live)"]
+    ]
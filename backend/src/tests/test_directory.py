@@ -0,0 +1,61 @@
+import asyncio
+
+from directory import letter, rebuild_directory, sort_key
+from settings import settings
+
+
+def chordpro(title, artist):
+    return f"{{title: {title}}}\n{{artist: {artist}}}\n\n[C]La la"
+
+
+def add(client, title, artist):
+    client.post(
+        "/songs",
+        data={"input-method": "text-field", "chordpro": chordpro(title, artist)},
+        follow_redirects=False,
+    )
+
+
+def directory_state(artists):
+    documents = asyncio.run(artists.find({}, {"_id": 0}).to_list(None))
+    return {
+        document["name"]: sorted(song["title"] for song in document["songs"])
+        for document in documents
+        if document["song_count"] == len(document["songs"])
+    }
+
+
+def test_sort_keys():
+    assert sort_key("The Beatles") == "beatles"
+    assert letter("Édith Piaf") == "E"
+    assert letter("2Pac") == "#"
+
+
+def test_directory_follows_song_writes(client, db_client):
+    database = db_client.get_database(settings.MONGODB_DATABASE)
+    add(client, "Help", "The Beatles")
+    add(client, "Yesterday", "The Beatles")
+    add(client, "Wonderwall", "Oasis")
+    assert directory_state(database.artists) == {
+        "The Beatles": ["Help", "Yesterday"],
+        "Oasis": ["Wonderwall"],
+    }
+
+    wonderwall = asyncio.run(database.songs.find_one({"title": "Wonderwall"}))
+    client.post(
+        f"/songs/update/{wonderwall['_id']}",
+        data={"chordpro": chordpro("Wonderwall", "Ryan Adams")},
+        follow_redirects=False,
+    )
+    help = asyncio.run(database.songs.find_one({"title": "Help"}))
+    client.post(f"/songs/delete/{help['_id']}", follow_redirects=False)
+    expected = {"The Beatles": ["Yesterday"], "Ryan Adams": ["Wonderwall"]}
+    assert directory_state(database.artists) == expected
+
+    asyncio.run(rebuild_directory(database.songs, database.artists))
+    assert directory_state(database.artists) == expected
+
+    response = client.get("/artists", params={"letter": "B"})
+    assert "The Beatles" in response.text and "Ryan Adams" not in response.text
+    response = client.get("/artists", params={"limit": 1})
+    assert "The Beatles" in response.text and "Next page" in response.text
@@ -0,0 +1,60 @@
+import asyncio
+
+from facets import facet_counts, facet_query
+from indexes import ensure_indexes
+from models.song import Difficulty, Song
+from models.storage import from_document, to_document
+from settings import settings
+
+SONGS = [
+    ("Help", "Beatles", "easy", "rock"),
+    ("Yesterday", "Beatles", "intermediate", "pop"),
+    ("Let It Be", "Beatles", "easy", "pop"),
+    ("Wonderwall", "Oasis", "easy", "rock"),
+    ("Autumn Leaves", "Kosma", "hard", "jazz"),
+]
+
+
+def chordpro(title, artist, difficulty, genre):
+    return (
+        f"{{title: {title}}}\n{{artist: {artist}}}\n"
+        f"{{difficulty: {difficulty}}}\n{{genre: {genre}}}\n\n[C]La la [G]la"
+    )
+
+
+def insert_songs(db_client):
+    collection = db_client.get_database(settings.MONGODB_DATABASE).songs
+    documents = [to_document(Song.from_chordpro(chordpro(*song))) for song in SONGS]
+    asyncio.run(collection.insert_many(documents))
+    asyncio.run(ensure_indexes(collection.database))
+    return collection
+
+
+def test_metadata_round_trip():
+    song = Song.from_chordpro(chordpro("Help", "Beatles", "Easy", "Rock"))
+    assert song.difficulty == Difficulty.easy
+    assert song.genre == "rock"
+    assert Song.from_chordpro(str(song)).difficulty == Difficulty.easy
+    decoded = from_document(to_document(song))
+    assert (decoded.difficulty, decoded.genre) == (Difficulty.easy, "rock")
+
+
+def test_facet_counts(db_client):
+    collection = insert_songs(db_client)
+    counts = asyncio.run(facet_counts(collection, facet_query(difficulty="easy")))
+    assert counts["artist"] == [("Beatles", 2), ("Oasis", 1)]
+    assert counts["genre"] == [("rock", 2), ("pop", 1)]
+    assert counts["difficulty"] == [("easy", 3)]
+
+
+def test_filter_songs(client, db_client):
+    insert_songs(db_client)
+    response = client.get(
+        "/filter_songs", params={"genre": "Rock", "difficulty": "easy"}
+    )
+    assert "Help" in response.text and "Wonderwall" in response.text
+    assert "Let It Be" not in response.text
+    assert "Beatles (1)" in response.text
+
+    response = client.get("/filter_songs", params={"difficulty": "impossible"})
+    assert response.status_code == 422
@@ -0,0 +1,76 @@
+import asyncio
+import io
+import json
+import tarfile
+import zipfile
+
+import pytest
+from importer import import_chordpro, read_archive, run_import
+from settings import settings
+from workers import import_pool
+
+FILES = {
+    "songs/help.cho": "{title: Help}\n{artist: Beatles}\n[C]Help, I need [G]somebody",
+    "songs/waterloo.cho": "{title: Waterloo}\n{artist: Abba}\n[D]My my",
+    "songs/broken.cho": "{title: Broken}\n{capo: two}\n[C]La",
+    "songs/readme.md": "Not a song",
+}
+
+
+def make_zip() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, text in FILES.items():
+            archive.writestr(name, text)
+    return buffer.getvalue()
+
+
+def make_tar() -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, text in FILES.items():
+            data = text.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("make_archive", [make_zip, make_tar])
+def test_read_archive_skips_other_files(make_archive):
+    names = [name for name, _ in read_archive(make_archive())]
+    assert sorted(names) == ["songs/broken.cho", "songs/help.cho", "songs/waterloo.cho"]
+
+
+def test_read_archive_rejects_other_uploads():
+    with pytest.raises(ValueError):
+        read_archive(b"just some text")
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_import_reports_failures(db_client, workers):
+    collection = db_client.get_database(settings.MONGODB_DATABASE).songs
+    files = read_archive(make_zip())
+    updates = import_chordpro(collection, files, batch_size=1, workers=workers)
+    result = asyncio.run(run_import(updates))
+
+    assert result["done"]
+    assert (result["files"], result["inserted"], result["failed"]) == (3, 2, 1)
+    assert [error["file"] for error in result["errors"]] == ["songs/broken.cho"]
+    assert asyncio.run(collection.count_documents({})) == 2
+
+
+def test_import_endpoint_streams_progress(client, monkeypatch):
+    monkeypatch.setattr(import_pool, "workers", 0)
+    response = client.post(
+        "/songs/import", files={"archive": ("songs.tar.gz", make_tar())}
+    )
+    assert response.status_code == 200
+    updates = [json.loads(line) for line in response.text.splitlines()]
+    assert updates[-1]["done"]
+    assert updates[-1]["inserted"] == 2
+
+
+def test_import_endpoint_rejects_other_uploads(client):
+    response = client.post("/songs/import", files={"archive": ("a.txt", b"text")})
+    assert response.status_code == 400
@@ -0,0 +1,178 @@
+import asyncio
+import json
+
+import live
+import pytest
+from bson import ObjectId
+from models.song import Song
+from models.storage import to_document
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+from routes.songbook import publish_change, songbook_state
+from settings import settings
+
+
+def song(title: str, chord: str) -> dict:
+    chordpro = f"{{title: {title}}}\n{{artist: Band}}\n\n[{chord}]La la"
+    return to_document(Song.from_chordpro(chordpro))
+
+
+def events(subscriber: live.Subscriber) -> list[tuple[str, dict]]:
+    received = []
+    while not subscriber.queue.empty():
+        message = subscriber.queue.get_nowait().decode()
+        event, data = message.strip().split("\n")
+        received.append(
+            (event.removeprefix("event: "), json.loads(data.removeprefix("data: ")))
+        )
+    return received
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    hub = live.Hub(queue_size=4)
+    monkeypatch.setattr(live, "hub", hub)
+    return hub
+
+
+def test_hub_fans_out_to_followers_and_closes_slow_ones(hub):
+    first, second = hub.subscribe("gig"), hub.subscribe("gig")
+    other = hub.subscribe("rehearsal")
+    hub.publish("gig", "playing", {"position": 1})
+    assert events(first) == events(second) == [("playing", {"position": 1})]
+    assert events(other) == []
+
+    for position in range(5):
+        hub.publish("gig", "playing", {"position": position})
+    assert first.overflowed and second.overflowed
+
+    hub.songbooks["gig"] = {"entries": []}
+    hub.unsubscribe(first)
+    hub.unsubscribe(second)
+    assert hub.connections == 1
+    assert "gig" not in hub.songbooks
+
+
+def test_changes_are_published_to_the_songbooks_of_the_song(hub, client, db_client):
+    database = db_client.get_database(settings.MONGODB_DATABASE)
+    first, second = asyncio.run(
+        database.songs.insert_many([song("First", "C"), song("Second", "Am")])
+    ).inserted_ids
+    songbook = {
+        "name": "Gig",
+        "entries": [
+            {"song_id": first, "transpose": 0},
+            {"song_id": second, "transpose": 0},
+            {"song_id": first, "transpose": 2},
+        ],
+    }
+    songbook_id = asyncio.run(database.songbooks.insert_one(songbook)).inserted_id
+    subscriber = hub.subscribe(str(songbook_id))
+    hub.songbooks[str(songbook_id)] = songbook_state(songbook)
+
+    edited = {**song("First edit", "G"), "revision": 1}
+    asyncio.run(database.songs.update_one({"_id": first}, {"$set": edited}))
+    asyncio.run(publish_change(database, "songs", "update", first))
+    [(event, data)] = events(subscriber)
+    assert (event, data["id"], data["revision"]) == ("song", str(first), 1)
+    assert sorted(data["versions"]) == ["0", "2"]
+    assert "First edit" in data["versions"]["0"]
+    assert "[A]" in data["versions"]["2"]
+
+    response = client.post(f"/songbooks/{songbook_id}/playing", data={"position": 1})
+    assert response.status_code == 204
+    response = client.post(f"/songbooks/{songbook_id}/playing", data={"position": 3})
+    assert response.status_code == 400
+    asyncio.run(publish_change(database, "songbooks", "update", songbook_id))
+    playing = {"position": 1, "song_id": str(second)}
+    assert events(subscriber) == [("playing", playing)]
+
+    asyncio.run(database.songs.delete_one({"_id": second}))
+    asyncio.run(publish_change(database, "songs", "delete", second))
+    assert events(subscriber) == [("song_deleted", {"id": str(second)})]
+
+
+def test_changes_while_subscribing_are_published(hub, db_client):
+    database = db_client.get_database(settings.MONGODB_DATABASE)
+    songbook = {"name": "Gig", "entries": []}
+    songbook_id = asyncio.run(database.songbooks.insert_one(songbook)).inserted_id
+    # Subscribed, but the first state is not read yet.
+    subscriber = hub.subscribe(str(songbook_id))
+
+    asyncio.run(
+        database.songbooks.update_one({"_id": songbook_id}, {"$set": {"name": "Show"}})
+    )
+    asyncio.run(publish_change(database, "songbooks", "update", songbook_id))
+    assert events(subscriber) == [
+        ("songbook", {"name": "Show", "entries": []}),
+        ("playing", None),
+    ]
+    assert hub.songbooks[str(songbook_id)]["name"] == "Show"
+
+
+def test_playing_is_cleared_when_its_song_is_removed(hub, client, db_client):
+    database = db_client.get_database(settings.MONGODB_DATABASE)
+    first, second = asyncio.run(
+        database.songs.insert_many([song("First", "C"), song("Second", "Am")])
+    ).inserted_ids
+    entries = [{"song_id": first, "transpose": 0}, {"song_id": second, "transpose": 0}]
+    songbook = {"name": "Gig", "entries": entries}
+    songbook_id = asyncio.run(database.songbooks.insert_one(songbook)).inserted_id
+    find = database.songbooks.find_one
+    url = f"/songbooks/{songbook_id}"
+
+    client.post(f"{url}/playing", data={"position": 1})
+    client.post(url, data={"song_id": [str(first), str(second)], "name": "Show"})
+    assert asyncio.run(find({"_id": songbook_id}))["playing"]["position"] == 1
+    client.post(url, data={"song_id": [str(second)]})
+    assert "playing" not in asyncio.run(find({"_id": songbook_id}))
+
+    stale = {**songbook, "playing": {"position": 1, "song_id": second}}
+    assert songbook_state({**stale, "entries": entries[:1]})["playing"] is None
+    assert songbook_state({**stale, "entries": entries[::-1]})["playing"] is None
+
+
+def test_live_updates_need_change_streams(client, db_client):
+    songbook = {"name": "Gig", "entries": []}
+    database = db_client.get_database(settings.MONGODB_DATABASE)
+    songbook_id = asyncio.run(database.songbooks.insert_one(songbook)).inserted_id
+    assert client.get(f"/songbooks/{songbook_id}/live").status_code == 501
+
+
+def test_change_stream_of_a_replica_set(hub):
+    """Skipped when no replica set answers at MONGODB_URI."""
+
+    async def follow():
+        client = AsyncIOMotorClient(settings.MONGODB_URI, serverSelectionTimeoutMS=1000)
+        try:
+            hello = await client.admin.command("hello")
+        except PyMongoError:
+            return None
+        if "setName" not in hello:
+            return None
+        database = client.get_database("songbook_live")
+        song_id = (await database.songs.insert_one(song("Live", "C"))).inserted_id
+        songbook = {"name": "Gig", "entries": [{"song_id": song_id, "transpose": 0}]}
+        songbook_id = (await database.songbooks.insert_one(songbook)).inserted_id
+        subscriber = hub.subscribe(str(songbook_id))
+        hub.songbooks[str(songbook_id)] = songbook_state(songbook)
+
+        feed = live.ChangeFeed()
+        feed.start(database, lambda *change: publish_change(database, *change))
+        try:
+            while not feed.available:
+                await asyncio.sleep(0.01)
+            await database.songbooks.update_one(
+                {"_id": songbook_id},
+                {"$set": {"playing": {"position": 0, "song_id": song_id}}},
+            )
+            return await asyncio.wait_for(subscriber.queue.get(), 10)
+        finally:
+            await feed.close()
+            await client.drop_database("songbook_live")
+
+    message = asyncio.run(follow())
+    if message is None:
+        pytest.skip("No MongoDB replica set to watch.")
+    assert message.startswith(b"event: playing\n")
+    assert ObjectId.is_valid(json.loads(message.split(b"data: ")[1])["song_id"])
@@ -1,12 +1,8 @@
 # backend/tests/test_main.py
 
-from fastapi.testclient import TestClient
-from main import app
 
-client = TestClient(app)
-
-
-def test_index():
+def test_index(client):
     response = client.get("/")
     assert response.status_code == 200
-    assert response.json() == {"message": "Welcome to FastAPI"}
+    assert response.headers["content-type"].startswith("text/html")
+    assert "<title>Songbook</title>" in response.text
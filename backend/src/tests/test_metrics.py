@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import metrics
+from database import command_timings
+from metrics import Counter, Histogram, Registry
+from request_profiler import SamplingProfiler
+from settings import settings
+from workers import WorkerPool
+
+CHORDPRO = "{title: Help}\n{artist: Beatles}\n[Am]Help, I need [F]somebody"
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.register(
+        Histogram("duration_seconds", "Time.", ("route",), buckets=(0.1, 1))
+    )
+    counter = registry.register(Counter("errors_total", "Errors.", ("route",)))
+    histogram.observe(0.05, '/a"b')
+    histogram.observe(0.5, '/a"b')
+    histogram.observe(2, '/a"b')
+    counter.inc("/a")
+
+    assert registry.render().splitlines() == [
+        "# HELP duration_seconds Time.",
+        "# TYPE duration_seconds histogram",
+        'duration_seconds_bucket{route="/a\\"b",le="0.1"} 1',
+        'duration_seconds_bucket{route="/a\\"b",le="1"} 2',
+        'duration_seconds_bucket{route="/a\\"b",le="+Inf"} 3',
+        'duration_seconds_sum{route="/a\\"b"} 2.55',
+        'duration_seconds_count{route="/a\\"b"} 3',
+        "# HELP errors_total Errors.",
+        "# TYPE errors_total counter",
+        'errors_total{route="/a"} 1',
+    ]
+
+
+def test_observations_of_workers_are_replayed():
+    before = metrics.parse_seconds.count("chordpro")
+    pool = WorkerPool(0)
+    asyncio.run(pool.run(metrics.parse_seconds.observe, 0.01, "chordpro"))
+    assert metrics.parse_seconds.count("chordpro") == before + 1
+
+    result, observations = metrics.recorded(metrics.parse_seconds.observe, 1, "x")
+    assert observations == [(metrics.parse_seconds.name, ("x",), 1)]
+    assert metrics.parse_seconds.count("x") == 0
+
+
+def test_metrics_are_served_by_route(client, db_client):
+    client.post(
+        "/songs",
+        data={"input-method": "text-field", "chordpro": CHORDPRO},
+        follow_redirects=False,
+    )
+    client.get("/songs/000000000000000000000000")
+    text = client.get("/metrics").text
+
+    assert (
+        'songbook_http_request_duration_seconds_count{method="GET",'
+        'route="/songs/{id}",status="200"}'
+    ) in text
+    assert 'songbook_parse_duration_seconds_count{format="chordpro"}' in text
+    assert 'songbook_cache_hit_ratio{cache="song"}' in text
+
+
+def test_metrics_are_recorded_from_many_threads():
+    counter = Counter("events_total", "Events.")
+    histogram = Histogram("duration_seconds", "Time.")
+
+    def record():
+        for _ in range(10_000):
+            counter.inc()
+            histogram.observe(0.01)
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value() == histogram.count() == 80_000
+
+
+def test_streamed_responses_are_timed_to_their_first_chunk():
+    async def stream(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"a", "more_body": True})
+        await asyncio.sleep(0.2)
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "root_path": "/streamed"}
+    asyncio.run(metrics.MetricsMiddleware(stream)(scope, None, send))
+    samples = {
+        suffix: value
+        for suffix, labels, _, value in metrics.http_request_seconds.samples()
+        if labels == ("GET", "/streamed", "200")
+    }
+    assert samples["_count"] == 1
+    assert samples["_sum"] < 0.2
+
+
+def test_command_timings_are_recorded():
+    event = SimpleNamespace(command_name="find", duration_micros=1500)
+    before = metrics.mongodb_command_seconds.count("find")
+    command_timings.succeeded(event)
+    command_timings.failed(event)
+    assert metrics.mongodb_command_seconds.count("find") == before + 2
+    assert metrics.mongodb_command_failures.value("find") >= 1
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_profiler_samples_the_stack_of_a_thread():
+    with SamplingProfiler(threading.get_ident(), 0.001) as profiler:
+        busy(0.1)
+    stacks = profiler.folded().splitlines()
+    assert stacks
+    assert any(
+        line.rsplit(" ", 1)[0].split(";")[-1].startswith("busy ") for line in stacks
+    )
+
+
+def test_requests_are_profiled_on_demand(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "PROFILE_REQUESTS", True)
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+
+    assert "x-profile" not in client.get("/health").headers
+    response = client.get("/health", headers={"X-Profile": "1"})
+    assert (tmp_path / response.headers["x-profile"]).exists()
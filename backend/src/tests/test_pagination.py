@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from models.song import Song
+from pagination import InvalidCursor, decode_cursor, encode_cursor, paginate
+from settings import settings
+
+SONGS = [
+    ("Beatles", "Yesterday"),
+    ("Beatles", "Help"),
+    ("Beatles", "Let It Be"),
+    ("Abba", "Waterloo"),
+    ("Queen", "Bohemian Rhapsody"),
+]
+
+
+@pytest.fixture
+def songs_collection(db_client):
+    collection = db_client.get_database(settings.MONGODB_DATABASE).songs
+    documents = [
+        Song.from_chordpro(
+            f"{{title: {title}}}\n{{artist: {artist}}}\n[C]La la [G]la"
+        ).model_dump(by_alias=True, exclude=["id"])
+        for artist, title in SONGS
+    ]
+    asyncio.run(collection.insert_many(documents))
+    return collection
+
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor(["Beatles", "Help"])) == ["Beatles", "Help"]
+
+
+def test_invalid_cursor():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not a cursor")
+
+
+def test_cursor_with_operators_is_rejected(client, songs_collection):
+    injected = encode_cursor([{"$ne": None}, "Help", {"$regex": ".*"}])
+    with pytest.raises(InvalidCursor):
+        decode_cursor(injected)
+    response = client.get("/songs", params={"after": injected})
+    assert response.status_code == 400
+    short = encode_cursor(["Beatles"])
+    assert client.get("/songs", params={"after": short}).status_code == 400
+
+
+def test_paginate_walks_all_pages(songs_collection):
+    async def walk():
+        pages, after = [], None
+        while True:
+            documents, after = await paginate(
+                songs_collection, {}, ["artist", "title"], limit=2, after=after
+            )
+            pages.append([(d["artist"], d["title"]) for d in documents])
+            if after is None:
+                return pages
+
+    pages = asyncio.run(walk())
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [song for page in pages for song in page] == sorted(SONGS)
+
+
+def test_songs_page_uses_limit(client, songs_collection):
+    response = client.get("/songs", params={"limit": 2})
+    assert response.status_code == 200
+    assert "Waterloo" in response.text
+    assert "Yesterday" not in response.text
+    assert "after=" in response.text
+
+
+def test_artist_page_is_paginated(client, songs_collection):
+    response = client.get("/artist/Beatles", params={"limit": 3})
+    assert response.status_code == 200
+    assert "Yesterday" in response.text
+    assert "after=" not in response.text
+
+
+def test_songbook_streams_every_song(client, songs_collection):
+    response = client.get("/songbook/")
+    assert response.status_code == 200
+    for _, title in SONGS:
+        assert title in response.text
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from models.progression import chord_index, chord_search_query
+from models.song import Song
+from models.storage import to_document
+from search import build_chord_index
+from settings import settings
+
+POP = "{title: Pop}\n{artist: Band}\n[G]One [D]two [Em]three [C]four [G]five"
+BLUES = "{title: Blues}\n{artist: Band}\n[A7]One [D7]two [A7]three [E7]four"
+FOLK = "{title: Folk}\n{artist: Band}\n[G]One [C]two [D]three [G]four"
+
+
+def test_chord_index_is_key_independent():
+    in_g = chord_index(Song.from_chordpro(POP))
+    in_c = chord_index(Song.from_chordpro(POP).transpose(5))
+    assert in_g["chords"] == ["C", "D", "Em", "G"]
+    assert in_c["progressions"] == in_g["progressions"]
+    assert "0 7 9m 5" in in_g["progressions"]
+
+
+def test_roman_numerals_match_chord_names():
+    by_numerals = chord_search_query(progression="I–V–vi–IV")
+    assert by_numerals == chord_search_query(progression="C G Am F")
+    assert by_numerals == {"$and": [{"progressions": {"$all": ["0 7 9m 5"]}}]}
+
+
+def test_invalid_chord_search():
+    with pytest.raises(ValueError):
+        chord_search_query()
+    with pytest.raises(KeyError):
+        chord_search_query(playable="X7")
+
+
+@pytest.fixture
+def chord_songs(db_client):
+    collection = db_client.get_database(settings.MONGODB_DATABASE).songs
+    documents = [to_document(Song.from_chordpro(text)) for text in (POP, FOLK)]
+    # Stored before chord search existed, without chord fields.
+    documents.append(
+        Song.from_chordpro(BLUES).model_dump(by_alias=True, exclude=["id"])
+    )
+    asyncio.run(collection.insert_many(documents))
+    return collection
+
+
+def find_titles(collection, **params):
+    query = chord_search_query(**params)
+    documents = asyncio.run(collection.find(query).to_list(None))
+    return sorted(document["title"] for document in documents)
+
+
+def test_playable_with_only(chord_songs):
+    assert find_titles(chord_songs, playable="G, C, D") == ["Folk"]
+    assert find_titles(chord_songs, playable="G C D Em") == ["Folk", "Pop"]
+
+
+def test_progression_in_any_key(chord_songs):
+    assert find_titles(chord_songs, progression="I-V-vi-IV") == ["Pop"]
+    assert find_titles(chord_songs, progression="I IV") == ["Folk"]
+
+
+def test_backfill_adds_chord_fields(chord_songs):
+    asyncio.run(build_chord_index(chord_songs))
+    assert find_titles(chord_songs, progression="I7-IV7-I7-V7") == ["Blues"]
+
+
+def test_chord_search_route(client, chord_songs):
+    response = client.get("/search/chords", params={"progression": "D A Bm G"})
+    assert response.status_code == 200
+    assert "Pop" in response.text
+    assert "Folk" not in response.text
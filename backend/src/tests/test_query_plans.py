@@ -0,0 +1,144 @@
+"""
+Query plans of the routes' queries against a local mongod.
+
+Every query is explained after `ensure_indexes`, and a winning plan that
+scans the whole collection fails the test. Skipped when no server answers at
+MONGODB_URI (default localhost:27017).
+"""
+
+import asyncio
+
+import pytest
+from bson import ObjectId
+from directory import rebuild_directory
+from facets import facet_pipeline, facet_query
+from indexes import FACET_COVERING_INDEX, ensure_indexes
+from models.progression import chord_search_query
+from models.song import Song, SongSummary
+from models.storage import to_document
+from motor.motor_asyncio import AsyncIOMotorClient
+from pagination import keyset_filter, with_tie_breaker
+from pymongo.errors import PyMongoError
+from settings import settings
+
+DATABASE = "songbook_query_plans"
+LISTING = with_tie_breaker(["artist", "title"])
+
+
+def song(i: int) -> dict:
+    chords = ["C", "G", "Am", "F", "D", "Em"]
+    chordpro = (
+        f"{{title: Song {i}}}\n{{artist: Artist {i % 20}}}\n"
+        f"{{difficulty: {['easy', 'intermediate', 'hard'][i % 3]}}}\n"
+        f"{{genre: {['rock', 'pop', 'folk', 'jazz'][i % 4]}}}\n\n"
+        + " ".join(f"[{chords[(i + j) % 6]}]la" for j in range(4))
+    )
+    return to_document(Song.from_chordpro(chordpro))
+
+
+@pytest.fixture(scope="module")
+def songs():
+    async def setup():
+        client = AsyncIOMotorClient(settings.MONGODB_URI, serverSelectionTimeoutMS=1000)
+        try:
+            await client.admin.command("ping")
+        except PyMongoError:
+            return None
+        database = client.get_database(DATABASE)
+        await database.songs.drop()
+        await database.songs.insert_many([song(i) for i in range(500)])
+        await ensure_indexes(database)
+        await rebuild_directory(database.songs, database.artists)
+        return client
+
+    client = asyncio.run(setup())
+    if client is None:
+        pytest.skip("No MongoDB server to explain queries against.")
+    yield client.get_database(DATABASE).songs
+    asyncio.run(client.drop_database(DATABASE))
+
+
+def winning_stages(explain) -> list[str]:
+    """Every stage of the winning plans anywhere in an explain result."""
+    stages = []
+
+    def walk(node, in_plan):
+        if isinstance(node, dict):
+            if in_plan and "stage" in node:
+                stages.append(node["stage"])
+            for key, value in node.items():
+                if key != "rejectedPlans":
+                    walk(value, in_plan or key == "winningPlan")
+        elif isinstance(node, list):
+            for value in node:
+                walk(value, in_plan)
+
+    walk(explain, False)
+    return stages
+
+
+def find_plan(collection, query, sort=LISTING, projection=SongSummary.projection):
+    cursor = collection.find(query, projection).limit(50)
+    if sort:
+        cursor = cursor.sort([(key, 1) for key in sort])
+    return asyncio.run(cursor.explain())
+
+
+def aggregate_plan(collection, pipeline, **options):
+    command = {"aggregate": collection.name, "pipeline": pipeline, "explain": True}
+    return asyncio.run(collection.database.command({**command, **options}))
+
+
+FIND_QUERIES = {
+    "songs page": ({}, LISTING),
+    "songs next page": (
+        keyset_filter(LISTING, ["Artist 3", "Song 3", ObjectId()]),
+        LISTING,
+    ),
+    "artist page": ({"artist": "Artist 3"}, with_tie_breaker(["title"])),
+    "song by id": ({"_id": ObjectId()}, None),
+    "search results": ({"_id": {"$in": [ObjectId(), ObjectId()]}}, None),
+    "playable chords": (chord_search_query(playable="C, G, Am, F"), LISTING),
+    "progression": (chord_search_query(progression="I-V-vi-IV"), LISTING),
+    "filter difficulty": (facet_query(difficulty="easy"), LISTING),
+    "filter genre": (facet_query(genre="rock"), LISTING),
+    "filter genre and difficulty": (facet_query("hard", "jazz"), LISTING),
+    "filter artist": (facet_query(artist="Artist 3"), LISTING),
+}
+
+
+@pytest.mark.parametrize("name", FIND_QUERIES)
+def test_find_uses_an_index(songs, name):
+    query, sort = FIND_QUERIES[name]
+    stages = winning_stages(find_plan(songs, query, sort))
+    assert stages and "COLLSCAN" not in stages, f"{name}: {stages}"
+
+
+@pytest.mark.parametrize(
+    "query",
+    [{}, facet_query(difficulty="easy"), facet_query("easy", "rock")],
+    ids=["all", "difficulty", "genre and difficulty"],
+)
+def test_facet_counts_use_an_index(songs, query):
+    explain = aggregate_plan(songs, facet_pipeline(query), hint=FACET_COVERING_INDEX)
+    stages = winning_stages(explain)
+    assert stages and "COLLSCAN" not in stages, stages
+
+
+@pytest.mark.parametrize("query", [{}, {"letter": "A"}], ids=["all", "letter"])
+def test_artist_directory_uses_an_index(songs, query):
+    artists = songs.database.artists
+    sort = with_tie_breaker(["sort_key"])
+    stages = winning_stages(find_plan(artists, query, sort, {"name": 1}))
+    assert stages and "COLLSCAN" not in stages, stages
+
+
+def test_text_search_uses_an_index(songs):
+    pipeline = [
+        {"$match": {"$text": {"$search": "song"}}},
+        {"$project": {"score": {"$meta": "textScore"}}},
+        {"$sort": {"score": -1}},
+        {"$limit": 50},
+    ]
+    stages = winning_stages(aggregate_plan(songs, pipeline))
+    assert stages and "COLLSCAN" not in stages, stages
@@ -0,0 +1,55 @@
+from models.utils import normalize
+from search import TrigramIndex, search_index
+
+
+def make_index():
+    index = TrigramIndex()
+    index.add("1", "Yesterday Beatles All my troubles seemed so far away")
+    index.add("2", "Help Beatles Help I need somebody")
+    index.add("3", "Zitra ráno Žlutý pes Hřebíček")
+    return index
+
+
+def test_normalize_strips_accents_and_punctuation():
+    assert normalize("Žlutý pes, Hřebíček!") == "zluty pes hrebicek "
+
+
+def test_prefix_search():
+    assert [song_id for song_id, _ in make_index().search("yester")] == ["1"]
+
+
+def test_typo_tolerant_search():
+    assert make_index().search("yesterdy troubels")[0][0] == "1"
+    assert make_index().search("hrebicek")[0][0] == "3"
+
+
+def test_exact_word_ranks_first():
+    index = make_index()
+    index.add("4", "Helpless Neil Young")
+    assert [song_id for song_id, _ in index.search("help")] == ["2", "4"]
+
+
+def test_remove_and_update():
+    index = make_index()
+    index.remove("2")
+    assert index.search("somebody") == []
+    index.add("1", "Let it be")
+    assert index.search("yesterday") == []
+    assert index.search("let")[0][0] == "1"
+    assert len(index) == 2
+
+
+def test_search_route_follows_writes(client):
+    chordpro = "{title: Yesterday}\n{artist: Beatles}\n[F]All my troubles"
+    client.post(
+        "/songs",
+        data={"input-method": "text-field", "chordpro": chordpro},
+        follow_redirects=False,
+    )
+    response = client.get("/search", params={"q": "trubles"})
+    assert "Yesterday" in response.text
+
+    (song_id, _), *_ = search_index.search("yesterday")
+    client.post(f"/songs/delete/{song_id}", follow_redirects=False)
+    response = client.get("/search", params={"q": "trubles"})
+    assert "Yesterday" not in response.text.split("</nav>")[-1]
@@ -0,0 +1,80 @@
+import asyncio
+
+from models.song import Song
+from models.storage import to_document
+from settings import settings
+
+
+def insert_song(songs, title, chord):
+    chordpro = f"{{title: {title}}}\n{{artist: Band}}\n\n[{chord}]La la"
+    result = asyncio.run(songs.insert_one(to_document(Song.from_chordpro(chordpro))))
+    return str(result.inserted_id)
+
+
+def test_songbook_keeps_order_and_transpositions(client, db_client):
+    songs = db_client.get_database(settings.MONGODB_DATABASE).songs
+    first = insert_song(songs, "First", "C")
+    second = insert_song(songs, "Second", "Am")
+    gone = insert_song(songs, "Gone", "G")
+
+    response = client.post("/songbooks", data={"name": "Gig"}, follow_redirects=False)
+    url = response.headers["location"]
+    client.post(
+        url,
+        data={"song_id": [second, gone, first, second], "transpose": [0, 0, 0, 2]},
+        follow_redirects=False,
+    )
+    client.post(f"{url}/songs", data={"song_id": first, "transpose": -1})
+    client.post(f"/songs/delete/{gone}", follow_redirects=False)
+
+    page = client.get(url).text
+    assert "Gig" in page
+    titles = [title for title in ["First", "Second", "Gone"] if title in page]
+    assert titles == ["First", "Second"]
+    chords = [
+        chord
+        for chord in page.split('<span class="chord">[')[1:]
+        for chord in [chord.split("]")[0]]
+    ]
+    assert chords == ["Am", "C", "Bm", "B"]
+
+    assert "Gig" in client.get("/songbooks").text
+
+
+def test_export_renders_only_changed_songs(client, db_client, monkeypatch):
+    import export
+
+    monkeypatch.setattr(export.export_pool, "workers", 0)
+    export.print_cache.clear()
+    songs = db_client.get_database(settings.MONGODB_DATABASE).songs
+    first = insert_song(songs, "First", "C")
+    second = insert_song(songs, "Second", "Am")
+    response = client.post("/songbooks", data={"name": "Print"}, follow_redirects=False)
+    url = response.headers["location"]
+    client.post(url, data={"song_id": [first, second]}, follow_redirects=False)
+
+    page = client.get(f"{url}/export").text
+    assert page.index("First") < page.index("Second")
+    assert len(export.print_cache) == 2
+
+    client.post(
+        f"/songs/update/{second}",
+        data={"chordpro": "{title: Second}\n{artist: Band}\n\n[Em]La la"},
+        follow_redirects=False,
+    )
+    misses = export.print_cache.misses
+    page = client.get(f"{url}/export").text
+    assert '<span class="chord">[Em]</span>' in page
+    assert export.print_cache.misses == misses + 1
+
+
+def test_transpositions_are_stored_within_an_octave(client, db_client):
+    database = db_client.get_database(settings.MONGODB_DATABASE)
+    song = insert_song(database.songs, "First", "C")
+    response = client.post("/songbooks", data={"name": "Gig"}, follow_redirects=False)
+    url = response.headers["location"]
+
+    client.post(url, data={"song_id": [song, song], "transpose": [13, -11]})
+    client.post(f"{url}/songs", data={"song_id": song, "transpose": 13})
+    songbook = asyncio.run(database.songbooks.find_one({"name": "Gig"}))
+    assert [entry["transpose"] for entry in songbook["entries"]] == [1, 1, 1]
@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import importer
+import pytest
+import sources
+from models import supermusic
+from utils import downloader
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+SUPERMUSIC = os.path.join(FIXTURES, "supermusic")
+PAGES = sorted(name[:-5] for name in os.listdir(SUPERMUSIC) if name.endswith(".html"))
+
+
+def read_fixture(*path: str) -> str:
+    with open(os.path.join(FIXTURES, *path), encoding="utf-8") as file:
+        return file.read()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves saved pages with an ETag, answering 304 to a matching If-None-Match."""
+
+    requests: list[tuple[str, str | None]] = []
+
+    def do_GET(self):
+        etag = self.headers.get("If-None-Match")
+        type(self).requests.append((self.path, etag))
+        path = os.path.join(FIXTURES, self.path.lstrip("/"))
+        if not os.path.isfile(path):
+            self.send_response(404)
+            self.end_headers()
+            return
+        with open(path, "rb") as file:
+            body = file.read()
+        current = f'"{hashlib.sha1(body).hexdigest()}"'
+        if etag == current:
+            self.send_response(304)
+            self.send_header("ETag", current)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", current)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url(monkeypatch, tmp_path):
+    """Serves the fixtures as supermusic pages, with the page cache in tmp_path."""
+    FixtureHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    stub = sources.Source("stub", ("127.0.0.1",), supermusic.parse_page)
+    monkeypatch.setattr(sources, "sources", [stub])
+    monkeypatch.setattr(sources.page_cache, "directory", str(tmp_path))
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def download(*urls, offline=False):
+    async def run():
+        try:
+            return [await sources.download(url, offline) for url in urls]
+        finally:
+            await downloader.close()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "url, name",
+    [
+        ("https://tabs.ultimate-guitar.com/tab/x/y-chords-1", "ultimate-guitar"),
+        ("https://supermusic.cz/skupina.php?idpiesne=1", "supermusic"),
+        ("http://www.supermusic.sk/piesen.php?id=2", "supermusic"),
+    ],
+)
+def test_source_for(url, name):
+    assert sources.source_for(url).name == name
+
+
+def test_unsupported_url():
+    with pytest.raises(NotImplementedError):
+        sources.source_for("https://not-supermusic.cz/song")
+
+
+@pytest.mark.parametrize("page", PAGES)
+def test_saved_supermusic_pages(page):
+    song = supermusic.parse_page(read_fixture("supermusic", f"{page}.html"))
+    assert str(song) + "\n" == read_fixture("supermusic", f"{page}.cho")
+
+
+def test_download_caches_pages(stub_url):
+    url = f"{stub_url}/supermusic/pre_block.html"
+    first, second = download(url, url)
+    assert first == second
+    assert first.title == "Cesta domů"
+    # The second request asked whether the page changed and was answered 304.
+    (_, etag), (_, revalidated) = FixtureHandler.requests
+    assert etag is None and revalidated is not None
+    assert sources.page_cache.get(url).etag == revalidated
+
+
+def test_offline_download_reparses_cached_pages(stub_url):
+    url = f"{stub_url}/supermusic/anchor_chords.html"
+    (online,) = download(url)
+    (offline,) = download(url, offline=True)
+    assert offline == online
+    assert len(FixtureHandler.requests) == 1
+
+
+def test_download_of_missing_page(stub_url):
+    assert download(f"{stub_url}/supermusic/missing.html") == [None]
+    assert sources.page_cache.get(f"{stub_url}/supermusic/missing.html") is None
+
+
+def test_offline_download_never_asks_the_server(stub_url, monkeypatch):
+    async def fetch(*args):
+        raise AssertionError("Downloaded offline")
+
+    monkeypatch.setattr(downloader, "fetch", fetch)
+    url = f"{stub_url}/supermusic/pre_block.html"
+    with pytest.raises(sources.PageNotCached):
+        download(url, offline=True)
+    # The import reports the url as failed.
+    [(_, document, error)] = asyncio.run(importer.download_batch([url], offline=True))
+    assert document is None and error.startswith("PageNotCached")
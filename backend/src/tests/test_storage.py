@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from migrate import migrate_songs
+from models import storage
+from models.song import Song
+from settings import settings
+
+CHORDPRO = (
+    "{title: Help}\n{artist: Beatles}\n{capo: 2}\n\n"
+    "{start_of_verse: Verse 1}\n"
+    "[Am]When I was [F/C]younger, [C#m7]so much [Gsus4]younger\n"
+    "{end_of_verse}\n\n"
+    "{start_of_chorus}\n[Am]Help, I need [F]somebody\n{end_of_chorus}"
+)
+
+
+def test_compact_round_trip():
+    song = Song.from_chordpro(CHORDPRO)
+    decoded = storage.from_document(storage.encode_song(song))
+    assert str(decoded) == str(song)
+    assert decoded.sections == song.sections
+    assert decoded.transpose(2).sections == song.transpose(2).sections
+
+
+def test_chords_are_stored_once():
+    document = storage.encode_song(Song.from_chordpro(CHORDPRO))
+    assert document["format"] == storage.FORMAT_VERSION
+    assert len(document["chord_table"]) == 5
+    assert document["sections"][1]["lines"] == [[0, "Help, I need ", 4, "somebody"]]
+
+
+def test_nested_documents_still_decode():
+    song = Song.from_chordpro(CHORDPRO)
+    document = song.model_dump(by_alias=True, exclude=["id"])
+    assert str(storage.from_document(document)) == str(song)
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        storage.from_document({"format": storage.FORMAT_VERSION + 1})
+
+
+def test_migration(db_client):
+    collection = db_client.get_database(settings.MONGODB_DATABASE).songs
+    song = Song.from_chordpro(CHORDPRO)
+    asyncio.run(
+        collection.insert_many(
+            [song.model_dump(by_alias=True, exclude=["id"]), storage.to_document(song)]
+        )
+    )
+
+    async def migrate():
+        return [count async for count in migrate_songs(collection, batch_size=1)]
+
+    assert asyncio.run(migrate()) == [1]
+    documents = asyncio.run(collection.find().to_list(None))
+    assert all(document["format"] == storage.FORMAT_VERSION for document in documents)
+    assert all(
+        str(storage.from_document(document)) == str(song) for document in documents
+    )
+    assert asyncio.run(migrate()) == []
+
+
+def test_sections_are_rendered_when_written():
+    song = Song.from_chordpro(CHORDPRO)
+    document = storage.to_document(song)
+    assert len(document["fragments"]) == 2
+    assert '<span class="chord">[F/C]</span>' in document["fragments"][0]
+
+    legacy = song.model_dump(by_alias=True, exclude=["id"])
+    assert storage.song_fragments(legacy) == storage.song_fragments(document)
+
+
+def test_songbook_stitches_fragments(client, db_client):
+    collection = db_client.get_database(settings.MONGODB_DATABASE).songs
+    song = Song.from_chordpro(CHORDPRO)
+    stale = {**storage.to_document(song), "title": "Stale", "fragments_version": 0}
+    asyncio.run(collection.insert_many([storage.to_document(song), stale]))
+
+    response = client.get("/songbook/")
+    assert response.text.count('<span class="chord">[C#m7]</span>') == 2
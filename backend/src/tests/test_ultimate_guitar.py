@@ -0,0 +1,46 @@
+import os
+
+import pytest
+from models import ultimate_guitar
+from models.song import Song
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "ultimate_guitar")
+PAGES = sorted(name[:-5] for name in os.listdir(FIXTURES) if name.endswith(".html"))
+
+
+def read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as file:
+        return file.read()
+
+
+@pytest.mark.parametrize("page", PAGES)
+def test_saved_pages(page):
+    """Each saved page parses to the ChordPro saved next to it."""
+    song = Song.from_ug_html(read_fixture(f"{page}.html"))
+    assert str(song) + "\n" == read_fixture(f"{page}.cho")
+
+
+def test_capo_and_tuning():
+    song = Song.from_ug_html(read_fixture("capo_and_tuning.html"))
+    assert song.capo == 3
+    assert song.meta == {"tuning": "Eb Ab Db Gb Bb Eb", "key": "Am"}
+
+
+def test_last_section_without_closing_tag():
+    song = Song.from_ug_html(read_fixture("capo_and_tuning.html"))
+    assert [section.title for section in song.sections] == [
+        "Intro",
+        "Verse 1",
+        "Chorus",
+    ]
+    assert str(song.sections[-1].lines[-1]) == "[F]Hold[G/B] on"
+
+
+def test_merge_chords_over_lyrics():
+    line = ultimate_guitar.merge_line("[ch]Am[/ch]   [ch]C[/ch]", "Help me")
+    assert str(line) == "[Am]Help [C]me"
+
+
+def test_page_without_tab_data():
+    with pytest.raises(ValueError):
+        Song.from_ug_html('<div class="js-store-other" data-content="{}"></div>')
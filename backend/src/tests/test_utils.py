@@ -0,0 +1,138 @@
+import asyncio
+import html
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from models.song import Song
+from utils import SOURCE_DIR, Downloader, JsonFormatter, get_logger
+
+UG_CONTENT = "[Verse]\n[ch]C[/ch] [ch]G[/ch]\n\n[Chorus]\n[ch]Am[/ch]\n\n[Outro]"
+UG_STORE = {
+    "store": {
+        "page": {
+            "data": {
+                "tab_view": {
+                    "versions": [{"song_name": "Help", "artist_name": "Beatles"}],
+                    "wiki_tab": {"content": UG_CONTENT},
+                }
+            }
+        }
+    }
+}
+UG_HTML = (
+    f'<html><body><div class="js-store" '
+    f'data-content="{html.escape(json.dumps(UG_STORE))}"></div></body></html>'
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers with 503 for the first `failures` requests of a path, then the page."""
+
+    failures: dict[str, int] = {}
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            if self.path.startswith("/slow"):
+                threading.Event().wait(0.05)
+            if cls.failures.get(self.path, 0) > 0:
+                cls.failures[self.path] -= 1
+                self.send_response(503)
+                self.end_headers()
+                return
+            status = 404 if self.path == "/missing" else 200
+            body = UG_HTML.encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    StubHandler.failures = {}
+    StubHandler.max_in_flight = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def fetch(downloader, *urls):
+    async def run():
+        try:
+            return await asyncio.gather(*(downloader.get(url) for url in urls))
+        finally:
+            await downloader.close()
+
+    return asyncio.run(run())
+
+
+def test_download_retries_server_errors(stub_url):
+    StubHandler.failures["/song"] = 2
+    downloader = Downloader(retries=2, backoff=0.01)
+    (text,) = fetch(downloader, f"{stub_url}/song")
+    assert "js-store" in text
+
+
+def test_download_gives_up_after_retries(stub_url):
+    StubHandler.failures["/song"] = 3
+    downloader = Downloader(retries=1, backoff=0.01)
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch(downloader, f"{stub_url}/song")
+
+
+def test_download_does_not_retry_client_errors(stub_url):
+    downloader = Downloader(retries=3, backoff=10)
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch(downloader, f"{stub_url}/missing")
+
+
+def test_download_limits_requests_per_host(stub_url):
+    downloader = Downloader(max_per_host=2)
+    texts = fetch(downloader, *(f"{stub_url}/slow/{i}" for i in range(8)))
+    assert len(texts) == 8
+    assert StubHandler.max_in_flight <= 2
+
+
+def test_downloaded_page_parses(stub_url):
+    (text,) = fetch(Downloader(), f"{stub_url}/song")
+    song = Song.from_ug_html(text)
+    assert (song.artist, song.title) == ("Beatles", "Help")
+
+
+def test_loggers_are_named_by_module_and_log_json():
+    logger = get_logger(f"{SOURCE_DIR}/routes/songs.py")
+    assert logger.name == "routes.songs"
+
+    record = logger.makeRecord(
+        logger.name,
+        logging.INFO,
+        __file__,
+        1,
+        "Saved %s",
+        ("42",),
+        None,
+        extra={"song_id": "42"},
+    )
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Saved 42"
+    assert (entry["level"], entry["song_id"]) == ("INFO", "42")
@@ -0,0 +1,61 @@
+import asyncio
+import pickle
+import time
+
+import pytest
+from models.chordpro import ChordProError
+from settings import settings
+from workers import PoolSaturated, WorkerPool, parse_pool
+
+CHORDPRO = "{title: Help}\n{artist: Beatles}\n[Am]Help, I need [F]somebody"
+
+
+def test_saturated_pool_rejects_or_waits():
+    pool = WorkerPool(0, max_pending=1)
+
+    async def run():
+        slow = asyncio.ensure_future(pool.run(time.sleep, 0.05))
+        await asyncio.sleep(0)
+        with pytest.raises(PoolSaturated):
+            await pool.run(time.sleep, 0)
+        # Waiting runs the task once the slow one is done.
+        await pool.run(time.sleep, 0, wait=True)
+        assert slow.done()
+
+    asyncio.run(run())
+    assert pool.pending == 0
+
+
+def test_parse_errors_keep_their_position_across_processes():
+    error = pickle.loads(pickle.dumps(ChordProError("Invalid chord", 3, 7)))
+    assert (error.line, error.column) == (3, 7)
+
+
+def test_song_is_parsed_in_the_pool(client, db_client):
+    response = client.post(
+        "/songs",
+        data={"input-method": "text-field", "chordpro": CHORDPRO},
+        follow_redirects=False,
+    )
+    assert response.status_code == 302
+    songs = db_client.get_database(settings.MONGODB_DATABASE).songs
+    assert asyncio.run(songs.find_one())["fragments"]
+
+
+def test_song_with_errors_shows_their_position(client):
+    chordpro = CHORDPRO + "\n[Am"
+    response = client.post(
+        "/songs", data={"input-method": "text-field", "chordpro": chordpro}
+    )
+    assert response.status_code == 200
+    assert "line 4, column" in response.text
+    assert "Unterminated chord" in response.text
+
+
+def test_saturated_pool_answers_429(client, monkeypatch):
+    monkeypatch.setattr(parse_pool, "max_pending", 0)
+    response = client.post(
+        "/songs", data={"input-method": "text-field", "chordpro": CHORDPRO}
+    )
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
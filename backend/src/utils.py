@@ -1,45 +1,148 @@
+import asyncio
+import functools
+import json
 import logging
-import traceback
+import os
+from urllib.parse import urlsplit
 
-import requests
-from models.song import Song
+import httpx
+from settings import settings
 
 logger = logging.getLogger(__name__)
 
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
 
-def download_url(url):
-    with requests.get(
-        url,
-    ) as response:
-        response.raise_for_status()
-        return response.text
 
+class Downloader:
+    """
+    Fetches pages for song imports over one pooled async HTTP client.
+
+    Requests to the same host are limited to `max_per_host` at a time, and
+    connection errors or transient server errors are retried with exponential
+    backoff.
+    """
+
+    def __init__(
+        self,
+        timeout: float | None = None,
+        max_connections: int | None = None,
+        max_per_host: int | None = None,
+        retries: int | None = None,
+        backoff: float | None = None,
+    ):
+        self.timeout = timeout or settings.HTTP_TIMEOUT_S
+        self.max_connections = max_connections or settings.HTTP_MAX_CONNECTIONS
+        self.max_per_host = max_per_host or settings.HTTP_MAX_CONNECTIONS_PER_HOST
+        self.retries = settings.HTTP_RETRIES if retries is None else retries
+        self.backoff = settings.HTTP_BACKOFF_S if backoff is None else backoff
+        self._client: httpx.AsyncClient | None = None
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections),
+                follow_redirects=True,
+            )
+        return self._client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_limits[host]
+
+    async def get(self, url: str) -> str:
+        return (await self.fetch(url)).text
+
+    async def fetch(self, url: str, etag: str | None = None) -> httpx.Response:
+        """
+        The response to a GET of `url`. Given the `etag` of a copy of the page,
+        the response may instead be a 304 Not Modified without a body.
+        """
+        headers = {"If-None-Match": etag} if etag else None
+        async with self._host_limit(url):
+            for attempt in range(self.retries + 1):
+                try:
+                    response = await self.client.get(url, headers=headers)
+                    if response.status_code == 304 and etag:
+                        return response
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        response.raise_for_status()
+                        return response
+                    error = httpx.HTTPStatusError(
+                        f"Server error {response.status_code} for url {url}",
+                        request=response.request,
+                        response=response,
+                    )
+                except httpx.TransportError as e:
+                    error = e
+
+                if attempt == self.retries:
+                    raise error
+                delay = self.backoff * 2**attempt
+                logger.warning("Retrying %s in %.1fs after: %s", url, delay, error)
+                await asyncio.sleep(delay)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._host_limits.clear()
 
-def download(url):
-    supported_urls = ["ultimate-guitar", "supermusic.cz"]
-    if "ultimate-guitar" in url:
-        logger.info(f"Processing url as ultimate-guitar: {url}")
-        return download_ultimate_guitar(url)
-    else:
-        raise NotImplementedError(
-            f"This url is not supported yet: {url}. Supported: {supported_urls}"
-        )
 
+downloader = Downloader()
 
-def download_ultimate_guitar(url) -> Song | None:
-    try:
-        html = download_url(url)
-        return Song.from_ug_html(html)
-    except requests.RequestException as e:
-        logger.error(f"Requested URL {url} cannot be retrieved: {e}")
-        logger.error(traceback.format_exc())
-        return None
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# Attributes of every log record, the others are fields passed in `extra`.
+RECORD_ATTRIBUTES = {*vars(logging.makeLogRecord({})), "message", "asctime"}
+SOURCE_DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the fields passed in `extra`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+@functools.cache
+def configure_logging():
+    """Log to stderr at LOG_LEVEL in LOG_FORMAT, once per process."""
+    handler = logging.StreamHandler()
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL)
 
 
 def get_logger(file):
-    logging.basicConfig(
-        level=logging.INFO,  # Set the log level to INFO
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",  # Set the log format
-        handlers=[logging.StreamHandler()],  # Add a handler that outputs to stdout
-    )
-    return logging.getLogger(file)
+    """
+    The logger of a module, named by its path in the sources like
+    ``routes.songs``.
+
+    Pass values as arguments, ``logger.info("Saved %s", song_id)``, so that
+    messages below LOG_LEVEL are never formatted.
+    """
+    configure_logging()
+    path = os.path.relpath(os.path.realpath(file), SOURCE_DIR)
+    if path.startswith(os.pardir):
+        path = os.path.basename(path)
+    return logging.getLogger(os.path.splitext(path)[0].replace(os.sep, "."))
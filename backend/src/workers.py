@@ -0,0 +1,88 @@
+"""
+Pools running CPU-bound work, like parsing and rendering songs, away from the
+event loop, so that one large song does not stall every other request.
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+from settings import settings
+from utils import get_logger
+
+logger = get_logger(__file__)
+
+
+class PoolSaturated(RuntimeError):
+    """The pool already has as many tasks as it queues."""
+
+
+class WorkerPool:
+    """
+    Lazily started pool of worker processes, or the event loop's default
+    thread pool when configured with 0 workers or when processes cannot be
+    started.
+
+    At most `max_pending` tasks are queued or running at once. Beyond that,
+    `run` raises PoolSaturated right away, for requests to be turned away, or
+    with `wait` waits for a task to finish, for bulk work that should slow
+    down instead. Metrics recorded by a task are replayed into this process.
+    """
+
+    def __init__(self, workers: int, max_pending: int | None = None):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: ProcessPoolExecutor | None = None
+        self._finished: asyncio.Event | None = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor | None:
+        if self._executor is None and self.workers > 0:
+            context = multiprocessing.get_context("spawn")
+            try:
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=context)
+            except (OSError, NotImplementedError) as e:
+                logger.warning("Running in threads, worker processes failed: %s", e)
+                self.workers = 0
+        return self._executor
+
+    @property
+    def saturated(self) -> bool:
+        return self.max_pending is not None and self.pending >= self.max_pending
+
+    async def run(self, function, *args, wait: bool = False):
+        while self.saturated:
+            if not wait:
+                raise PoolSaturated("Too many songs are being processed, try again.")
+            # Created here so that it belongs to the running event loop.
+            if self._finished is None:
+                self._finished = asyncio.Event()
+            self._finished.clear()
+            await self._finished.wait()
+
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        try:
+            result, observations = await loop.run_in_executor(
+                self.executor, metrics.recorded, function, *args
+            )
+        finally:
+            self.pending -= 1
+            if self._finished is not None:
+                self._finished.set()
+        metrics.registry.replay(observations)
+        return result
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        self._finished = None
+
+
+parse_pool = WorkerPool(settings.PARSE_WORKERS, settings.PARSE_QUEUE_SIZE)
+# Shared by all bulk imports, which wait for room, one batch running and one
+# parsed ahead per worker.
+import_pool = WorkerPool(settings.IMPORT_WORKERS, 2 * max(settings.IMPORT_WORKERS, 1))